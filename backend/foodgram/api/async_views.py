@@ -0,0 +1,379 @@
+"""Асинхронные read-only эндпоинты для ASGI-развертывания.
+
+GET-запросы обрабатываются через async ORM без DRF, независимые запросы
+(строки страницы, count, множества связей зрителя) выполняются через
+asyncio.gather. Остальные методы передаются синхронным вьюсетам.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.http import JsonResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import RecipeFilter, select_by_tags, uses_tag_index
+from .serializers import (RecipeGetSerializer, UserSubscriptionSerializer,
+                          author_recipes, recipes_limit)
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from users.models import Follow, User
+
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'cooking_time')
+NOT_FOUND = 'No {} matches the given query.'
+
+
+class NotFoundError(Exception):
+    pass
+
+
+class NotAuthenticatedError(Exception):
+    pass
+
+
+class BadRequestError(Exception):
+    """Ошибка параметров запроса; args[0] - тело ответа 400."""
+
+
+async def get_user(request):
+    """Аутентификация по токену, как в TokenAuthentication."""
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword != 'Token' or not key.strip():
+        return AnonymousUser()
+    try:
+        token = await Token.objects.select_related('user').aget(
+            key=key.strip()
+        )
+    except Token.DoesNotExist:
+        raise NotAuthenticatedError('Недопустимый токен.')
+    if not token.user.is_active:
+        raise NotAuthenticatedError('Пользователь неактивен или удален.')
+    return token.user
+
+
+async def to_list(queryset):
+    return [row async for row in queryset]
+
+
+async def to_set(queryset):
+    return {value async for value in queryset}
+
+
+async def no_result(default=None):
+    return default
+
+
+def image_url(request, name):
+    if not name:
+        return None
+    return request.build_absolute_uri(default_storage.url(name))
+
+
+def get_page(request):
+    """Границы страницы по правилам CustomPagination."""
+    limit = request.GET.get('limit')
+    if limit is None:
+        return None
+    try:
+        limit = int(limit)
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise NotFoundError('Неправильная страница')
+    if limit < 1 or page < 1:
+        raise NotFoundError('Неправильная страница')
+    return page, limit
+
+
+def paginated(request, results, count, page):
+    if page is None:
+        return results
+    number, limit = page
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if number * limit < count:
+        next_link = replace_query_param(url, 'page', number + 1)
+    if number > 1:
+        previous_link = (
+            remove_query_param(url, 'page') if number == 2
+            else replace_query_param(url, 'page', number - 1)
+        )
+    return {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': results,
+    }
+
+
+def slice_page(queryset, page):
+    if page is None:
+        return queryset
+    number, limit = page
+    return queryset[(number - 1) * limit:number * limit]
+
+
+def viewer_relations(user, fields):
+    """Корутины множеств id избранного, корзины и подписок зрителя."""
+    if user.is_anonymous:
+        return no_result(set()), no_result(set()), no_result(set())
+    return (
+        to_set(Favorite.objects.filter(user=user).values_list(
+            'recipe_id', flat=True
+        )) if 'is_favorited' in fields else no_result(set()),
+        to_set(ShoppingCart.objects.filter(user=user).values_list(
+            'recipe_id', flat=True
+        )) if 'is_in_shopping_cart' in fields else no_result(set()),
+        to_set(Follow.objects.filter(user=user).values_list(
+            'author_id', flat=True
+        )) if 'author' in fields else no_result(set()),
+    )
+
+
+def filter_recipes(request, user):
+    """Фильтры списка рецептов с проверкой author, как в RecipeFilter."""
+    params = request.GET
+    filterset = RecipeFilter(params, queryset=Recipe.objects.all())
+    if not filterset.is_valid():
+        raise BadRequestError({
+            field: list(errors)
+            for field, errors in filterset.errors.items()
+        })
+    queryset = filterset.qs
+    if user.is_authenticated:
+        for param, lookup in (('is_favorited', 'fav_recipe__user'),
+                              ('is_in_shopping_cart', 'shop_recipe__user')):
+            value = params.get(param)
+            if value == '1':
+                return queryset.filter(**{lookup: user}).distinct()
+            if value == '0':
+                return queryset.exclude(**{lookup: user})
+    return queryset
+
+
+async def load_recipe_relations(ids, author_ids, fields):
+    """Теги, ингредиенты и авторы для строк страницы одним заходом."""
+    tags, ingredients, authors = await asyncio.gather(
+        to_list(RecipeTag.objects.filter(recipe_id__in=ids).order_by(
+            'tag__name'
+        ).values('recipe_id', *(f'tag__{name}' for name in TAG_FIELDS)))
+        if 'tags' in fields else no_result([]),
+        to_list(RecipeIngredient.objects.filter(recipe_id__in=ids).values(
+            'recipe_id', 'amount', 'ingredient_id',
+            'ingredient__name', 'ingredient__measurement_unit',
+        )) if 'ingredients' in fields else no_result([]),
+        to_list(User.objects.filter(id__in=author_ids).values(*USER_FIELDS))
+        if 'author' in fields else no_result([]),
+    )
+    by_recipe = {recipe_id: {'tags': [], 'ingredients': []}
+                 for recipe_id in ids}
+    for row in tags:
+        by_recipe[row['recipe_id']]['tags'].append(
+            {name: row[f'tag__{name}'] for name in TAG_FIELDS}
+        )
+    for row in ingredients:
+        by_recipe[row['recipe_id']]['ingredients'].append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['amount'],
+        })
+    return by_recipe, {author['id']: author for author in authors}
+
+
+async def represent_recipes(request, rows, relations, fields):
+    favorites, cart, following = relations
+    ids = [row['id'] for row in rows]
+    by_recipe, authors = await load_recipe_relations(
+        ids, {row['author_id'] for row in rows}, fields
+    )
+    results = []
+    for row in rows:
+        data = {
+            'id': row['id'],
+            'tags': by_recipe[row['id']]['tags'],
+            'author': dict(
+                authors.get(row['author_id'], {}),
+                is_subscribed=row['author_id'] in following,
+            ),
+            'ingredients': by_recipe[row['id']]['ingredients'],
+            'name': row['name'],
+            'image': image_url(request, row['image']),
+            'text': row.get('text'),
+            'cooking_time': row['cooking_time'],
+            'is_favorited': row['id'] in favorites,
+            'is_in_shopping_cart': row['id'] in cart,
+        }
+        results.append({
+            name: data[name] for name in RecipeGetSerializer.Meta.fields
+            if name in fields
+        })
+    return results
+
+
+def recipe_rows(queryset, fields):
+    columns = ['id', 'name', 'image', 'cooking_time', 'author_id']
+    if 'text' in fields:
+        columns.append('text')
+    return queryset.values(*columns)
+
+
+async def tagged_recipe_list(request, user, fields, page):
+    """Выборка по битовым картам тегов, как в RecipeViewSet.list."""
+    selection = await sync_to_async(select_by_tags)(
+        request.GET, await sync_to_async(filter_recipes)(request, user)
+    )
+    # Выборка по SQL (QuerySelection) читает базу при срезе и len()
+    ids = await sync_to_async(selection.__getitem__)(
+        slice(None) if page is None
+        else slice((page[0] - 1) * page[1], page[0] * page[1])
+    )
+    if page is not None and page[0] > 1 and not ids:
+        raise NotFoundError('Неправильная страница')
+    rows, *relations = await asyncio.gather(
+        to_list(recipe_rows(Recipe.objects.filter(pk__in=ids), fields)),
+        *viewer_relations(user, fields),
+    )
+    position = {pk: number for number, pk in enumerate(ids)}
+    rows.sort(key=lambda row: position[row['id']])
+    results = await represent_recipes(request, rows, relations, fields)
+    count = await sync_to_async(len)(selection) if page else None
+    data = paginated(request, results, count, page)
+    if page is not None and selection.facets is not None:
+        data['facets'] = selection.facets
+    return data
+
+
+async def recipe_list(request, user):
+    fields = RecipeGetSerializer.requested_fields(request)
+    page = get_page(request)
+    if uses_tag_index(request.GET):
+        return await tagged_recipe_list(request, user, fields, page)
+    queryset = await sync_to_async(filter_recipes)(request, user)
+    rows, count, *relations = await asyncio.gather(
+        to_list(slice_page(recipe_rows(queryset, fields), page)),
+        queryset.acount() if page else no_result(),
+        *viewer_relations(user, fields),
+    )
+    results = await represent_recipes(request, rows, relations, fields)
+    return paginated(request, results, count, page)
+
+
+async def recipe_detail(request, user, pk):
+    fields = RecipeGetSerializer.requested_fields(request)
+    rows, *relations = await asyncio.gather(
+        to_list(recipe_rows(Recipe.objects.filter(pk=pk), fields)),
+        *viewer_relations(user, fields),
+    )
+    if not rows:
+        raise NotFoundError(NOT_FOUND.format(Recipe.__name__))
+    results = await represent_recipes(request, rows, relations, fields)
+    return results[0]
+
+
+async def recipes_limited(request, author_ids):
+    """Последние рецепты авторов, не больше recipes_limit у каждого."""
+    try:
+        limit = recipes_limit(request.GET)
+    except ValidationError as error:
+        raise BadRequestError(error.detail)
+    rows = await to_list(author_recipes(limit).filter(
+        author_id__in=author_ids
+    ).values('author_id', *SHORT_RECIPE_FIELDS))
+    by_author = {author_id: [] for author_id in author_ids}
+    for row in rows:
+        row['image'] = default_storage.url(row['image'])
+        by_author[row.pop('author_id')].append(row)
+    return by_author
+
+
+async def subscriptions(request, user):
+    if user.is_anonymous:
+        raise NotAuthenticatedError('Учетные данные не были предоставлены.')
+    fields = UserSubscriptionSerializer.requested_fields(request)
+    page = get_page(request)
+    queryset = User.objects.filter(following__user=user)
+    rows, count = await asyncio.gather(
+        to_list(slice_page(queryset.annotate(
+            recipes_count=Count('recipes')
+        ).values(*USER_FIELDS, 'recipes_count'), page)),
+        queryset.acount() if page else no_result(),
+    )
+    recipes = (
+        await recipes_limited(request, [row['id'] for row in rows])
+        if 'recipes' in fields else {}
+    )
+    results = []
+    for row in rows:
+        row['is_subscribed'] = True
+        row['recipes'] = recipes.get(row['id'], [])
+        results.append({
+            name: row[name]
+            for name in UserSubscriptionSerializer.Meta.fields
+            if name in fields
+        })
+    return paginated(request, results, count, page)
+
+
+async def catalog_list(request, model, columns):
+    queryset = model.objects.values(*columns)
+    if model is Ingredient and request.GET.get('name'):
+        queryset = queryset.filter(name__icontains=request.GET['name'])
+    return await to_list(queryset)
+
+
+async def catalog_detail(model, columns, pk):
+    row = await model.objects.filter(pk=pk).values(*columns).afirst()
+    if row is None:
+        raise NotFoundError(NOT_FOUND.format(model.__name__))
+    return row
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def read_only(fallback, handler):
+    """Async GET-обработчик с передачей прочих методов в DRF-вьюсет."""
+    fallback = sync_to_async(fallback)
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await fallback(request, *args, **kwargs)
+        try:
+            user = await get_user(request)
+            data = await handler(request, user, *args, **kwargs)
+        except NotAuthenticatedError as error:
+            return json_response({'detail': str(error)}, status=401)
+        except NotFoundError as error:
+            return json_response({'detail': str(error)}, status=404)
+        except BadRequestError as error:
+            return json_response(error.args[0], status=400)
+        return json_response(data)
+    view.csrf_exempt = True
+    view.__name__ = handler.__name__
+    return view
+
+
+async def tag_list(request, user):
+    return await catalog_list(request, Tag, TAG_FIELDS)
+
+
+async def tag_detail(request, user, pk):
+    return await catalog_detail(Tag, TAG_FIELDS, pk)
+
+
+async def ingredient_list(request, user):
+    return await catalog_list(request, Ingredient, INGREDIENT_FIELDS)
+
+
+async def ingredient_detail(request, user, pk):
+    return await catalog_detail(Ingredient, INGREDIENT_FIELDS, pk)
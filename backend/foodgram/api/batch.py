@@ -0,0 +1,106 @@
+"""Пакетные запросы: несколько вызовов API в одном HTTP-запросе.
+
+Подзапросы передаются вьюхам API напрямую, без повторного прохода
+middleware и аутентификации: пользователь внешнего запроса подставляется
+в каждый подзапрос. Подзапросы выполняются по порядку в соединении
+внешнего запроса: так они видят его транзакцию, пул соединений и выбор
+реплики. Ошибка подзапроса возвращается в его ответе и не прерывает
+остальные; изменения подзапроса записи при ошибке откатываются.
+"""
+import io
+import json
+import logging
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .serializers import BatchSerializer
+
+logger = logging.getLogger(__name__)
+
+# Маршруты, недоступные в пакете: сам пакет и потоковый импорт
+EXCLUDED_ROUTES = ('batch', 'recipes-import')
+
+
+def _subrequest(request, item):
+    """Запрос Django для подзапроса с окружением внешнего запроса."""
+    path, _, query = item['url'].partition('?')
+    body = b''
+    if 'body' in item:
+        body = json.dumps(item['body']).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith('wsgi.')
+    }
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    subrequest = WSGIRequest(environ)
+    subrequest.user = request.user
+    if request.user.is_authenticated:
+        # DRF берет пользователя отсюда вместо повторной аутентификации
+        subrequest._force_auth_user = request.user
+        subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def _content(response):
+    if hasattr(response, 'data'):
+        return response.data
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(response.charset)
+
+
+def _dispatch(request, item):
+    try:
+        match = resolve(item['url'].partition('?')[0])
+    except Resolver404:
+        match = None
+    if match is None or match.url_name in EXCLUDED_ROUTES:
+        return {'status': 404, 'body': {'detail': 'Страница не найдена.'}}
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(_subrequest(request, item), *match.args, **match.kwargs)
+    return {'status': response.status_code, 'body': _content(response)}
+
+
+def _execute(request, item):
+    """Ответ подзапроса; исключение становится ответом 500."""
+    try:
+        if item['method'] == 'GET':
+            return _dispatch(request, item)
+        with transaction.atomic():
+            return _dispatch(request, item)
+    except Exception:
+        logger.exception(
+            'Ошибка подзапроса %s %s', item['method'], item['url']
+        )
+        return {
+            'status': 500,
+            'body': {'detail': 'Внутренняя ошибка сервера.'},
+        }
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch(request):
+    """Выполнить подзапросы и вернуть их ответы в том же порядке."""
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return Response({'responses': [
+        _execute(request, item)
+        for item in serializer.validated_data['requests']
+    ]})
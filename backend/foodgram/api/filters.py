@@ -1,6 +1,10 @@
 import django_filters
+import numpy as np
+from django.db.models import Count, Exists, OuterRef
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes import trending
+from recipes.models import Ingredient, Recipe, RecipeTag, Tag
+from recipes.tag_index import tag_index
 
 
 class IngredientFilter(django_filters.FilterSet):
@@ -15,12 +19,88 @@ class IngredientFilter(django_filters.FilterSet):
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
-    )
+    """Фильтр по автору; теги обрабатывает select_by_tags."""
 
     class Meta:
         model = Recipe
-        fields = ['author', 'tags']
+        fields = ['author']
+
+
+def uses_tag_index(params):
+    return bool(
+        params.getlist('tags') or params.get('facets')
+        or params.get('ordering') == 'trending'
+    )
+
+
+class QuerySelection:
+    """Результат фильтра по тегам в SQL, интерфейс как у TagSelection."""
+
+    def __init__(self, queryset, facets=None):
+        self.queryset = queryset.order_by('-pubdate', '-pk').values_list(
+            'pk', flat=True
+        )
+        self.facets = facets
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __getitem__(self, item):
+        return list(self.queryset[item])
+
+
+def _tagged(queryset, slugs, match_all):
+    if not slugs:
+        return queryset
+    if not match_all:
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=slugs
+        )))
+    for slug in set(slugs):
+        queryset = queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__slug=slug
+        )))
+    return queryset
+
+
+def _facets(queryset):
+    facets = dict.fromkeys(Tag.objects.values_list('slug', flat=True), 0)
+    facets.update(
+        RecipeTag.objects.filter(recipe__in=queryset.values('pk'))
+        .values_list('tag__slug').annotate(count=Count('recipe'))
+    )
+    return facets
+
+
+def select_by_tags(params, queryset):
+    """Рецепты queryset с тегами из params по битовым картам tag_index.
+
+    tags_match=all требует все теги вместо любого из них, facets=1
+    добавляет число рецептов по каждому тегу в текущей выборке.
+    ordering=trending оставляет только рецепты из рейтинга популярных
+    в порядке рейтинга. Если queryset уже отфильтрован (автор, избранное,
+    корзина), теги проверяются в том же SQL-запросе: выгрузка всех id
+    отфильтрованных рецептов стоила бы O(N) на запрос.
+    """
+    ranking = include = None
+    slugs = params.getlist('tags')
+    match_all = params.get('tags_match') == 'all'
+    facets = bool(params.get('facets'))
+    if params.get('ordering') == 'trending':
+        ranking = include = trending.ranking()
+    if queryset.query.where:
+        if ranking is None:
+            queryset = _tagged(queryset, slugs, match_all)
+            return QuerySelection(
+                queryset, _facets(queryset) if facets else None
+            )
+        # Рейтинг ограничен по размеру, пересечение с ним считает SQL
+        include = list(queryset.filter(pk__in=ranking.tolist()).values_list(
+            'pk', flat=True
+        ))
+    selection = tag_index.ensure_fresh().select(
+        slugs=slugs, match_all=match_all, include=include, facets=facets,
+    )
+    if ranking is not None:
+        selection.ids = ranking[np.isin(ranking, selection.ids)]
+    return selection
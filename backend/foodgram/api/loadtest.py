@@ -0,0 +1,267 @@
+"""Минимальный асинхронный HTTP/1.1 клиент для нагрузочных замеров."""
+import asyncio
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import yaml
+
+# Формат combined, который nginx пишет по умолчанию
+ACCESS_LOG_LINE = re.compile(
+    r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" '
+    r'(?P<status>\d{3})'
+)
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class Connection:
+    """Keep-alive соединение, переоткрывается после Connection: close."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _read_body(self, headers):
+        if 'content-length' in headers:
+            return await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        if headers.get('transfer-encoding') == 'chunked':
+            body = b''
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if not size:
+                    return body
+                body += chunk[:-2]
+        return await self.reader.read()
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Выполнить запрос, вернуть (статус, заголовки, тело)."""
+        if self.writer is None:
+            await self._open()
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}']
+        for name, value in (headers or {}).items():
+            lines.append(f'{name}: {value}')
+        lines.append(f'Content-Length: {len(body)}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError('Сервер закрыл соединение')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.lower()] = value.strip()
+        # У ответа на HEAD, 204 и 304 тела нет при любом Content-Length
+        content = b''
+        if method != 'HEAD' and status not in (204, 304):
+            content = await self._read_body(response_headers)
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, response_headers, content
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку значений."""
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Сводка замера: пропускная способность и перцентили в мс."""
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'rps': round(total / elapsed, 1) if elapsed else 0,
+        'p50_ms': round((percentile(latencies, 0.5) or 0) * 1000, 2),
+        'p95_ms': round((percentile(latencies, 0.95) or 0) * 1000, 2),
+        'p99_ms': round((percentile(latencies, 0.99) or 0) * 1000, 2),
+    }
+
+
+async def hammer(url, concurrency, total, headers=None):
+    """Прогнать total GET-запросов к url в concurrency соединений."""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    latencies, errors = [], 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        connection = Connection(parts.hostname, parts.port or 80)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status, _, _ = await connection.request(
+                    'GET', path, headers
+                )
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                connection.close()
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def load_operations(path):
+    """Операции из схемы OpenAPI: (метод, шаблон пути) -> описание."""
+    with open(path, encoding='utf-8') as file:
+        schema = yaml.safe_load(file)
+    operations = {}
+    for template, methods in schema['paths'].items():
+        pattern = re.compile(
+            '^' + re.sub(r'\\{\w+\\}', '[^/]+', re.escape(template)) + '$'
+        )
+        for method, spec in methods.items():
+            parameters = spec.get('parameters') or []
+            operations[(method.upper(), template)] = {
+                'name': spec.get('operationId') or f'{method} {template}',
+                'auth': bool(spec.get('security')),
+                'query': {
+                    parameter['name'] for parameter in parameters
+                    if parameter.get('in') == 'query'
+                },
+                'statuses': {
+                    int(code) for code in spec.get('responses', {})
+                    if str(code).isdigit()
+                },
+                'pattern': pattern,
+            }
+    return operations
+
+
+def match_operation(operations, method, path):
+    """Операция схемы для запроса; конкретные пути важнее шаблонных."""
+    path = urlsplit(path).path
+    candidates = sorted(
+        (key for key in operations if key[0] == method),
+        key=lambda key: key[1].count('{'),
+    )
+    for key in candidates:
+        if operations[key]['pattern'].match(path):
+            return operations[key]
+    return None
+
+
+class Recorder:
+    """Задержки, ошибки и статусы ответов по операциям."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+        self.undeclared = Counter()
+
+    def add(self, name, status, elapsed, declared=()):
+        self.statuses[name][str(status or 'connection_error')] += 1
+        if status is None or status >= 400:
+            self.errors[name] += 1
+        else:
+            self.latencies[name].append(elapsed)
+        if status is not None and declared and status not in declared:
+            self.undeclared[name] += 1
+
+    def report(self, elapsed):
+        report = {}
+        for name in sorted(self.statuses):
+            report[name] = summarize(
+                self.latencies[name], self.errors[name], elapsed
+            )
+            report[name]['statuses'] = dict(self.statuses[name])
+            report[name]['undeclared_statuses'] = self.undeclared[name]
+        return report
+
+
+async def timed_request(connection, recorder, operation, method, path,
+                        headers=None, body=b''):
+    """Запрос с записью результата; при сбое соединения статус None."""
+    name = operation['name'] if operation else f'{method} {path}'
+    declared = operation['statuses'] if operation else ()
+    started = time.perf_counter()
+    try:
+        status, _, content = await connection.request(
+            method, path, headers, body
+        )
+    except (OSError, ConnectionError, asyncio.IncompleteReadError):
+        connection.close()
+        recorder.add(name, None, 0)
+        return None, b''
+    recorder.add(name, status, time.perf_counter() - started, declared)
+    return status, content
+
+
+def parse_access_log(lines, prefix='/api/'):
+    """Безопасные запросы к API из access.log nginx: (время, метод, путь)."""
+    for line in lines:
+        match = ACCESS_LOG_LINE.search(line)
+        if (
+            match is None or match['method'] not in SAFE_METHODS
+            or not match['path'].startswith(prefix)
+        ):
+            continue
+        moment = datetime.strptime(match['time'], '%d/%b/%Y:%H:%M:%S %z')
+        yield moment.timestamp(), match['method'], match['path']
+
+
+async def replay(base, entries, concurrency, operations, recorder,
+                 headers=None, speed=0):
+    """Повторить запросы из лога; speed > 0 сохраняет исходный темп."""
+    parts = urlsplit(base)
+    queue = asyncio.Queue()
+    for entry in entries:
+        queue.put_nowait(entry)
+    if queue.empty():
+        return 0
+    first = entries[0][0]
+    started = time.monotonic()
+
+    async def worker():
+        connection = Connection(parts.hostname, parts.port or 80)
+        while not queue.empty():
+            moment, method, path = queue.get_nowait()
+            if speed:
+                delay = (moment - first) / speed - (
+                    time.monotonic() - started
+                )
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            operation = match_operation(operations, method, path)
+            await timed_request(
+                connection, recorder, operation, method, path, headers
+            )
+        connection.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.monotonic() - started
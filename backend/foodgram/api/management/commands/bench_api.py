@@ -0,0 +1,114 @@
+import json
+import subprocess
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.loadtest import percentile
+from recipes.management.commands.generate_data import SYNTHETIC_DOMAIN
+from recipes.models import Tag
+from users.models import User
+
+
+def endpoints(viewer):
+    """Ключевые эндпоинты; id подставляются из текущего набора данных."""
+    recipe = viewer.recipes.first() or User.objects.first().recipes.first()
+    slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+    tags = '&'.join(f'tags={slug}' for slug in slugs)
+    return {
+        'recipe_list': '/api/recipes/?limit=6',
+        'recipe_list_compact': '/api/recipes/?limit=6&profile=compact',
+        'recipe_list_tags': f'/api/recipes/?limit=6&{tags}',
+        'recipe_list_favorited': '/api/recipes/?limit=6&is_favorited=1',
+        'recipe_list_author': f'/api/recipes/?limit=6&author={viewer.pk}',
+        'recipe_detail': f'/api/recipes/{recipe.pk}/' if recipe else None,
+        'subscriptions': '/api/users/subscriptions/?limit=6&recipes_limit=3',
+        'download_shopping_cart': '/api/recipes/download_shopping_cart/',
+        'ingredient_search': '/api/ingredients/?name=сах',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводимый замер ключевых эндпоинтов на синтетических данных '
+        'нескольких размеров. Результат - JSON с перцентилями и числом '
+        'SQL-запросов. Удаляет ранее сгенерированные синтетические данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[100, 1000],
+            help='Число синтетических пользователей для каждого прогона'
+        )
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def _measure(self, client, url, repeat):
+        timings, queries, status = [], 0, None
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+            queries = len(captured)
+            status = response.status_code
+        return {
+            'status': status,
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        }
+
+    def _run_size(self, size, options):
+        call_command(
+            'generate_data', users=size, seed=options['seed'], clear=True,
+            stdout=self.stderr,
+        )
+        viewer = User.objects.filter(
+            email__endswith=f'@{SYNTHETIC_DOMAIN}'
+        ).annotate(
+            activity=(
+                Count('shop_user', distinct=True)
+                + Count('follower', distinct=True)
+            )
+        ).order_by('-activity').first()
+        client = APIClient()
+        client.force_authenticate(viewer)
+        results = {}
+        for name, url in endpoints(viewer).items():
+            if url is None:
+                continue
+            results[name] = self._measure(client, url, options['repeat'])
+            self.stderr.write(f'{size} {name}: {results[name]}')
+        return {'users': size, 'endpoints': results}
+
+    def handle(self, *args, **options):
+        try:
+            revision = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=False,
+            ).stdout.strip()
+        except OSError:
+            revision = ''
+        report = {
+            'started': timezone.now().isoformat(),
+            'revision': revision,
+            'vendor': connection.vendor,
+            'seed': options['seed'],
+            'runs': [
+                self._run_size(size, options) for size in options['sizes']
+            ],
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
@@ -0,0 +1,61 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from api.loadtest import percentile
+from foodgram.instrumentation import collect
+
+MODES = {
+    'per_request': 0,
+    'persistent': 600,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер задержки запроса с новым соединением к БД на каждый запрос '
+        'и с постоянными соединениями (CONN_MAX_AGE / пул).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+
+    def _run(self, connection, count):
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        original_max_age = connection.settings_dict['CONN_MAX_AGE']
+        report = {'vendor': connection.vendor}
+        try:
+            for mode, max_age in MODES.items():
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                timings = self._run(connection, options['requests'])
+                report[mode] = {
+                    'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+                    'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+                    'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+                }
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = original_max_age
+            connection.close()
+        report['saved_per_request_ms'] = round(
+            report['per_request']['mean_ms']
+            - report['persistent']['mean_ms'], 3
+        )
+        report['metrics'] = collect()
+        self.stdout.write(json.dumps(report, indent=2))
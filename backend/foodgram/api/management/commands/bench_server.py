@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.loadtest import hammer
+
+DEFAULT_PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/?limit=6',
+    '/api/recipes/?limit=6&profile=compact',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение пропускной способности WSGI и ASGI серверов '
+        'на read-only эндпоинтах при высокой конкурентности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', action='append', required=True,
+            help='label=http://host:port, например wsgi=http://127.0.0.1:8000'
+        )
+        parser.add_argument('--path', action='append')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[10, 100, 500]
+        )
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--token')
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        results = []
+        for server in options['server']:
+            label, _, base = server.partition('=')
+            for path in options['path'] or DEFAULT_PATHS:
+                for concurrency in options['concurrency']:
+                    summary = asyncio.run(hammer(
+                        base.rstrip('/') + path, concurrency,
+                        options['requests'], headers
+                    ))
+                    summary.update(
+                        server=label, path=path, concurrency=concurrency
+                    )
+                    results.append(summary)
+                    self.stderr.write(
+                        f'{label} {path} c={concurrency}: '
+                        f'{summary["rps"]} rps, p99 {summary["p99_ms"]} ms'
+                    )
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
@@ -0,0 +1,284 @@
+import tempfile
+from collections import defaultdict
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.query_budgets import QUERY_BUDGETS
+from api.urls import router, urlpatterns
+from monitoring.stack import call_site
+from recipes import changes, similarity
+from recipes.management.commands.generate_data import SYNTHETIC_DOMAIN
+from recipes.models import Change, Ingredient, Recipe, Tag
+from recipes.pantry_index import pantry_index
+from recipes.tag_index import tag_index
+from users.models import Follow, User
+
+PASSWORD = 'Budget-check-2022'
+PNG_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1Pe'
+    'AAAADElEQVR4nGNgYGAAAAAEAAH2FzhVAAAAAElFTkSuQmCC'
+)
+# Порядок выполнения: чтение, затем запись, удаление созданного в конце
+METHOD_ORDER = ('get', 'post', 'patch', 'delete')
+
+
+class QueryLog:
+    """Execute wrapper: SQL запроса вместе с местом вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, call_site(skip=(__file__, 'manage.py'))))
+        return execute(sql, params, many, context)
+
+
+class Scenario:
+    """Данные для запросов к каждому маршруту на текущем наборе данных."""
+
+    def __init__(self, size):
+        self.size = size
+        self.viewer = User.objects.filter(
+            email__endswith=f'@{SYNTHETIC_DOMAIN}'
+        ).annotate(
+            activity=(
+                Count('shop_user', distinct=True)
+                + Count('follower', distinct=True)
+            )
+        ).order_by('-activity').first()
+        self.viewer.set_password(PASSWORD)
+        self.viewer.save(update_fields=['password'])
+        self.other = User.objects.exclude(pk=self.viewer.pk).exclude(
+            following__user=self.viewer
+        ).first()
+        self.recipe = Recipe.objects.exclude(
+            fav_recipe__user=self.viewer
+        ).exclude(shop_recipe__user=self.viewer).first()
+        self.created_recipe = None
+        # Изменения после токена: рецепты и все связи зрителя
+        # Пакетные связи: число id растет с набором данных
+        bulk_recipes = {'ids': list(Recipe.objects.exclude(
+            fav_recipe__user=self.viewer
+        ).exclude(shop_recipe__user=self.viewer).exclude(
+            pk=self.recipe.pk
+        ).values_list('pk', flat=True)[:size])}
+        # Самый активный зритель может быть подписан на всех авторов:
+        # подписки на авторов пакета снимаются, кроме одной для списка
+        # подписок
+        kept = Follow.objects.filter(user=self.viewer).values_list(
+            'author_id', flat=True
+        ).first()
+        bulk_authors = {'ids': list(User.objects.exclude(
+            pk__in=[self.viewer.pk, self.other.pk, kept]
+        ).values_list('pk', flat=True)[:size // 2])}
+        Follow.objects.filter(
+            user=self.viewer, author__in=bulk_authors['ids']
+        ).delete()
+        self.bodies = {
+            'recipes-favorite-bulk': bulk_recipes,
+            'recipes-shopping-cart-bulk': bulk_recipes,
+            'user-subscribe-bulk': bulk_authors,
+            'batch': {'requests': [
+                {'method': 'GET', 'url': reverse('api:tags-list')},
+                {'method': 'GET', 'url': reverse('api:user-me')},
+            ]},
+        }
+        # Токен указывает на запись журнала: в пустом журнале ее нет
+        changes.record(Change.FOLLOW, [self.other.pk], self.viewer.pk)
+        self.query_strings = {
+            'recipes-changes': f'?since={changes.encode(changes.head())}',
+        }
+        changes.record(
+            Change.RECIPE, Recipe.objects.values_list('pk', flat=True)[:size]
+        )
+        for kind in (Change.FAVORITE, Change.SHOPPING_CART):
+            changes.record(kind, [self.recipe.pk], self.viewer.pk)
+        changes.record(Change.FOLLOW, [self.other.pk], self.viewer.pk)
+
+    def recipe_payload(self, name):
+        return {
+            'tags': list(Tag.objects.values_list('pk', flat=True)[:2]),
+            'ingredients': [
+                {'id': pk, 'amount': 10}
+                for pk in Ingredient.objects.values_list('pk', flat=True)[:3]
+            ],
+            'name': name,
+            'image': PNG_IMAGE,
+            'text': 'Проверка бюджета запросов',
+            'cooking_time': 15,
+        }
+
+    def request(self, route, method):
+        """URL и тело запроса для маршрута и метода."""
+        kwargs = {}
+        data = self.bodies.get(route)
+        if route in ('tags-detail', 'ingredients-detail'):
+            model = Tag if route == 'tags-detail' else Ingredient
+            kwargs['pk'] = model.objects.values_list('pk', flat=True)[0]
+        elif route == 'recipes-detail':
+            kwargs['pk'] = (
+                self.recipe.pk if method == 'get' else self.created_recipe
+            )
+            if method == 'patch':
+                data = self.recipe_payload(f'Бюджет {self.size} изменен')
+        elif route in (
+            'recipes-favorite', 'recipes-shopping-cart', 'recipes-similar'
+        ):
+            kwargs['pk'] = self.recipe.pk
+        elif route in ('user-detail', 'user-subscribe'):
+            kwargs['id'] = self.other.pk
+        elif route == 'recipes-list' and method == 'post':
+            data = self.recipe_payload(f'Бюджет {self.size}')
+        elif route == 'recipes-match':
+            data = {'ingredients': list(
+                Ingredient.objects.values_list('pk', flat=True)[:10]
+            )}
+        elif route == 'user-list' and method == 'post':
+            data = {
+                'email': f'budget{self.size}@{SYNTHETIC_DOMAIN}',
+                'username': f'budget{self.size}',
+                'first_name': 'Budget',
+                'last_name': 'Check',
+                'password': PASSWORD,
+            }
+        elif route == 'user-set-password':
+            data = {'current_password': PASSWORD, 'new_password': PASSWORD}
+        url = reverse(f'api:{route}', kwargs=kwargs)
+        return url + self.query_strings.get(route, ''), data
+
+
+def route_names():
+    names = [pattern.name for pattern in router.urls]
+    names += [
+        pattern.name for pattern in urlpatterns
+        if getattr(pattern, 'name', None)
+    ]
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка, что число SQL-запросов каждого эндпоинта API не зависит '
+        'от объема данных и укладывается в бюджет из api/query_budgets.py. '
+        'Все изменения в БД откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs=2, default=[10, 60],
+            help='Два размера синтетического набора данных (пользователей)'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _plan(self, failures):
+        plan = []
+        for route in route_names():
+            if route not in QUERY_BUDGETS:
+                failures.append((route, None, 'нет записи в QUERY_BUDGETS'))
+                continue
+            for method in (QUERY_BUDGETS[route] or {}):
+                plan.append((route, method))
+        return sorted(
+            plan, key=lambda item: (
+                METHOD_ORDER.index(item[1]),
+                item[0] == 'recipes-detail',
+            )
+        )
+
+    def _run(self, scenario, route, method):
+        client = APIClient()
+        client.force_authenticate(scenario.viewer)
+        url, data = scenario.request(route, method)
+        # Индексы в памяти перестраиваются раз на версию данных, не на запрос
+        tag_index.ensure_fresh()
+        pantry_index.ensure_fresh()
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = getattr(client, method)(url, data, format='json')
+        if route == 'recipes-list' and method == 'post':
+            scenario.created_recipe = response.data.get('id')
+        return response.status_code, log.queries
+
+    def _measure(self, size, plan, options):
+        call_command(
+            'generate_data', users=size, seed=options['seed'], clear=True,
+            stdout=self.stderr,
+        )
+        similarity.rebuild(similarity.RecipeVectors())
+        # Журнал индексов незафиксированной транзакции не применяется
+        tag_index.reset()
+        pantry_index.reset()
+        scenario = Scenario(size)
+        return {
+            (route, method): self._run(scenario, route, method)
+            for route, method in plan
+        }
+
+    def _check(self, route, method, runs, failures):
+        budget = QUERY_BUDGETS[route][method]
+        (small_status, small), (large_status, large) = runs
+        if max(small_status, large_status) >= 400:
+            failures.append((
+                route, method, f'статус {small_status}/{large_status}'
+            ))
+        if len(small) != len(large):
+            failures.append((
+                route, method,
+                f'число запросов растет с данными: {len(small)} -> '
+                f'{len(large)}', large
+            ))
+        elif len(large) > budget:
+            failures.append((
+                route, method,
+                f'{len(large)} запросов при бюджете {budget}', large
+            ))
+
+    def _report(self, failure):
+        route, method, reason, *queries = failure
+        self.stderr.write(self.style.ERROR(f'{route} {method}: {reason}'))
+        if not queries:
+            return
+        by_site = defaultdict(list)
+        for sql, site in queries[0]:
+            by_site['\n'.join(site)].append(sql)
+        for site, statements in sorted(
+            by_site.items(), key=lambda item: -len(item[1])
+        ):
+            self.stderr.write(f'  {len(statements)} x из\n    ' + (
+                site.replace('\n', '\n    ') or '<вне кода проекта>'
+            ))
+            self.stderr.write(f'    {statements[0]}')
+
+    def handle(self, *args, **options):
+        failures = []
+        plan = self._plan(failures)
+        media = tempfile.TemporaryDirectory()
+        with (
+            media,
+            override_settings(MEDIA_ROOT=media.name),
+            transaction.atomic(),
+        ):
+            results = [
+                self._measure(size, plan, options)
+                for size in options['sizes']
+            ]
+            transaction.set_rollback(True)
+        for route, method in plan:
+            runs = [result[(route, method)] for result in results]
+            self._check(route, method, runs, failures)
+            self.stdout.write(
+                f'{route} {method}: '
+                f'{" / ".join(str(len(queries)) for _, queries in runs)} '
+                f'(бюджет {QUERY_BUDGETS[route][method]})'
+            )
+        for failure in failures:
+            self._report(failure)
+        if failures:
+            raise CommandError(f'Нарушений бюджета: {len(failures)}')
+        self.stdout.write(self.style.SUCCESS('Бюджет запросов соблюден'))
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import os
+import random
+import secrets
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import (Connection, Recorder, load_operations,
+                          match_operation, parse_access_log, replay,
+                          timed_request)
+
+DEFAULT_SCHEMA = os.path.join(
+    os.path.dirname(os.path.dirname(settings.BASE_DIR)),
+    'docs', 'openapi-schema.yml'
+)
+# Сценарий: вес и шаги (метод, путь из схемы, query-параметры).
+# Сценарии с записью возвращают данные в исходное состояние.
+SCENARIOS = {
+    'browse': (30, (
+        ('GET', '/api/tags/', None),
+        ('GET', '/api/recipes/', lambda ctx: {
+            'limit': 6, 'page': ctx['page']
+        }),
+    )),
+    'filter_by_tags': (20, (
+        ('GET', '/api/recipes/', lambda ctx: {
+            'limit': 6, 'tags': ctx['tags']
+        }),
+    )),
+    'open_recipe': (20, (
+        ('GET', '/api/recipes/{id}/', None),
+        ('GET', '/api/recipes/', lambda ctx: {
+            'limit': 6, 'author': ctx['author']
+        }),
+    )),
+    'favorite': (10, (
+        ('POST', '/api/recipes/{id}/favorite/', None),
+        ('GET', '/api/recipes/', lambda ctx: {
+            'limit': 6, 'is_favorited': 1
+        }),
+        ('DELETE', '/api/recipes/{id}/favorite/', None),
+    )),
+    'shopping_cart': (8, (
+        ('POST', '/api/recipes/{id}/shopping_cart/', None),
+        ('GET', '/api/recipes/', lambda ctx: {
+            'limit': 6, 'is_in_shopping_cart': 1
+        }),
+        ('DELETE', '/api/recipes/{id}/shopping_cart/', None),
+    )),
+    'download_shopping_list': (4, (
+        ('POST', '/api/recipes/{id}/shopping_cart/', None),
+        ('GET', '/api/recipes/download_shopping_cart/', None),
+        ('DELETE', '/api/recipes/{id}/shopping_cart/', None),
+    )),
+    'subscribe': (8, (
+        ('POST', '/api/users/{id}/subscribe/', None),
+        ('GET', '/api/users/subscriptions/', lambda ctx: {
+            'limit': 6, 'recipes_limit': 3
+        }),
+        ('DELETE', '/api/users/{id}/subscribe/', None),
+    )),
+}
+SAMPLE_CONTEXT = {'page': 1, 'tags': ['breakfast'], 'author': 1}
+
+
+class Catalog:
+    """Рецепты, доступные виртуальному пользователю без побочных эффектов."""
+
+    def __init__(self, recipes, tags, pages, me=None):
+        self.recipes = [
+            recipe for recipe in recipes
+            if not recipe.get('is_favorited')
+            and not recipe.get('is_in_shopping_cart')
+            and not recipe['author'].get('is_subscribed')
+            and recipe['author']['id'] != me
+        ] or recipes
+        self.tags = tags
+        self.pages = pages
+
+    def context(self, rng):
+        recipe = rng.choice(self.recipes)
+        return {
+            'recipe': recipe['id'],
+            'author': recipe['author']['id'],
+            'page': rng.randint(1, self.pages),
+            'tags': rng.sample(self.tags, min(len(self.tags), 2)),
+        }
+
+
+async def fetch_json(connection, path, headers=None, method='GET', data=None):
+    body = json.dumps(data).encode() if data is not None else b''
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    status, _, content = await connection.request(method, path, headers, body)
+    if status >= 400:
+        raise CommandError(f'{method} {path}: статус {status}')
+    return json.loads(content)
+
+
+async def prepare_user(connection, token, tags):
+    """Каталог рецептов с точки зрения пользователя с токеном."""
+    headers = {'Authorization': f'Token {token}'} if token else {}
+    me = None
+    if token:
+        me = (await fetch_json(connection, '/api/users/me/', headers))['id']
+    page = await fetch_json(connection, '/api/recipes/?limit=100', headers)
+    if not page['results']:
+        raise CommandError('В базе нет рецептов для нагрузки')
+    return headers, Catalog(
+        page['results'], tags, max(1, -(-page['count'] // 6)), me
+    )
+
+
+def fill_path(template, ctx):
+    target = ctx['author'] if template.startswith('/api/users/') else (
+        ctx['recipe']
+    )
+    return template.replace('{id}', str(target))
+
+
+async def virtual_user(base, scenarios, weights, headers, catalog, rng,
+                       operations, recorder, deadline, counts):
+    parts = urlsplit(base)
+    connection = Connection(parts.hostname, parts.port or 80)
+    while time.monotonic() < deadline:
+        name = rng.choices(list(scenarios), weights)[0]
+        ctx = catalog.context(rng)
+        for method, template, query in scenarios[name]:
+            path = fill_path(template, ctx)
+            if query:
+                path += '?' + urlencode(query(ctx), doseq=True)
+            await timed_request(
+                connection, recorder, operations[(method, template)],
+                method, path, headers
+            )
+        counts[name] += 1
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера по сценариям, построенным на '
+        'операциях из docs/openapi-schema.yml, или повтор GET-запросов из '
+        'access.log nginx. Отчет - JSON с пропускной способностью, '
+        'перцентилями задержки и долей ошибок по каждой операции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', default='http://127.0.0.1:8000')
+        parser.add_argument('--schema', default=DEFAULT_SCHEMA)
+        parser.add_argument(
+            '--users', type=int, default=50,
+            help='Число одновременных виртуальных пользователей'
+        )
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument(
+            '--token', action='append', default=[],
+            help=(
+                'Токен авторизации. Каждому виртуальному пользователю нужен '
+                'свой: недостающие учетные записи регистрируются'
+            )
+        )
+        parser.add_argument(
+            '--credentials', action='append', default=[],
+            help='email:password для получения токена'
+        )
+        parser.add_argument(
+            '--scenario', action='append',
+            help='Запустить только указанные сценарии'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--replay', help='Путь к access.log nginx для повтора запросов'
+        )
+        parser.add_argument(
+            '--speed', type=float, default=0,
+            help='Множитель темпа при повторе; 0 - без пауз'
+        )
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def _scenarios(self, operations, names, authorized):
+        scenarios, weights = {}, []
+        for name in names or SCENARIOS:
+            if name not in SCENARIOS:
+                raise CommandError(f'Неизвестный сценарий {name}')
+            weight, steps = SCENARIOS[name]
+            needs_auth = False
+            for method, template, query in steps:
+                operation = operations.get((method, template))
+                if operation is None:
+                    raise CommandError(
+                        f'{name}: операции {method} {template} нет в схеме'
+                    )
+                unknown = set(query(SAMPLE_CONTEXT) if query else ()) - (
+                    operation['query']
+                )
+                if unknown:
+                    raise CommandError(
+                        f'{name}: параметров {", ".join(sorted(unknown))} '
+                        f'нет в схеме {method} {template}'
+                    )
+                needs_auth = needs_auth or operation['auth']
+            if needs_auth and not authorized:
+                self.stderr.write(f'{name}: пропущен, нужен --token')
+                continue
+            scenarios[name] = steps
+            weights.append(weight)
+        if not scenarios:
+            raise CommandError('Нет сценариев для запуска')
+        return scenarios, weights
+
+    async def _login(self, connection, credentials):
+        email, _, password = credentials.partition(':')
+        response = await fetch_json(
+            connection, '/api/auth/token/login/', method='POST',
+            data={'email': email, 'password': password},
+        )
+        return response['auth_token']
+
+    async def _register(self, connection, count):
+        """Токены новых учетных записей для виртуальных пользователей."""
+        run, password = secrets.token_hex(4), secrets.token_urlsafe(16)
+        tokens = []
+        for number in range(count):
+            # Логин совпадает с почтой: djoser 2.3 ищет по нему при входе
+            email = f'loadtest-{run}-{number}@example.com'
+            await fetch_json(
+                connection, '/api/users/', method='POST', data={
+                    'email': email, 'username': email,
+                    'first_name': 'Load', 'last_name': 'Test',
+                    'password': password,
+                },
+            )
+            tokens.append(
+                await self._login(connection, f'{email}:{password}')
+            )
+        return tokens
+
+    async def _scenario_run(self, options, operations):
+        parts = urlsplit(options['base'])
+        connection = Connection(parts.hostname, parts.port or 80)
+        tokens = list(options['token'])
+        for credentials in options['credentials']:
+            tokens.append(await self._login(connection, credentials))
+        if tokens and len(tokens) < options['users']:
+            # С общим токеном шаги записи разных пользователей конфликтуют
+            tokens += await self._register(
+                connection, options['users'] - len(tokens)
+            )
+        scenarios, weights = self._scenarios(
+            operations, options['scenario'], bool(tokens)
+        )
+        tags = [
+            tag['slug']
+            for tag in await fetch_json(connection, '/api/tags/')
+        ]
+        users = [
+            await prepare_user(connection, token, tags)
+            for token in tokens or [None]
+        ]
+        connection.close()
+        recorder = Recorder()
+        counts = dict.fromkeys(scenarios, 0)
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+        deadline = started + options['duration']
+        await asyncio.gather(*(
+            virtual_user(
+                options['base'], scenarios, weights,
+                *users[number if tokens else 0],
+                random.Random(rng.random()), operations, recorder,
+                deadline, counts,
+            )
+            for number in range(options['users'])
+        ))
+        elapsed = time.monotonic() - started
+        return {'scenarios': counts, 'operations': recorder.report(elapsed)}
+
+    async def _replay_run(self, options, operations):
+        with open(options['replay'], encoding='utf-8') as log:
+            entries = list(parse_access_log(log))
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"][0]}'
+        recorder = Recorder()
+        elapsed = await replay(
+            options['base'], entries, options['users'], operations,
+            recorder, headers, options['speed'],
+        )
+        return {
+            'replayed': len(entries),
+            'unmatched': sum(
+                match_operation(operations, method, path) is None
+                for _, method, path in entries
+            ),
+            'operations': recorder.report(elapsed),
+        }
+
+    def handle(self, *args, **options):
+        operations = load_operations(options['schema'])
+        run = self._replay_run if options['replay'] else self._scenario_run
+        report = asyncio.run(run(options, operations))
+        report.update(base=options['base'], users=options['users'])
+        for name, summary in report['operations'].items():
+            self.stderr.write(
+                f'{name}: {summary["rps"]} rps, p95 {summary["p95_ms"]} ms, '
+                f'ошибки {summary["error_rate"]:.2%}'
+            )
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
@@ -8,3 +8,8 @@ class RecipeAuthorOrAdminPermission(permissions.BasePermission):
             or obj.author == request.user
             or request.user.is_admin
         )
+
+
+class AdminPermission(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return bool(request.user.is_authenticated and request.user.is_admin)
@@ -0,0 +1,45 @@
+"""Допустимое число SQL-запросов на эндпоинт (см. check_query_budget).
+
+Ключ - имя маршрута, значение - бюджет по HTTP-методам. None означает,
+что маршрут сознательно не проверяется. Новый маршрут без записи здесь
+считается ошибкой проверки.
+"""
+QUERY_BUDGETS = {
+    'tags-list': {'get': 1},
+    'tags-detail': {'get': 1},
+    'ingredients-list': {'get': 1},
+    'ingredients-detail': {'get': 1},
+    'recipes-list': {'get': 4, 'post': 21},
+    # Удаление рецепта ставит в очередь пересчета рецепты, у которых он
+    # среди похожих: у нового рецепта их нет, бюджет учитывает запись
+    'recipes-detail': {'get': 4, 'patch': 21, 'delete': 17},
+    'recipes-match': {'post': 6},
+    'recipes-similar': {'get': 1},
+    'recipes-changes': {'get': 9},
+    # Пакетный импорт для администратора: запросов столько, сколько пакетов
+    'recipes-import': None,
+    # Сумма бюджетов подзапросов сценария: список тегов и профиль
+    'batch': {'post': 2},
+    'recipes-favorite': {'post': 6, 'delete': 7},
+    'recipes-shopping-cart': {'post': 4, 'delete': 5},
+    # Пакетные связи: блокировка целей, проверка связей, запись, журнал
+    # и счетчики статистики
+    'recipes-favorite-bulk': {'post': 8, 'delete': 7},
+    'recipes-shopping-cart-bulk': {'post': 6, 'delete': 5},
+    'download_shopping_cart': {'get': 2},
+    'user-list': {'get': 2, 'post': 6},
+    'user-detail': {'get': 2},
+    'user-me': {'get': 1},
+    'user-subscriptions': {'get': 3},
+    'user-subscribe': {'post': 7, 'delete': 7},
+    'user-subscribe-bulk': {'post': 8, 'delete': 7},
+    'user-set-password': {'post': 1},
+    # Письма и подтверждения djoser в проекте не используются
+    'user-activation': None,
+    'user-resend-activation': None,
+    'user-reset-password': None,
+    'user-reset-password-confirm': None,
+    'user-reset-username': None,
+    'user-reset-username-confirm': None,
+    'user-set-username': None,
+}
@@ -1,17 +1,53 @@
 import base64
 
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.base import ContentFile
 from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
 from rest_framework import serializers
 
+from recipes import changes
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            RecipeSimilarity, ShoppingCart, Tag)
 from users.models import Follow, User
 
 
+class SparseFieldsMixin:
+    """Ограничение набора полей через ?fields=, ?omit= и ?profile=."""
+    field_profiles = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request'))
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+    @staticmethod
+    def _split(value):
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Множество полей, которые нужно отдать в ответе."""
+        names = set(cls.Meta.fields)
+        params = getattr(
+            request, 'query_params', getattr(request, 'GET', None)
+        )
+        if not params:
+            return names
+        profile = params.get('profile')
+        if profile in cls.field_profiles:
+            names &= set(cls.field_profiles[profile])
+        if params.get('fields'):
+            names &= cls._split(params['fields'])
+        if params.get('omit'):
+            names -= cls._split(params['omit'])
+        return names
+
+
 class UserSerializer(BaseUserSerializer):
     """Общий сериализатор модели User."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
@@ -31,6 +67,9 @@ class UserSerializer(BaseUserSerializer):
         user = self.context['request'].user
         if user.is_anonymous:
             return False
+        subscribed_ids = self.context.get('subscribed_ids')
+        if subscribed_ids is not None:
+            return obj.id in subscribed_ids
         return Follow.objects.filter(
             user=user,
             author=obj
@@ -67,10 +106,47 @@ class UserCreateResponseSerializer(UserSerializer):
         )
 
 
-class UserSubscriptionSerializer(UserSerializer):
+def recipes_limit(params):
+    """Число рецептов автора в подписках из recipes_limit или None."""
+    value = params.get('recipes_limit')
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise serializers.ValidationError('Ошибка в формате recipes_limit')
+    return limit
+
+
+def author_recipes(limit=None):
+    """Рецепты авторов, не больше limit последних у каждого."""
+    ordering = ('-pubdate', '-pk')
+    queryset = Recipe.objects.order_by(*ordering)
+    if limit is None:
+        return queryset
+    return queryset.filter(pk__in=Subquery(
+        Recipe.objects.filter(author_id=OuterRef('author_id')).order_by(
+            *ordering
+        ).values('pk')[:limit]
+    ))
+
+
+class UserSubscriptionSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор для отображения пользователей в подписках."""
     recipes = serializers.SerializerMethodField(read_only=True)
     recipes_count = serializers.SerializerMethodField(read_only=True)
+    field_profiles = {
+        'compact': (
+            'id',
+            'username',
+            'first_name',
+            'last_name',
+            'is_subscribed',
+            'recipes_count'
+        ),
+    }
 
     class Meta:
         model = User
@@ -87,21 +163,16 @@ class UserSubscriptionSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit is not None:
-            try:
-                limit = int(recipes_limit)
-            except (TypeError, ValueError):
-                raise serializers.ValidationError(
-                    'Ошибка в формате recipes_limit'
-                )
-            recipes = Recipe.objects.filter(author=obj)[:limit]
-        else:
-            recipes = Recipe.objects.filter(author=obj)
+        limit = recipes_limit(request.query_params)
+        recipes = obj.recipes.all()
+        if limit is not None:
+            recipes = recipes[:limit]
         return ShoppingFavoriteSerializer(
             recipes, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_total'):
+            return obj.recipes_total
         return obj.recipes.count()
 
 
@@ -168,7 +239,7 @@ class RecipeIngredientGetSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeGetSerializer(serializers.ModelSerializer):
+class RecipeGetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор модели Recipe (метод GET)."""
     tags = CustomTagsField()
     author = UserSerializer(read_only=True,)
@@ -179,6 +250,17 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    field_profiles = {
+        'compact': (
+            'id',
+            'tags',
+            'name',
+            'image',
+            'cooking_time',
+            'is_favorited',
+            'is_in_shopping_cart'
+        ),
+    }
 
     class Meta:
         model = Recipe
@@ -196,6 +278,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         user = self.context['request'].user
         if not user.is_anonymous:
             return bool(Favorite.objects.filter(
@@ -205,6 +289,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         user = self.context['request'].user
         if not user.is_anonymous:
             return bool(ShoppingCart.objects.filter(
@@ -305,3 +391,84 @@ class ShoppingFavoriteSerializer(serializers.ModelSerializer):
             'image',
             'cooking_time'
         )
+
+
+class SimilarRecipeSerializer(serializers.ModelSerializer):
+    """Сериализатор похожего рецепта с косинусной близостью."""
+
+    id = serializers.IntegerField(source='similar.id')
+    name = serializers.CharField(source='similar.name')
+    image = serializers.ImageField(source='similar.image')
+    cooking_time = serializers.IntegerField(source='similar.cooking_time')
+
+    class Meta:
+        model = RecipeSimilarity
+        fields = ('id', 'name', 'image', 'cooking_time', 'score')
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Параметры запроса изменений для синхронизации."""
+    since = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=changes.MAX_LIMIT, required=False,
+        default=changes.LIMIT
+    )
+
+    def validate_since(self, value):
+        try:
+            return changes.decode(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error))
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id для пакетного изменения связей."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Подзапрос пакета: метод, путь от корня сайта и тело."""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+    )
+    url = serializers.RegexField(r'^/api/', max_length=2000)
+    body = serializers.JSONField(required=False)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('method'), str):
+            data = dict(data, method=data['method'].upper())
+        return super().to_internal_value(data)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=BatchItemSerializer(),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS,
+    )
+
+
+class PantryMatchSerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+    tags = serializers.ListField(
+        child=serializers.SlugField(), required=False, default=list
+    )
+    tags_match = serializers.ChoiceField(
+        choices=('any', 'all'), required=False, default='any'
+    )
+    max_cooking_time = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, required=False, default=10
+    )
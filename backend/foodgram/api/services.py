@@ -1,11 +1,13 @@
 from django.db.models import Sum
 from django.http import HttpResponse
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 
 from recipes.models import RecipeIngredient, ShoppingCart
 
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def download_shopping_cart(request):
     """Метод загрузки списка покупок."""
     user = request.user
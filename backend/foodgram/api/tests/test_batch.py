@@ -0,0 +1,47 @@
+"""Пакетные запросы: POST /api/batch/."""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingCart
+from users.models import User
+
+
+class BatchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='x'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Рецепт', image='recipes/test.png',
+            text='Текст', cooking_time=10,
+        )
+
+    def post(self, *requests):
+        return self.client.post(
+            reverse('api:batch'), {'requests': list(requests)},
+            format='json',
+        )
+
+    def test_failing_subrequest_does_not_fail_batch(self):
+        with self.assertLogs('api.batch', 'ERROR'):
+            response = self.post(
+                {'method': 'GET', 'url': '/api/users/me/'},
+                {'method': 'GET', 'url': '/api/recipes/?is_favorited=x'},
+                {
+                    'method': 'POST',
+                    'url': f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        statuses = [item['status'] for item in response.data['responses']]
+        self.assertEqual(statuses, [200, 500, 201])
+        self.assertEqual(
+            response.data['responses'][0]['body']['username'], 'viewer'
+        )
+        self.assertTrue(ShoppingCart.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).exists())
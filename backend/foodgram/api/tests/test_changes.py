@@ -0,0 +1,52 @@
+"""Синхронизация офлайн-клиента: GET /api/recipes/changes/."""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingCart
+from users.models import User
+
+
+class RecipeChangesTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='x'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('api:recipes-changes')
+
+    def create_recipe(self, name):
+        return Recipe.objects.create(
+            author=self.user, name=name, image='recipes/test.png',
+            text='Текст', cooking_time=10,
+        )
+
+    def test_list_filters_do_not_turn_live_recipes_into_tombstones(self):
+        since = self.client.get(self.url).data['next']
+        in_cart = self.create_recipe('В корзине')
+        outside = self.create_recipe('Вне корзины')
+        ShoppingCart.objects.create(user=self.user, recipe=in_cart)
+        for params in (
+            {'is_in_shopping_cart': 1}, {'is_in_shopping_cart': 0},
+            {'is_favorited': 1},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    self.url, {'since': since, **params}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['deleted_recipes'], [])
+                self.assertEqual(
+                    {recipe['id'] for recipe in response.data['recipes']},
+                    {in_cart.pk, outside.pk},
+                )
+
+    def test_deleted_recipe_is_reported(self):
+        since = self.client.get(self.url).data['next']
+        recipe = self.create_recipe('Удаленный')
+        recipe_id = recipe.pk
+        recipe.delete()
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual(response.data['deleted_recipes'], [recipe_id])
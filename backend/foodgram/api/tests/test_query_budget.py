@@ -0,0 +1,26 @@
+"""Бюджет SQL-запросов эндпоинтов API: команда check_query_budget."""
+import io
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.pantry_index import pantry_index
+from recipes.tag_index import tag_index
+
+
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        # Индексы в памяти процесса строятся по данным, которые откатятся
+        self.addCleanup(tag_index.reset)
+        self.addCleanup(pantry_index.reset)
+
+    def test_routes_fit_query_budgets(self):
+        stderr = io.StringIO()
+        try:
+            call_command(
+                'check_query_budget', sizes=[10, 20],
+                stdout=io.StringIO(), stderr=stderr,
+            )
+        except CommandError as error:
+            self.fail(f'{error}\n{stderr.getvalue()}')
@@ -0,0 +1,57 @@
+"""Пакетное изменение связей: POST и DELETE /api/recipes/favorite/."""
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+
+class BulkRelationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='viewer', email='viewer@example.com', password='x'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('api:recipes-favorite-bulk')
+        self.first, self.second = (
+            Recipe.objects.create(
+                author=self.user, name=name, image='recipes/test.png',
+                text='Текст', cooking_time=10,
+            )
+            for name in ('Первый', 'Второй')
+        )
+        Favorite.objects.create(user=self.user, recipe=self.first)
+
+    def test_add_classifies_ids(self):
+        missing = self.second.pk + 1
+        response = self.client.post(
+            self.url, {'ids': [self.first.pk, self.second.pk, missing]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'added': [self.second.pk],
+            'unchanged': [self.first.pk],
+            'rejected': [],
+            'not_found': [missing],
+        })
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_remove_classifies_ids(self):
+        missing = self.second.pk + 1
+        response = self.client.delete(
+            self.url, {'ids': [self.first.pk, self.second.pk, missing]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {
+            'removed': [self.first.pk],
+            'unchanged': [self.second.pk],
+            'not_found': [missing],
+        })
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from . import async_views
+from .batch import batch
 from .services import download_shopping_cart
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
@@ -15,6 +18,44 @@ router.register('users', UserViewSet)
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
-    path('recipes/download_shopping_cart/', download_shopping_cart),
-    path('', include(router.urls)),
+    path('batch/', batch, name='batch'),
+    path('recipes/download_shopping_cart/', download_shopping_cart,
+         name='download_shopping_cart'),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Раньше маршрутов роутера, чтобы GET попадал в async-обработчики
+    urlpatterns += [
+        path('tags/', async_views.read_only(
+            TagViewSet.as_view({'get': 'list'}), async_views.tag_list
+        )),
+        path('tags/<int:pk>/', async_views.read_only(
+            TagViewSet.as_view({'get': 'retrieve'}), async_views.tag_detail
+        )),
+        path('ingredients/', async_views.read_only(
+            IngredientViewSet.as_view({'get': 'list'}),
+            async_views.ingredient_list
+        )),
+        path('ingredients/<int:pk>/', async_views.read_only(
+            IngredientViewSet.as_view({'get': 'retrieve'}),
+            async_views.ingredient_detail
+        )),
+        path('recipes/', async_views.read_only(
+            RecipeViewSet.as_view({'get': 'list', 'post': 'create'}),
+            async_views.recipe_list
+        )),
+        path('recipes/<int:pk>/', async_views.read_only(
+            RecipeViewSet.as_view({
+                'get': 'retrieve',
+                'patch': 'partial_update',
+                'delete': 'destroy',
+            }),
+            async_views.recipe_detail
+        )),
+        path('users/subscriptions/', async_views.read_only(
+            UserViewSet.as_view({'get': 'subscriptions'}),
+            async_views.subscriptions
+        )),
+    ]
+
+urlpatterns.append(path('', include(router.urls)))
@@ -1,24 +1,75 @@
+from django.db.models import Count, Exists, OuterRef, Prefetch
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from .filters import IngredientFilter, RecipeFilter
+from .filters import (IngredientFilter, RecipeFilter, select_by_tags,
+                      uses_tag_index)
 from .paginators import CustomPagination
-from .permissions import RecipeAuthorOrAdminPermission
-from .serializers import (IngredientSerializer, RecipeGetSerializer,
-                          RecipePostSerializer, ShoppingFavoriteSerializer,
+from .permissions import AdminPermission, RecipeAuthorOrAdminPermission
+from .serializers import (BulkIdsSerializer, ChangesQuerySerializer,
+                          IngredientSerializer, PantryMatchSerializer,
+                          RecipeGetSerializer, RecipePostSerializer,
+                          ShoppingFavoriteSerializer, SimilarRecipeSerializer,
                           TagSerializer, UserSerializer,
-                          UserSubscriptionSerializer)
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+                          UserSubscriptionSerializer, author_recipes,
+                          recipes_limit)
+from recipes import changes, relations
+from recipes.imports import RecipeImporter
+from recipes.models import (Change, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, RecipeSimilarity, ShoppingCart,
+                            Tag)
+from recipes.pantry_index import pantry_index
+from recipes.tag_index import tag_index
 from users.models import Follow, User
 
+# Ошибок строк в ответе импорта, полный отчет пишет команда import_recipes
+IMPORT_ERRORS_LIMIT = 1000
+# Связи зрителя в ответе синхронизации: вид изменения, модель, поле
+SYNC_RELATIONS = {
+    'favorites': (Change.FAVORITE, Favorite, 'recipe_id'),
+    'shopping_cart': (Change.SHOPPING_CART, ShoppingCart, 'recipe_id'),
+    'subscriptions': (Change.FOLLOW, Follow, 'author_id'),
+}
 
-class UserViewSet(DjoserUserViewSet):
+
+def bulk_response(model, request):
+    """Пакетное добавление (POST) или удаление связей с целями ids."""
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = serializer.validated_data['ids']
+    if request.method == 'POST':
+        return Response(relations.add(model, request.user, ids))
+    return Response(relations.remove(model, request.user, ids))
+
+
+class SubscribedIdsMixin:
+    """Подписки зрителя одним запросом вместо запроса на каждого автора."""
+    subscribed_ids_actions = (
+        'list', 'retrieve', 'me', 'subscriptions', 'match', 'changes'
+    )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        if (
+            self.action in self.subscribed_ids_actions
+            and user.is_authenticated
+        ):
+            context['subscribed_ids'] = set(
+                Follow.objects.filter(user=user).values_list(
+                    'author_id', flat=True
+                )
+            )
+        return context
+
+
+class UserViewSet(SubscribedIdsMixin, DjoserUserViewSet):
     """Вьюсет для пользователей."""
     pagination_class = CustomPagination
 
@@ -72,6 +123,15 @@ class UserViewSet(DjoserUserViewSet):
             )
         return None
 
+    @action(permission_classes=[IsAuthenticated],
+            methods=['post', 'delete'],
+            detail=False,
+            url_path='subscribe',
+            url_name='subscribe-bulk')
+    def subscribe_bulk(self, request):
+        """Пакетная подписка (отписка) на пользователей."""
+        return bulk_response(Follow, request)
+
     @action(permission_classes=[IsAuthenticated],
             methods=['get'],
             detail=False)
@@ -79,13 +139,28 @@ class UserViewSet(DjoserUserViewSet):
         """Метод получения списка подписок."""
         user = request.user
         authors = User.objects.filter(following__user=user)
+        fields = UserSubscriptionSerializer.requested_fields(request)
+        if 'recipes_count' in fields:
+            authors = authors.annotate(recipes_total=Count('recipes'))
+        if 'recipes' in fields:
+            # Не больше recipes_limit рецептов на автора уже в SQL
+            limit = recipes_limit(request.query_params)
+            authors = authors.prefetch_related(Prefetch(
+                'recipes',
+                queryset=author_recipes(limit).only(
+                    'id', 'name', 'image', 'cooking_time', 'author_id'
+                )
+            ))
+        context = self.get_serializer_context()
         page = self.paginate_queryset(authors)
         if page is not None:
             serializer = UserSubscriptionSerializer(
-                page, many=True, context={'request': request}
+                page, many=True, context=context
             )
             return self.get_paginated_response(serializer.data)
-        serializer = UserSubscriptionSerializer(authors, many=True)
+        serializer = UserSubscriptionSerializer(
+            authors, many=True, context=context
+        )
         return Response(serializer.data)
 
 
@@ -103,7 +178,7 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SubscribedIdsMixin, viewsets.ModelViewSet):
     """Вьюсет рецептов."""
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = CustomPagination
@@ -171,13 +246,224 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Метод добавления рецепта в избранное."""
         return self._perform(Favorite, request, pk)
 
+    @action(permission_classes=[IsAuthenticated],
+            methods=['post', 'delete'],
+            detail=False,
+            url_path='shopping_cart',
+            url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        """Пакетное добавление (удаление) рецептов в список покупок."""
+        return bulk_response(ShoppingCart, request)
+
+    @action(permission_classes=[IsAuthenticated],
+            methods=['post', 'delete'],
+            detail=False,
+            url_path='favorite',
+            url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        """Пакетное добавление (удаление) рецептов в избранное."""
+        return bulk_response(Favorite, request)
+
+    def list(self, request, *args, **kwargs):
+        """Фильтр по тегам и фасеты считаются по битовым картам тегов."""
+        if not uses_tag_index(request.query_params):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        selection = select_by_tags(request.query_params, queryset)
+        ids = self.paginate_queryset(selection)
+        paginated = ids is not None
+        if not paginated:
+            ids = selection[:]
+        recipes = queryset.in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        if not paginated:
+            return Response(serializer.data)
+        response = self.get_paginated_response(serializer.data)
+        if selection.facets is not None:
+            response.data['facets'] = selection.facets
+        return response
+
+    @action(permission_classes=[AllowAny],
+            methods=['post'],
+            detail=False)
+    def match(self, request):
+        """Рецепты, которые можно приготовить из имеющихся ингредиентов."""
+        params = PantryMatchSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        pantry = params.validated_data['ingredients']
+        include = None
+        if params.validated_data['tags']:
+            include = tag_index.ensure_fresh().select(
+                params.validated_data['tags'],
+                match_all=params.validated_data['tags_match'] == 'all',
+            ).ids
+        found = pantry_index.ensure_fresh().match(
+            pantry, params.validated_data['limit'], include=include,
+            max_cooking_time=params.validated_data.get('max_cooking_time'),
+        )
+        recipes = self.get_queryset().in_bulk(found.ids)
+        missing = {pk: [] for pk in found.ids}
+        for row in RecipeIngredient.objects.filter(
+            recipe_id__in=found.ids
+        ).exclude(ingredient_id__in=pantry).values(
+            'recipe_id', 'ingredient_id',
+            'ingredient__name', 'ingredient__measurement_unit',
+        ).order_by('ingredient__name'):
+            missing[row['recipe_id']].append({
+                'id': row['ingredient_id'],
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+            })
+        ranked = [
+            (recipes[pk], coverage)
+            for pk, coverage in zip(found.ids, found.coverage)
+            if pk in recipes
+        ]
+        results = self.get_serializer(
+            [recipe for recipe, _ in ranked], many=True
+        ).data
+        for data, (recipe, coverage) in zip(results, ranked):
+            data['coverage'] = round(coverage, 4)
+            data['missing'] = missing[recipe.pk]
+        return Response({'count': found.total, 'results': results})
+
+    @action(permission_classes=[AllowAny],
+            methods=['get'],
+            detail=True)
+    def similar(self, request, pk=None):
+        """Похожие рецепты, рассчитанные командой similar_recipes."""
+        similar = RecipeSimilarity.objects.filter(
+            recipe_id=pk
+        ).select_related('similar').only(
+            'score', 'similar__id', 'similar__name', 'similar__image',
+            'similar__cooking_time',
+        ).order_by('rank')
+        serializer = self.get_serializer(similar, many=True)
+        if not serializer.data:
+            get_object_or_404(Recipe, id=pk)
+        return Response(serializer.data)
+
+    @action(permission_classes=[AdminPermission],
+            methods=['post'],
+            detail=False,
+            url_path='import',
+            url_name='import')
+    def import_recipes(self, request):
+        """Импорт рецептов из тела запроса в формате NDJSON."""
+        start = request.query_params.get('start', '0')
+        if not start.isdigit():
+            return Response(
+                {'start': 'Нужен номер строки.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        errors = []
+        importer = RecipeImporter(
+            author=request.user,
+            on_error=lambda number, line_errors: errors.append(
+                {'line': number, 'errors': line_errors}
+            ),
+        )
+        summary = importer.run(request.stream or [], start=int(start))
+        summary['errors'] = errors[:IMPORT_ERRORS_LIMIT]
+        return Response(summary)
+
+    def _relation_changes(self, changed):
+        """Текущее состояние изменившихся связей зрителя."""
+        relations = {}
+        for key, (kind, model, field) in SYNC_RELATIONS.items():
+            ids = changed.get(kind, [])
+            present = set(model.objects.filter(
+                user=self.request.user, **{f'{field}__in': ids}
+            ).values_list(field, flat=True)) if ids else set()
+            relations[key] = {
+                'added': [pk for pk in ids if pk in present],
+                'removed': [pk for pk in ids if pk not in present],
+            }
+        return relations
+
+    @action(permission_classes=[AllowAny],
+            methods=['get'],
+            detail=False)
+    def changes(self, request):
+        """Изменения рецептов и связей зрителя после токена since."""
+        params = ChangesQuerySerializer(data=request.query_params)
+        try:
+            params.is_valid(raise_exception=True)
+        except changes.ExpiredTokenError:
+            return Response(
+                {'since': 'Токен устарел, нужна полная загрузка.'},
+                status=status.HTTP_410_GONE
+            )
+        since = params.validated_data.get('since')
+        if since is None:
+            return Response({
+                'next': changes.encode(changes.head()), 'has_more': False
+            })
+        batch = changes.read(
+            since, request.user, params.validated_data['limit']
+        )
+        recipe_ids = batch.changed.get(Change.RECIPE, [])
+        # Без фильтров is_favorited и is_in_shopping_cart: рецепт вне выборки
+        # оказался бы в deleted_recipes
+        recipes = self._optimize_queryset(Recipe.objects.all()).in_bulk(
+            recipe_ids
+        )
+        data = {
+            'next': changes.encode(batch.cursor),
+            'has_more': batch.has_more,
+            'recipes': self.get_serializer(
+                [recipes[pk] for pk in recipe_ids if pk in recipes],
+                many=True,
+            ).data,
+            'deleted_recipes': [
+                pk for pk in recipe_ids if pk not in recipes
+            ],
+        }
+        if request.user.is_authenticated:
+            data.update(self._relation_changes(batch.changed))
+        return Response(data)
+
     def get_serializer_class(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'retrieve', 'match', 'changes'):
             return RecipeGetSerializer
+        if self.action == 'similar':
+            return SimilarRecipeSerializer
         return RecipePostSerializer
 
+    def _optimize_queryset(self, queryset):
+        """Загрузка только тех связей, которые попадут в ответ."""
+        fields = RecipeGetSerializer.requested_fields(self.request)
+        user = self.request.user
+        if 'text' not in fields:
+            queryset = queryset.defer('text')
+        if 'author' in fields:
+            queryset = queryset.select_related('author')
+        if 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        if user.is_authenticated:
+            if 'is_favorited' in fields:
+                queryset = queryset.annotate(favorited=Exists(
+                    Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+                ))
+            if 'is_in_shopping_cart' in fields:
+                queryset = queryset.annotate(in_shopping_cart=Exists(
+                    ShoppingCart.objects.filter(
+                        user=user, recipe=OuterRef('pk')
+                    )
+                ))
+        return queryset
+
     def get_queryset(self):
         queryset = Recipe.objects.all()
+        if self.action in ('list', 'retrieve', 'match', 'changes'):
+            queryset = self._optimize_queryset(queryset)
         if self.request.user.is_authenticated:
             is_favorited = self.request.query_params.get('is_favorited')
             is_in_shopping_cart = self.request.query_params.get(
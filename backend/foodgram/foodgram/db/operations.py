@@ -0,0 +1,36 @@
+"""Операции миграций, безопасные для больших таблиц."""
+from django.contrib.postgres import operations as postgres_operations
+from django.contrib.postgres.indexes import PostgresIndex
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY на PostgreSQL, обычный индекс на прочих СУБД.
+
+    Индексы PostgreSQL (GIN, GiST и т.п.) на прочих СУБД не создаются.
+    Миграция с этой операцией должна быть объявлена с atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        if isinstance(self.index, PostgresIndex):
+            return None
+        return AddIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        if isinstance(self.index, PostgresIndex):
+            return None
+        return AddIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
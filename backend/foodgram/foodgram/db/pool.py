@@ -0,0 +1,116 @@
+"""Внутрипроцессный пул соединений с БД для потоковых и ASGI воркеров."""
+import threading
+import time
+from collections import deque
+
+from foodgram.instrumentation import register_collector
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Ограниченный пул DB-API соединений с пересозданием по возрасту."""
+
+    def __init__(self, size=10, timeout=10, max_age=600):
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self._idle = deque()
+        self._created_at = {}
+        self._condition = threading.Condition()
+        self.checked_out = 0
+        self.waiting = 0
+        self.created = 0
+        self.recycled = 0
+
+    def _expired(self, connection):
+        age = time.monotonic() - self._created_at.get(id(connection), 0)
+        return bool(connection.closed) or age > self.max_age
+
+    def _discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        self.recycled += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _take_idle(self):
+        while self._idle:
+            connection = self._idle.pop()
+            if not self._expired(connection):
+                return connection
+            self._discard(connection)
+        return None
+
+    def acquire(self, connect):
+        """Взять соединение из пула или создать новое через connect()."""
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                connection = self._take_idle()
+                if connection is not None:
+                    self.checked_out += 1
+                    return connection
+                if self.checked_out + len(self._idle) < self.size:
+                    self.checked_out += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f'Нет свободных соединений за {self.timeout} с'
+                    )
+                self.waiting += 1
+                self._condition.wait(remaining)
+                self.waiting -= 1
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self.checked_out -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    def release(self, connection, reusable=True):
+        """Вернуть соединение; сломанные и старые соединения закрываются."""
+        with self._condition:
+            self.checked_out -= 1
+            if reusable and not self._expired(connection):
+                self._idle.append(connection)
+            else:
+                self._discard(connection)
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'checked_out': self.checked_out,
+            'waiting': self.waiting,
+            'created': self.created,
+            'recycled': self.recycled,
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(**options)
+        return _pools[alias]
+
+
+def pool_stats():
+    return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+register_collector('db_pool', pool_stats)
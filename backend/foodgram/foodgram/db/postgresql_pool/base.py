@@ -0,0 +1,39 @@
+"""PostgreSQL backend, берущий соединения из внутрипроцессного пула.
+
+Настройки пула задаются ключом POOL в DATABASES:
+{'SIZE': 10, 'TIMEOUT': 10, 'MAX_AGE': 600}.
+"""
+from django.db.backends.postgresql import base
+
+from foodgram.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def connection_pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(self.alias, {
+            'size': int(options.get('SIZE', 10)),
+            'timeout': float(options.get('TIMEOUT', 10)),
+            'max_age': float(options.get('MAX_AGE', 600)),
+        })
+
+    def get_new_connection(self, conn_params):
+        return self.connection_pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reusable = not self.errors_occurred
+        with self.wrap_database_errors:
+            try:
+                if not self.connection.closed:
+                    self.connection.rollback()
+            except self.Database.Error:
+                reusable = False
+            self.connection_pool.release(self.connection, reusable)
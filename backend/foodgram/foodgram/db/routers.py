@@ -0,0 +1,75 @@
+"""Маршрутизация чтения безопасных запросов на реплики БД."""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class PrimaryReplicaRouter:
+    """Чтение с реплик внутри безопасных запросов, остальное на primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or not _use_replica.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _start(request):
+    use_replica = (
+        request.method in SAFE_METHODS
+        and settings.DATABASE_REPLICA_PIN_COOKIE not in request.COOKIES
+    )
+    return _use_replica.set(use_replica)
+
+
+def _finish(request, response):
+    """После записи закрепить клиента за primary (read-your-writes)."""
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            settings.DATABASE_REPLICA_PIN_COOKIE, '1',
+            max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True, samesite='Lax',
+        )
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _start(request)
+            try:
+                response = await get_response(request)
+            finally:
+                _use_replica.reset(token)
+            return _finish(request, response)
+    else:
+        def middleware(request):
+            token = _start(request)
+            try:
+                response = get_response(request)
+            finally:
+                _use_replica.reset(token)
+            return _finish(request, response)
+    return middleware
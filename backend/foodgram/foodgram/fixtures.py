@@ -0,0 +1,216 @@
+"""Потоковые дамп и загрузка фикстур Django в ограниченной памяти.
+
+Дамп пишет объекты в формате фикстур Django построчно (NDJSON), читая
+таблицы серверным курсором. Загрузка разбирает массив фикстуры или
+NDJSON по одному объекту, копит объекты по моделям и записывает их
+пакетами bulk_create в порядке зависимостей внешних ключей. Объекты
+с существующим pk обновляются, как при loaddata.
+"""
+import collections
+import contextlib
+
+from django.core.management.color import no_style
+from django.core.serializers import python
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_save
+
+BATCH_SIZE = 2000
+
+
+def dependency_order(models):
+    """Модели в порядке, где связанные внешним ключом идут раньше."""
+    models = list(models)
+    ordered, visiting = [], set()
+
+    def visit(model):
+        if model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            related = field.related_model
+            if related in models and related is not model:
+                visit(related)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+@contextlib.contextmanager
+def stored_dates(model):
+    """Сохранить даты auto_now и auto_now_add из фикстуры при bulk_create.
+
+    loaddata сохраняет объекты с raw=True, bulk_create такого режима
+    не имеет и подставил бы текущее время.
+    """
+    fields = [
+        field for field in model._meta.local_concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _m2m_fields(model):
+    """Многие-ко-многим с автоматической промежуточной таблицей."""
+    return [
+        field for field in model._meta.local_many_to_many
+        if field.serialize and field.remote_field.through._meta.auto_created
+    ]
+
+
+def _m2m_values(field, pks, using):
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    values = collections.defaultdict(list)
+    for pk, value in through._default_manager.using(using).filter(
+        **{f'{source}__in': pks}
+    ).values_list(f'{source}_id', f'{target}_id').order_by(
+        f'{target}_id'
+    ).iterator():
+        values[pk].append(value)
+    return values
+
+
+def dump(model, chunk_size=BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Строки NDJSON фикстуры модели блоками по chunk_size объектов."""
+    label = model._meta.label_lower
+    fields = [
+        field for field in model._meta.local_fields if field.serialize
+    ]
+    m2m_fields = _m2m_fields(model)
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    rows = model._default_manager.using(using).order_by('pk').values_list(
+        'pk', *(field.attname for field in fields)
+    ).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) < chunk_size:
+            continue
+        yield _dump_chunk(label, fields, m2m_fields, chunk, encoder, using)
+        chunk = []
+    if chunk:
+        yield _dump_chunk(label, fields, m2m_fields, chunk, encoder, using)
+
+
+def _dump_chunk(label, fields, m2m_fields, chunk, encoder, using):
+    pks = [row[0] for row in chunk]
+    m2m = {
+        field.name: _m2m_values(field, pks, using) for field in m2m_fields
+    }
+    lines = []
+    for pk, *values in chunk:
+        data = {field.name: value for field, value in zip(fields, values)}
+        for name, related in m2m.items():
+            data[name] = related.get(pk, [])
+        lines.append(encoder.encode(
+            {'model': label, 'pk': pk, 'fields': data}
+        ) + '\n')
+    return ''.join(lines)
+
+
+class FixtureLoader:
+    """Загрузка объектов фикстуры пакетами bulk_create.
+
+    Сигналы post_save (raw=True) отправляются только с send_signals.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=BATCH_SIZE,
+                 send_signals=False):
+        self.using = using
+        self.batch_size = batch_size
+        self.send_signals = send_signals
+        self.buffers = collections.defaultdict(list)
+        self.buffered = 0
+        self.counts = collections.Counter()
+
+    def _write_m2m(self, model, objects):
+        for field in _m2m_fields(model):
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            loaded = [obj for obj in objects if field.name in obj.m2m_data]
+            if not loaded:
+                continue
+            through._default_manager.using(self.using).filter(**{
+                f'{source}__in': [obj.object.pk for obj in loaded]
+            }).delete()
+            through._default_manager.using(self.using).bulk_create(
+                (
+                    through(**{
+                        f'{source}_id': obj.object.pk, f'{target}_id': value
+                    })
+                    for obj in loaded
+                    for value in obj.m2m_data[field.name]
+                ),
+                batch_size=self.batch_size,
+            )
+
+    def _write(self, model, objects):
+        update_fields = [
+            field.name for field in model._meta.local_concrete_fields
+            if not field.primary_key
+        ]
+        conflicts = {'ignore_conflicts': True}
+        if update_fields:
+            conflicts = {
+                'update_conflicts': True,
+                'unique_fields': [model._meta.pk.name],
+                'update_fields': update_fields,
+            }
+        with stored_dates(model):
+            model._base_manager.using(self.using).bulk_create(
+                [obj.object for obj in objects], **conflicts
+            )
+        self._write_m2m(model, objects)
+        self.counts[model] += len(objects)
+        if self.send_signals:
+            for obj in objects:
+                post_save.send(
+                    sender=model, instance=obj.object, created=True,
+                    update_fields=None, raw=True, using=self.using,
+                )
+
+    def flush(self):
+        for model in dependency_order(self.buffers):
+            self._write(model, self.buffers.pop(model))
+        self.buffered = 0
+
+    def load(self, records):
+        """Загрузить записи фикстуры; вернуть число объектов по моделям."""
+        connection = connections[self.using]
+        with transaction.atomic(using=self.using):
+            # Как в loaddata: ссылки проверяются один раз после загрузки
+            with connection.constraint_checks_disabled():
+                for obj in python.Deserializer(records, using=self.using):
+                    self.buffers[type(obj.object)].append(obj)
+                    self.buffered += 1
+                    if self.buffered >= self.batch_size:
+                        self.flush()
+                self.flush()
+            connection.check_constraints(table_names=[
+                table
+                for model in self.counts
+                for table in [model._meta.db_table] + [
+                    field.remote_field.through._meta.db_table
+                    for field in _m2m_fields(model)
+                ]
+            ])
+            statements = connection.ops.sequence_reset_sql(
+                no_style(), list(self.counts)
+            )
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+        return self.counts
@@ -0,0 +1,82 @@
+"""
+Gunicorn config for foodgram project.
+
+Usage: ``gunicorn -c python:foodgram.gunicorn_config``.
+All values can be overridden with ``GUNICORN_*`` environment variables.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = os.getenv('GUNICORN_APP', 'foodgram.wsgi:application')
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+
+cpu_count = multiprocessing.cpu_count()
+workers = int(os.getenv('GUNICORN_WORKERS', cpu_count * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync'
+)
+
+# Django, DRF, djoser и Pillow импортируются один раз в мастере
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Перезапуск воркеров с разбросом, чтобы ограничить рост памяти
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    """Очистка файлов метрик воркеров прошлого запуска."""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        os.remove(os.path.join(metrics_dir, name))
+
+
+def when_ready(server):
+    """Прогрев кода, не требующего БД, до форка воркеров."""
+    if not server.cfg.preload_app:
+        # Без preload Django в мастере не настроен, воркеры прогреются сами
+        return
+    from foodgram.warmup import warm_up
+    warm_up(database=False)
+
+
+def post_fork(server, worker):
+    """Соединения мастера не должны наследоваться воркерами."""
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    """Последние значения метрик воркера до его завершения."""
+    from django.conf import settings
+    if settings.configured and settings.METRICS_DIR:
+        from monitoring.metrics import flush
+        flush()
+
+
+def child_exit(server, worker):
+    """Счетчики завершенного воркера переносятся в общий файл метрик."""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir:
+        from monitoring.worker_files import retire
+        retire(metrics_dir, worker.pid)
+
+
+def post_worker_init(worker):
+    """Прогрев воркера до того, как он начнет принимать запросы."""
+    from foodgram.warmup import warm_up
+    warm_up(database=True)
@@ -0,0 +1,15 @@
+"""Реестр источников метрик приложения.
+
+Подсистемы регистрируют здесь функции, возвращающие словарь текущих
+значений; потребители (эндпоинт метрик, команды) вызывают collect().
+"""
+_collectors = {}
+
+
+def register_collector(name, collector):
+    """Зарегистрировать функцию без аргументов, возвращающую dict."""
+    _collectors[name] = collector
+
+
+def collect():
+    return {name: collector() for name, collector in _collectors.items()}
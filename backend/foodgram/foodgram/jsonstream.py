@@ -0,0 +1,90 @@
+"""Потоковое чтение JSON: массив верхнего уровня или NDJSON.
+
+Файл читается блоками, в памяти держится только текущий элемент,
+поэтому размер файла не ограничен объемом памяти.
+"""
+import codecs
+import json
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = ' \t\r\n'
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+class _Buffer:
+    """Непрочитанный остаток файла с дочитыванием блоками."""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.eof = False
+
+    def more(self):
+        """Дочитать блок; False в конце файла."""
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        if isinstance(chunk, bytes):
+            # Блок может оборваться посреди многобайтного символа
+            chunk = self.utf8.decode(chunk, final=self.eof)
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return not self.eof
+
+    def peek(self, skip=WHITESPACE):
+        """Первый символ после пропускаемых, пустая строка в конце файла."""
+        while True:
+            while self.position < len(self.text) and (
+                self.text[self.position] in skip
+            ):
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.more():
+                return ''
+
+    def decode(self):
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    raise ValueError(f'Некорректный JSON: {error}')
+                end = None
+            # Число у конца блока может быть не дочитано: 3. и 5 в следующем
+            if end is not None and (self.eof or end < len(self.text) and (
+                self.text[end] not in NUMBER_CHARS
+            )):
+                self.position = end
+                return value
+            self.more()
+
+
+def iter_json(file, chunk_size=CHUNK_SIZE):
+    """Элементы массива верхнего уровня или значения NDJSON по одному.
+
+    file - текстовый файл или файл байтов в UTF-8.
+    """
+    buffer = _Buffer(file, chunk_size)
+    if buffer.peek() != '[':
+        while buffer.peek():
+            yield buffer.decode()
+        return
+    buffer.position += 1
+    if buffer.peek() == ']':
+        return
+    while True:
+        if buffer.peek() in ',]':
+            raise ValueError('Некорректный JSON: ожидается элемент массива')
+        yield buffer.decode()
+        char = buffer.peek()
+        if char == ']':
+            return
+        if not char:
+            raise ValueError('Массив JSON не закрыт')
+        if char != ',':
+            raise ValueError('Некорректный JSON: ожидается запятая')
+        buffer.position += 1
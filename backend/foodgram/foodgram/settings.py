@@ -52,10 +52,14 @@ INSTALLED_APPS = [
     'api',
     'recipes',
     'users',
+    'monitoring',
+    'stats',
     'drf_pdf',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.metrics_middleware',
+    'monitoring.middleware.profiling_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -64,10 +68,29 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.db.routers.replica_routing_middleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
 
+# Метрики Prometheus: каталог для агрегации между воркерами gunicorn
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Профилирование: доля запросов, режим sampler/cprofile и кольцевой буфер
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampler')
+PROFILING_SAMPLE_INTERVAL = float(os.getenv('PROFILING_SAMPLE_INTERVAL', 0.005))
+PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILING_MAX_PROFILES = int(os.getenv('PROFILING_MAX_PROFILES', 200))
+PROFILING_HEADER_MAX_AGE = int(os.getenv('PROFILING_HEADER_MAX_AGE', 3600))
+
+# Журнал медленных запросов
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_RATE', 0.1))
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv('SLOW_QUERY_EXPLAIN_ANALYZE', 'False') == 'True'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -86,20 +109,71 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# Async read-only эндпоинты включаются при запуске через foodgram.asgi
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Пакетные запросы POST /api/batch/: число подзапросов в пакете и потоков
+# для параллельного чтения (1 - подзапросы выполняются по очереди)
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Пул соединений для потоковых и ASGI воркеров (только PostgreSQL).
+# С пулом соединение возвращается в него в конце каждого запроса.
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
+        'ENGINE': (
+            'foodgram.db.postgresql_pool' if DB_POOL
+            else os.getenv('DB_ENGINE', 'django.db.backends.postgresql')
+        ),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+        ),
+        'POOL': {
+            'SIZE': os.getenv('DB_POOL_SIZE', 10),
+            'TIMEOUT': os.getenv('DB_POOL_TIMEOUT', 10),
+            'MAX_AGE': os.getenv('DB_POOL_MAX_AGE', 600),
+        },
     }
 }
 
+# Реплики для чтения: DB_REPLICAS=host1:5432,host2:5432
+# (для SQLite - пути к файлам баз)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(
+    item.strip() for item in os.getenv('DB_REPLICAS', '').split(',')
+    if item.strip()
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if 'sqlite3' in DATABASES[alias]['ENGINE']:
+        DATABASES[alias]['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias].update(
+            HOST=host, PORT=port or DATABASES['default']['PORT']
+        )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db.routers.PrimaryReplicaRouter']
+
+# Сколько секунд после записи клиент читает только с primary
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+DATABASE_REPLICA_PIN_COOKIE = 'db_primary_pin'
+
 # ДЛЯ ЛОКАЛЬНОГО ТЕСТИРОВАНИЯ
 # DATABASES = {
 #     "default": {
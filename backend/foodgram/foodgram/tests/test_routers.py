@@ -0,0 +1,92 @@
+"""Маршрутизация чтения на реплики.
+
+Запуск с двумя базами SQLite:
+DB_ENGINE=django.db.backends.sqlite3 DB_NAME=primary.sqlite3 \
+DB_REPLICAS=replica.sqlite3 python manage.py test foodgram
+"""
+import unittest
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from foodgram.db.routers import replica_routing_middleware
+from recipes.models import Tag
+
+REPLICA = 'replica_0'
+
+
+def routed(request):
+    """База чтения Tag внутри запроса и ответ middleware."""
+    seen = []
+
+    def view(request):
+        seen.append(router.db_for_read(Tag))
+        return HttpResponse()
+
+    response = replica_routing_middleware(view)(request)
+    return seen[0], response
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS}
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_safe_request_reads_from_replica(self):
+        alias, response = routed(self.factory.get('/api/tags/'))
+        self.assertEqual(alias, REPLICA)
+        self.assertNotIn(
+            settings.DATABASE_REPLICA_PIN_COOKIE, response.cookies
+        )
+
+    def test_unsafe_request_reads_from_primary_and_pins(self):
+        alias, response = routed(self.factory.post('/api/recipes/'))
+        self.assertEqual(alias, DEFAULT_DB_ALIAS)
+        cookie = response.cookies[settings.DATABASE_REPLICA_PIN_COOKIE]
+        self.assertEqual(
+            cookie['max-age'], settings.DATABASE_REPLICA_PIN_SECONDS
+        )
+
+    def test_pinned_client_reads_from_primary(self):
+        request = self.factory.get('/api/tags/')
+        request.COOKIES[settings.DATABASE_REPLICA_PIN_COOKIE] = '1'
+        self.assertEqual(routed(request)[0], DEFAULT_DB_ALIAS)
+
+    def test_atomic_block_reads_from_primary(self):
+        with transaction.atomic():
+            alias, _ = routed(self.factory.get('/api/tags/'))
+        self.assertEqual(alias, DEFAULT_DB_ALIAS)
+
+    def test_outside_request_reads_from_primary(self):
+        self.assertEqual(router.db_for_read(Tag), DEFAULT_DB_ALIAS)
+
+    def test_writes_go_to_primary(self):
+        def view(request):
+            return HttpResponse(router.db_for_write(Tag))
+
+        response = replica_routing_middleware(view)(
+            self.factory.get('/api/tags/')
+        )
+        self.assertEqual(response.content.decode(), DEFAULT_DB_ALIAS)
+
+
+@unittest.skipUnless(
+    REPLICA in settings.DATABASES, 'нужна реплика в DB_REPLICAS'
+)
+class ReplicaQueryTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_get_queries_replica_connection(self):
+        with (
+            CaptureQueriesContext(connections[REPLICA]) as replica,
+            CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary,
+        ):
+            response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from monitoring.views import metrics_view
+
 urlpatterns = [
     path("api/", include("api.urls", namespace="api")),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view),
 ]
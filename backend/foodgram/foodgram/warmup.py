@@ -0,0 +1,55 @@
+"""Прогрев процесса приложения перед приемом трафика."""
+import asyncio
+import logging
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+CATALOG_URLS = ('/api/tags/', '/api/ingredients/')
+
+
+async def wait(coroutine):
+    return await coroutine
+
+
+def compile_urls():
+    """Компиляция регулярных выражений URL-резолвера."""
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for url in CATALOG_URLS:
+        resolver.resolve(url)
+
+
+def open_connections():
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def build_catalogs():
+    """Полный проход запросов каталогов тегов и ингредиентов."""
+    factory = RequestFactory()
+    resolver = get_resolver()
+    for url in CATALOG_URLS:
+        match = resolver.resolve(url)
+        request = factory.get(url, HTTP_HOST='localhost')
+        response = match.func(request, *match.args, **match.kwargs)
+        if asyncio.iscoroutine(response):
+            response = async_to_sync(wait)(response)
+        if hasattr(response, 'render'):
+            response.render()
+
+
+def warm_up(database=True):
+    compile_urls()
+    if not database:
+        return
+    try:
+        open_connections()
+        build_catalogs()
+    except Exception:
+        logger.exception('Не удалось прогреть воркер')
@@ -0,0 +1,131 @@
+import json
+import os
+
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .models import RequestProfile, SlowQuery
+from .profiling import profile_files
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Просмотр профилей запросов."""
+    list_display = (
+        'created',
+        'method',
+        'path',
+        'view',
+        'status_code',
+        'duration',
+        'query_count',
+        'sql_time',
+        'download_link'
+    )
+    list_filter = ('mode', 'method')
+    search_fields = ('path', 'view')
+    readonly_fields = (
+        'created',
+        'method',
+        'path',
+        'view',
+        'status_code',
+        'duration',
+        'query_count',
+        'sql_time',
+        'mode',
+        'download_link',
+        'captured_sql'
+    )
+    exclude = ('file_name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='monitoring_requestprofile_download',
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        for file_path in profile_files(profile)[:2]:
+            if os.path.exists(file_path):
+                return FileResponse(
+                    open(file_path, 'rb'),
+                    as_attachment=True,
+                    filename=os.path.basename(file_path),
+                )
+        raise Http404('Файл профиля вытеснен из буфера')
+
+    @admin.display(description='Профиль')
+    def download_link(self, obj):
+        extension = 'prof' if obj.mode == obj.CPROFILE else 'folded'
+        return format_html(
+            '<a href="{}">.{}</a>',
+            reverse('admin:monitoring_requestprofile_download', args=[obj.pk]),
+            extension,
+        )
+
+    @admin.display(description='SQL')
+    def captured_sql(self, obj):
+        sql_path = profile_files(obj)[2]
+        if not os.path.exists(sql_path):
+            return '-'
+        with open(sql_path) as file:
+            queries = json.load(file)
+        return format_html_join(
+            '', '<p><b>{} мс</b> [{}]<pre>{}</pre><pre>{}</pre></p>',
+            (
+                (f'{query["duration_ms"]:.2f}', query['alias'], query['sql'],
+                 '\n'.join(query['stack']))
+                for query in queries
+            ),
+        )
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Медленные запросы, сгруппированные по отпечатку."""
+    list_display = (
+        'normalized_sql',
+        'view',
+        'count',
+        'total_time',
+        'max_time',
+        'last_seen'
+    )
+    list_filter = ('view',)
+    search_fields = ('normalized_sql', 'view')
+    readonly_fields = (
+        'fingerprint',
+        'normalized_sql',
+        'sample_sql',
+        'params',
+        'view',
+        'location',
+        'count',
+        'total_time',
+        'max_time',
+        'explain',
+        'first_seen',
+        'last_seen'
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
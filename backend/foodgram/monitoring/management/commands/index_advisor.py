@@ -0,0 +1,199 @@
+import io
+import json
+import re
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from monitoring.slowlog import fingerprint, normalize
+
+SQLITE_TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)')
+INDEX_USAGE_SQL = '''
+    SELECT s.relname, s.indexrelname, s.idx_scan,
+           pg_relation_size(s.indexrelid), i.indisunique OR i.indisprimary
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+'''
+
+
+class FingerprintLog:
+    """Execute wrapper: SELECT-запросы обработки HTTP-запросов по отпечаткам.
+
+    Запросы генерации данных между HTTP-запросами не учитываются.
+    """
+
+    def __init__(self):
+        self.queries = {}
+        self.active = False
+
+    def start(self, **kwargs):
+        self.active = True
+
+    def stop(self, **kwargs):
+        self.active = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if (
+            self.active and not many
+            and sql.lstrip().upper().startswith('SELECT')
+        ):
+            normalized = normalize(sql)
+            entry = self.queries.setdefault(fingerprint(normalized), {
+                'sql': sql, 'params': params, 'normalized': normalized,
+                'count': 0,
+            })
+            entry['count'] += 1
+        return execute(sql, params, many, context)
+
+
+def table_sizes():
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"
+            )
+            return dict(cursor.fetchall())
+        sizes = {}
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            sizes[table] = cursor.fetchone()[0]
+        return sizes
+
+
+def postgres_issues(cursor, sql, params, sizes, min_rows):
+    cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+    plan = cursor.fetchone()[0]
+    nodes = [(plan if isinstance(plan, list) else json.loads(plan))[0]['Plan']]
+    issues = []
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', []))
+        table = node.get('Relation Name')
+        if (
+            node['Node Type'] == 'Seq Scan' and 'Filter' in node
+            and sizes.get(table, 0) >= min_rows
+        ):
+            issues.append(f'Seq Scan {table}: {node["Filter"]}')
+        elif node['Node Type'] == 'Sort' and node['Plan Rows'] >= min_rows:
+            issues.append(f'Sort {", ".join(node["Sort Key"])}')
+    return issues
+
+
+def sqlite_issues(cursor, sql, params, sizes, min_rows):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    issues = []
+    for row in cursor.fetchall():
+        detail = row[-1]
+        match = SQLITE_TABLE_SCAN.match(detail)
+        if (
+            match and 'USING' not in detail
+            and sizes.get(match['table'], 0) >= min_rows
+        ):
+            issues.append(detail)
+        elif detail.startswith('USE TEMP B-TREE FOR ORDER BY'):
+            issues.append(detail)
+    return issues
+
+
+def index_usage():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_stat_clear_snapshot()')
+        cursor.execute(INDEX_USAGE_SQL)
+        return {
+            (table, index): (scans, size, unique)
+            for table, index, scans, size, unique in cursor.fetchall()
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогон bench_api с записью отпечатков SQL-запросов: запросы, план '
+        'которых читает большие таблицы целиком или сортирует без индекса, '
+        'и неиспользуемые индексы из pg_stat_user_indexes. Пересоздает '
+        'синтетические данные, как и bench_api.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000],
+            help='Размеры наборов данных для bench_api'
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Таблицы меньше этого размера не рассматриваются'
+        )
+
+    def _missing(self, queries, min_rows):
+        sizes = table_sizes()
+        check = (
+            postgres_issues if connection.vendor == 'postgresql'
+            else sqlite_issues
+        )
+        found = []
+        with connection.cursor() as cursor:
+            for query in queries.values():
+                issues = check(
+                    cursor, query['sql'], query['params'], sizes, min_rows
+                )
+                if issues:
+                    found.append((query, issues))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Запросы без подходящего индекса: {len(found)} из '
+            f'{len(queries)} отпечатков'
+        ))
+        for query, issues in sorted(found, key=lambda item: -item[0]['count']):
+            self.stdout.write(f'{query["count"]} x {query["normalized"]}')
+            for issue in issues:
+                self.stdout.write(self.style.WARNING(f'    {issue}'))
+
+    def _unused(self, before, after):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Неиспользуемые индексы (без уникальных и первичных ключей)'
+        ))
+        for (table, index), (scans, size, unique) in sorted(after.items()):
+            if unique:
+                continue
+            benchmark_scans = scans - before.get((table, index), (0,))[0]
+            if scans and benchmark_scans:
+                continue
+            reason = (
+                'ни одного обращения' if not scans
+                else 'не использован в прогоне'
+            )
+            self.stdout.write(
+                f'{table}.{index}: {reason}, {size // 1024} КБ'
+            )
+
+    def handle(self, *args, **options):
+        postgres = connection.vendor == 'postgresql'
+        before = index_usage() if postgres else {}
+        log = FingerprintLog()
+        request_started.connect(log.start)
+        request_finished.connect(log.stop)
+        try:
+            with connection.execute_wrapper(log):
+                call_command(
+                    'bench_api', sizes=options['sizes'],
+                    repeat=options['repeat'], seed=options['seed'],
+                    stdout=io.StringIO(), stderr=self.stderr,
+                )
+        finally:
+            request_started.disconnect(log.start)
+            request_finished.disconnect(log.stop)
+        self._missing(log.queries, options['min_rows'])
+        if not postgres:
+            self.stdout.write(
+                'Статистика использования индексов доступна только '
+                'для PostgreSQL'
+            )
+            return
+        # Счетчики pg_stat обновляются с задержкой
+        time.sleep(1)
+        self._unused(before, index_usage())
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.profiling import sign_header
+
+
+class Command(BaseCommand):
+    help = 'Подписанное значение заголовка X-Profile для профилирования.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'X-Profile: {sign_header()}')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from monitoring.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_time',
+    'max': '-max_time',
+    'count': '-count',
+}
+
+
+class Command(BaseCommand):
+    help = 'Самые тяжелые запросы из журнала медленных запросов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total'
+        )
+        parser.add_argument(
+            '--explain', action='store_true', help='Показать план запроса'
+        )
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.order_by(
+            ORDERINGS[options['order']]
+        )[:options['top']]
+        for position, query in enumerate(queries, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{position}. {query.view}: {query.count} раз, '
+                f'всего {query.total_time:.1f} мс, '
+                f'максимум {query.max_time:.1f} мс'
+            ))
+            self.stdout.write(query.normalized_sql)
+            if query.location:
+                self.stdout.write(query.location)
+            if options['explain'] and query.explain:
+                self.stdout.write(query.explain)
+            self.stdout.write('')
@@ -0,0 +1,181 @@
+"""Метрики запросов: счетчики, гистограммы задержки, SQL и размер ответа.
+
+Каждый процесс копит значения в памяти, фоновый поток раз в
+METRICS_FLUSH_INTERVAL секунд сбрасывает их в METRICS_DIR/<pid>.json
+вместе с показателями подсистем (пул соединений). Экспорт суммирует
+файлы всех воркеров gunicorn, см. worker_files.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import slowlog, worker_files
+from foodgram.instrumentation import collect
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# count, latency_sum, queries, sql_time, response_bytes, buckets...
+COUNT, LATENCY, QUERIES, SQL_TIME, RESPONSE_BYTES = range(5)
+FIRST_BUCKET = 5
+
+_lock = threading.Lock()
+_series = {}
+_flusher = None
+current_request = ContextVar('current_request', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql_time', 'capture', 'slow_queries')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slow_queries = []
+        # Профилировщик подставляет сюда функцию записи деталей SQL
+        self.capture = None
+
+
+def query_wrapper(execute, sql, params, many, context):
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.sql_time += elapsed
+        if stats.capture is not None:
+            stats.capture(sql, elapsed, context)
+        if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            stats.slow_queries.append(
+                slowlog.capture(sql, params, many, elapsed, context)
+            )
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def record(view, method, latency, stats, response_bytes):
+    key = (view, method)
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = [0, 0.0, 0, 0.0, 0] + [0] * (
+                len(BUCKETS) + 1
+            )
+        series[COUNT] += 1
+        series[LATENCY] += latency
+        series[QUERIES] += stats.queries
+        series[SQL_TIME] += stats.sql_time
+        series[RESPONSE_BYTES] += response_bytes
+        series[FIRST_BUCKET + bisect_left(BUCKETS, latency)] += 1
+    if settings.METRICS_DIR and _flusher is None:
+        _start_flusher()
+
+
+def flush():
+    with _lock:
+        series = [[view, method, list(values)]
+                  for (view, method), values in _series.items()]
+    worker_files.write(
+        settings.METRICS_DIR, f'{os.getpid()}.json',
+        {'series': series, 'gauges': collect()},
+    )
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        flush()
+
+
+def _start_flusher():
+    """Фоновый сброс в файл, чтобы запрос не ждал дискового IO."""
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_forever, daemon=True)
+    _flusher.start()
+
+
+def merged():
+    """Серии и показатели всех процессов (без METRICS_DIR - текущего)."""
+    if not settings.METRICS_DIR:
+        with _lock:
+            series = {key: list(values) for key, values in _series.items()}
+        return series, collect()
+    flush()
+    return worker_files.merged(settings.METRICS_DIR)
+
+
+def _labels(**labels):
+    return ','.join(
+        f'{name}="{value}"' for name, value in labels.items()
+    )
+
+
+def _histogram(lines, values, labels):
+    cumulative = 0
+    for index, bound in enumerate(BUCKETS + ('+Inf',)):
+        cumulative += values[FIRST_BUCKET + index]
+        lines.append(
+            f'foodgram_request_latency_seconds_bucket'
+            f'{{{labels},le="{bound}"}} {cumulative}'
+        )
+    lines.append(
+        f'foodgram_request_latency_seconds_sum{{{labels}}} {values[LATENCY]}'
+    )
+    lines.append(
+        f'foodgram_request_latency_seconds_count{{{labels}}} '
+        f'{values[COUNT]}'
+    )
+
+
+COUNTERS = (
+    ('foodgram_requests_total', 'Число запросов', COUNT),
+    ('foodgram_sql_queries_total', 'Число SQL-запросов', QUERIES),
+    ('foodgram_sql_seconds_total', 'Время SQL-запросов', SQL_TIME),
+    ('foodgram_response_bytes_total', 'Размер ответов', RESPONSE_BYTES),
+)
+
+
+def _gauges(lines, gauges):
+    """Показатели подсистем, суммированные по процессам."""
+    metrics = {}
+    for source, groups in sorted(gauges.items()):
+        for group, values in sorted(groups.items()):
+            for name, value in values.items():
+                metrics.setdefault(f'foodgram_{source}_{name}', []).append(
+                    f'{{{_labels(group=group)}}} {value}'
+                )
+    for metric, samples in metrics.items():
+        lines.append(f'# TYPE {metric} gauge')
+        lines.extend(f'{metric}{sample}' for sample in samples)
+
+
+def render():
+    """Текст в формате Prometheus exposition."""
+    series, gauges = merged()
+    series = sorted(series.items())
+    lines = []
+    for metric, help_text, index in COUNTERS:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for (view, method), values in series:
+            labels = _labels(view=view, method=method)
+            lines.append(f'{metric}{{{labels}}} {values[index]}')
+    lines.append('# HELP foodgram_request_latency_seconds Задержка запроса')
+    lines.append('# TYPE foodgram_request_latency_seconds histogram')
+    for (view, method), values in series:
+        _histogram(lines, values, _labels(view=view, method=method))
+    _gauges(lines, gauges)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,96 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics, profiling, slowlog
+
+_view_names = {}
+
+
+def view_name(request):
+    """Имя вида: RecipeViewSet.list, download_shopping_cart и т.п."""
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    key = (match.func, request.method)
+    name = _view_names.get(key)
+    if name is None:
+        func = match.func
+        actions = getattr(func, 'actions', None)
+        view_class = getattr(func, 'cls', None)
+        if actions and view_class is not None:
+            action = actions.get(request.method.lower(), 'unknown')
+            name = f'{view_class.__name__}.{action}'
+        elif view_class is not None and view_class.__name__ != (
+            'WrappedAPIView'
+        ):
+            name = view_class.__name__
+        else:
+            name = getattr(func, '__name__', match.view_name)
+        _view_names[key] = name
+    return name
+
+
+def _finish(request, response, started, stats):
+    latency = time.perf_counter() - started
+    size = 0 if response.streaming else len(response.content)
+    metrics.record(view_name(request), request.method, latency, stats, size)
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Счетчики, задержка, SQL и размер ответа по видам."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats = metrics.RequestStats()
+            token = metrics.current_request.set(stats)
+            started = time.perf_counter()
+            try:
+                response = await get_response(request)
+            finally:
+                metrics.current_request.reset(token)
+            if stats.slow_queries:
+                await sync_to_async(slowlog.store)(
+                    view_name(request), stats.slow_queries
+                )
+            return _finish(request, response, started, stats)
+    else:
+        def middleware(request):
+            stats = metrics.RequestStats()
+            token = metrics.current_request.set(stats)
+            started = time.perf_counter()
+            try:
+                response = get_response(request)
+            finally:
+                metrics.current_request.reset(token)
+            if stats.slow_queries:
+                slowlog.store(view_name(request), stats.slow_queries)
+            return _finish(request, response, started, stats)
+    return middleware
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Профилирование выборки запросов или запросов с X-Profile."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not profiling.should_profile(request):
+                return await get_response(request)
+            # Работа async-вида идет в разных потоках: сэмплируем все
+            with profiling.Profiler(all_threads=True) as profiler:
+                response = await get_response(request)
+            await sync_to_async(profiler.save)(
+                request, response, view_name(request)
+            )
+            return response
+    else:
+        def middleware(request):
+            if not profiling.should_profile(request):
+                return get_response(request)
+            with profiling.Profiler() as profiler:
+                response = get_response(request)
+            profiler.save(request, response, view_name(request))
+            return response
+    return middleware
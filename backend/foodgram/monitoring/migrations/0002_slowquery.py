@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='Отпечаток')),
+                ('normalized_sql', models.TextField(verbose_name='Нормализованный SQL')),
+                ('sample_sql', models.TextField(verbose_name='Пример SQL')),
+                ('params', models.TextField(blank=True, verbose_name='Параметры')),
+                ('view', models.CharField(max_length=200, verbose_name='Вид')),
+                ('location', models.TextField(blank=True, verbose_name='Место вызова')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('total_time', models.FloatField(default=0, verbose_name='Суммарно, мс')),
+                ('max_time', models.FloatField(default=0, verbose_name='Максимум, мс')),
+                ('explain', models.TextField(blank=True, verbose_name='План запроса')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now=True, verbose_name='Последний')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-total_time'],
+            },
+        ),
+    ]
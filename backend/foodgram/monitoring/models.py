@@ -0,0 +1,69 @@
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """Профиль запроса; данные лежат в файлах в PROFILING_DIR."""
+    SAMPLER = 'sampler'
+    CPROFILE = 'cprofile'
+    MODES = [
+        (SAMPLER, 'Stack sampler'),
+        (CPROFILE, 'cProfile'),
+    ]
+
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создан'
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=2000, verbose_name='Путь')
+    view = models.CharField(max_length=200, verbose_name='Вид')
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration = models.FloatField(verbose_name='Длительность, мс')
+    query_count = models.PositiveIntegerField(verbose_name='SQL-запросов')
+    sql_time = models.FloatField(verbose_name='Время SQL, мс')
+    mode = models.CharField(
+        max_length=10,
+        choices=MODES,
+        verbose_name='Режим'
+    )
+    file_name = models.CharField(max_length=100, verbose_name='Файл')
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration:.0f} мс)'
+
+
+class SlowQuery(models.Model):
+    """Медленный SQL-запрос, сгруппированный по отпечатку."""
+
+    fingerprint = models.CharField(
+        max_length=32,
+        unique=True,
+        verbose_name='Отпечаток'
+    )
+    normalized_sql = models.TextField(verbose_name='Нормализованный SQL')
+    sample_sql = models.TextField(verbose_name='Пример SQL')
+    params = models.TextField(blank=True, verbose_name='Параметры')
+    view = models.CharField(max_length=200, verbose_name='Вид')
+    location = models.TextField(blank=True, verbose_name='Место вызова')
+    count = models.PositiveIntegerField(default=0, verbose_name='Количество')
+    total_time = models.FloatField(default=0, verbose_name='Суммарно, мс')
+    max_time = models.FloatField(default=0, verbose_name='Максимум, мс')
+    explain = models.TextField(blank=True, verbose_name='План запроса')
+    first_seen = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Впервые'
+    )
+    last_seen = models.DateTimeField(auto_now=True, verbose_name='Последний')
+
+    class Meta:
+        ordering = ['-total_time']
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.normalized_sql[:80]
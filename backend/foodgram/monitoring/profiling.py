@@ -0,0 +1,189 @@
+"""Профилирование отдельных запросов в продакшене.
+
+Запрос профилируется с вероятностью PROFILING_SAMPLE_RATE или по
+подписанному заголовку X-Profile (см. команду profile_header).
+Профиль и SQL с временем и местом вызова пишутся в кольцевой буфер
+на диске из PROFILING_MAX_PROFILES записей.
+"""
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+
+from . import metrics
+from .stack import call_site
+
+HEADER_SALT = 'monitoring.profile'
+
+
+def sign_header():
+    return signing.TimestampSigner(salt=HEADER_SALT).sign('profile')
+
+
+def header_is_valid(value):
+    try:
+        signing.TimestampSigner(salt=HEADER_SALT).unsign(
+            value, max_age=settings.PROFILING_HEADER_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    header = request.META.get('HTTP_X_PROFILE')
+    if header:
+        return header_is_valid(header)
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    file_name = os.path.basename(code.co_filename)
+    return f'{code.co_name} ({file_name}:{frame.f_lineno})'
+
+
+class SqlCapture:
+    """Сбор SQL профилируемого запроса через обертку из metrics."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, sql, elapsed, context):
+        self.queries.append({
+            'alias': context['connection'].alias,
+            'sql': sql,
+            'duration_ms': elapsed * 1000,
+            'stack': call_site(),
+        })
+
+    def install(self, stack):
+        stats = metrics.current_request.get()
+        if stats is None:
+            stats = metrics.RequestStats()
+            token = metrics.current_request.set(stats)
+            stack.callback(metrics.current_request.reset, token)
+        stats.capture = self
+        stack.callback(setattr, stats, 'capture', None)
+
+
+class StackSampler(threading.Thread):
+    """Сэмплер стеков: раз в интервал снимает стек целевых потоков."""
+
+    def __init__(self, thread_ids=None):
+        super().__init__(daemon=True)
+        self.thread_ids = thread_ids
+        self.interval = settings.PROFILING_SAMPLE_INTERVAL
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (
+                    self.thread_ids is not None
+                    and ident not in self.thread_ids
+                ):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self):
+        """Формат collapsed stacks для flamegraph.pl и speedscope."""
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+class Profiler:
+    def __init__(self, all_threads=False):
+        self.mode = settings.PROFILING_MODE
+        self.sql = SqlCapture()
+        self._stack = ExitStack()
+        if self.mode == 'cprofile' and not all_threads:
+            self._profile = cProfile.Profile()
+        else:
+            self.mode = 'sampler'
+            self._sampler = StackSampler(
+                None if all_threads else {threading.get_ident()}
+            )
+
+    def __enter__(self):
+        self.sql.install(self._stack)
+        self.started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile.enable()
+        else:
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode == 'cprofile':
+            self._profile.disable()
+        else:
+            self._sampler.stop()
+        self.duration = time.perf_counter() - self.started
+        self._stack.close()
+
+    def save(self, request, response, view):
+        """Записать профиль на диск и в индекс, вытеснив старые."""
+        from .models import RequestProfile
+
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        file_name = uuid.uuid4().hex
+        base = os.path.join(settings.PROFILING_DIR, file_name)
+        if self.mode == 'cprofile':
+            self._profile.dump_stats(f'{base}.prof')
+        else:
+            with open(f'{base}.folded', 'w') as file:
+                file.write(self._sampler.folded())
+        with open(f'{base}.sql.json', 'w') as file:
+            json.dump(self.sql.queries, file, ensure_ascii=False)
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            view=view,
+            status_code=response.status_code,
+            duration=self.duration * 1000,
+            query_count=len(self.sql.queries),
+            sql_time=sum(query['duration_ms'] for query in self.sql.queries),
+            mode=self.mode,
+            file_name=file_name,
+        )
+        evict_old_profiles()
+
+
+def profile_files(profile):
+    base = os.path.join(settings.PROFILING_DIR, profile.file_name)
+    return [f'{base}{suffix}' for suffix in ('.prof', '.folded', '.sql.json')]
+
+
+def evict_old_profiles():
+    from .models import RequestProfile
+
+    stale = RequestProfile.objects.order_by('-created')[
+        settings.PROFILING_MAX_PROFILES:
+    ]
+    for profile in stale:
+        for path in profile_files(profile):
+            if os.path.exists(path):
+                os.remove(path)
+        profile.delete()
@@ -0,0 +1,117 @@
+"""Журнал медленных SQL-запросов с выборочным EXPLAIN.
+
+Запросы дольше SLOW_QUERY_THRESHOLD_MS группируются по отпечатку
+нормализованного SQL; параметры сохраняются только в виде типов.
+"""
+import hashlib
+import random
+import re
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import SlowQuery
+from .stack import call_site
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = PLACEHOLDER_LIST.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()
+
+
+def redact(params):
+    if params is None:
+        return ''
+    return ', '.join(f'<{type(param).__name__}>' for param in params)
+
+
+def explain(connection, sql, params):
+    """План запроса; ANALYZE только для PostgreSQL и по настройке."""
+    if connection.in_atomic_block:
+        # Ошибка EXPLAIN прервала бы транзакцию приложения
+        return ''
+    if connection.vendor == 'postgresql':
+        prefix = (
+            'EXPLAIN (ANALYZE, BUFFERS)' if settings.SLOW_QUERY_EXPLAIN_ANALYZE
+            else 'EXPLAIN'
+        )
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN'
+    else:
+        prefix = 'EXPLAIN'
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{prefix} {sql}', params)
+        rows = cursor.fetchall()
+    except Exception as error:
+        return f'EXPLAIN не выполнен: {error}'
+    finally:
+        cursor.close()
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def capture(sql, params, many, elapsed, context):
+    """Снимок медленного запроса, пока соединение еще доступно."""
+    connection = context['connection']
+    plan = ''
+    if (
+        not many
+        and sql.lstrip().upper().startswith('SELECT')
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+    ):
+        plan = explain(connection, sql, params)
+    return {
+        'sql': sql,
+        'params': '' if many else redact(params),
+        'duration_ms': elapsed * 1000,
+        'location': '\n'.join(call_site()),
+        'explain': plan,
+    }
+
+
+def store(view, slow_queries):
+    """Сохранить медленные запросы запроса, объединяя по отпечатку."""
+    for query in slow_queries:
+        normalized_sql = normalize(query['sql'])
+        duration = query['duration_ms']
+        entry, created = SlowQuery.objects.get_or_create(
+            fingerprint=fingerprint(normalized_sql),
+            defaults={
+                'normalized_sql': normalized_sql,
+                'sample_sql': query['sql'],
+                'params': query['params'],
+                'view': view,
+                'location': query['location'],
+                'count': 1,
+                'total_time': duration,
+                'max_time': duration,
+                'explain': query['explain'],
+            },
+        )
+        if created:
+            continue
+        updates = {
+            'count': F('count') + 1,
+            'total_time': F('total_time') + duration,
+            'max_time': Greatest(F('max_time'), Value(duration)),
+            'view': view,
+            'location': query['location'],
+            'last_seen': timezone.now(),
+        }
+        if query['explain']:
+            updates['explain'] = query['explain']
+        SlowQuery.objects.filter(pk=entry.pk).update(**updates)
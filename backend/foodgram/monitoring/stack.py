@@ -0,0 +1,31 @@
+import os
+import traceback
+
+from django.conf import settings
+
+STACK_DEPTH = 6
+# Обертки всего запроса не помогают найти место вызова
+SKIPPED_FILES = (
+    os.path.join('monitoring', ''),
+    os.path.join('db', 'routers.py'),
+    os.path.join('django', 'db', ''),
+    os.path.join('django', 'core', 'handlers', ''),
+    os.path.join('asgiref', ''),
+)
+
+
+def call_site(skip=()):
+    """Последние кадры стека, ведущие к запросу: сначала код проекта."""
+    skipped = SKIPPED_FILES + tuple(skip)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if not any(part in frame.filename for part in skipped)
+    ]
+    own = [
+        frame for frame in frames
+        if frame.filename.startswith(settings.BASE_DIR)
+    ]
+    return [
+        f'{frame.filename}:{frame.lineno} {frame.name}'
+        for frame in (own or frames)[-STACK_DEPTH:]
+    ]
@@ -0,0 +1,89 @@
+"""Файлы метрик воркеров gunicorn в METRICS_DIR.
+
+Воркер пишет в <pid>.json свои серии запросов и текущие показатели
+(gauges). Счетчики завершенного воркера переносятся в retired.json,
+показатели отбрасываются, поэтому число файлов не растет с перезапусками
+воркеров. Модуль не зависит от Django: мастер gunicorn без preload
+вызывает retire() до настройки Django.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import threading
+
+RETIRED = 'retired.json'
+LOCK = '.lock'
+
+
+@contextlib.contextmanager
+def _locked(directory):
+    """Чтение всех файлов и перенос счетчиков не пересекаются."""
+    with open(os.path.join(directory, LOCK), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        yield
+
+
+def write(directory, name, data):
+    path = os.path.join(directory, name)
+    temp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _add_series(total, series):
+    for view, method, values in series:
+        current = total.setdefault((view, method), [0] * len(values))
+        for index, value in enumerate(values):
+            current[index] += value
+
+
+def _add_gauges(total, gauges):
+    for source, groups in gauges.items():
+        for group, values in groups.items():
+            current = total.setdefault(source, {}).setdefault(group, {})
+            for name, value in values.items():
+                current[name] = current.get(name, 0) + value
+
+
+def merged(directory):
+    """Суммы серий и показателей по всем файлам каталога."""
+    series, gauges = {}, {}
+    with _locked(directory):
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            data = _read(os.path.join(directory, name))
+            if data is None:
+                continue
+            _add_series(series, data['series'])
+            _add_gauges(gauges, data.get('gauges', {}))
+    return series, gauges
+
+
+def retire(directory, pid):
+    """Перенести счетчики завершенного воркера в retired.json."""
+    path = os.path.join(directory, f'{pid}.json')
+    with _locked(directory):
+        data = _read(path)
+        if data is not None:
+            series = {}
+            retired = _read(os.path.join(directory, RETIRED))
+            if retired is not None:
+                _add_series(series, retired['series'])
+            _add_series(series, data['series'])
+            write(directory, RETIRED, {'series': [
+                [view, method, values]
+                for (view, method), values in series.items()
+            ]})
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
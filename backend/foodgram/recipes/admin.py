@@ -1,6 +1,10 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.forms.models import BaseInlineFormSet
 
+from .admin_tools import EstimatedCountPaginator, related_id_filter
+from .exports import export_csv, export_ndjson
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, RecipeTag,
                      ShoppingCart, Tag)
 
@@ -15,9 +19,16 @@ class RecipeIngredientInLineFormset(BaseInlineFormSet):
 class RecipeIngredientsInline(admin.TabularInline):
     model = RecipeIngredient
     formset = RecipeIngredientInLineFormset
+    autocomplete_fields = ('ingredient',)
     min_num = 1
     extra = 0
 
+    def get_queryset(self, request):
+        # Заголовок строки выводит __str__ с рецептом и ингредиентом
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredient'
+        )
+
 
 class RecipeTagInLineFormset(BaseInlineFormSet):
     def clean_tags(self):
@@ -32,6 +43,9 @@ class RecipeTagsInline(admin.TabularInline):
     min_num = 1
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipe', 'tag')
+
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
@@ -41,20 +55,34 @@ class RecipeAdmin(admin.ModelAdmin):
         'favorite_count'
     )
     list_filter = (
-        'author',
-        'name',
+        related_id_filter('author'),
         'tags'
     )
     search_fields = (
-        'author',
         'name',
-        'tags'
     )
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientsInline, RecipeTagsInline)
+    actions = (export_csv, export_ndjson)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_field = "-пусто-"
 
+    def get_queryset(self, request):
+        # Подзапрос считается только для строк текущей страницы
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+        return super().get_queryset(request).annotate(
+            favorites=Coalesce(Subquery(favorites), 0)
+        )
+
+    @admin.display(description='В избранном')
     def favorite_count(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites
 
 
 @admin.register(Ingredient)
@@ -63,9 +91,6 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit'
     )
-    list_filter = (
-        'name',
-    )
     search_fields = (
         'name',
     )
@@ -95,19 +120,42 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
         'ingredient',
         'amount'
     )
-    list_filter = ('recipe', 'ingredient')
-    search_fields = ('recipe', 'ingredient')
+    list_filter = (
+        related_id_filter('recipe'),
+        related_id_filter('ingredient'),
+    )
+    search_fields = ('recipe__name',)
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_display = ('user', 'recipe', 'created')
+    list_filter = (
+        related_id_filter('user'),
+        related_id_filter('recipe'),
+    )
+    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    actions = (export_csv, export_ndjson)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_display = ('user', 'recipe', 'created')
+    list_filter = (
+        related_id_filter('user'),
+        related_id_filter('recipe'),
+    )
+    search_fields = ('user__username', 'recipe__name')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    actions = (export_csv, export_ndjson)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,86 @@
+"""Фильтры и пагинатор админки для таблиц с миллионами строк."""
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class RelatedIdFilter(admin.SimpleListFilter):
+    """Фильтр по внешнему ключу через поле ввода id.
+
+    Стандартный фильтр перечисляет все связанные объекты, этот
+    загружает только выбранный.
+    """
+
+    template = 'admin/related_id_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        if self.title is None:
+            self.title = model._meta.get_field(self.field_name).verbose_name
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return ()
+        related = model_admin.model._meta.get_field(
+            self.field_name
+        ).related_model
+        selected = related._default_manager.filter(pk=value).first()
+        return ((value, str(selected) if selected else f'#{value}'),)
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(**{f'{self.field_name}_id': value})
+        return queryset
+
+    def choices(self, changelist):
+        choices = list(super().choices(changelist))
+        hidden = []
+        for name, values in changelist.params.items():
+            if name in (self.parameter_name, PAGE_VAR):
+                continue
+            for value in values if isinstance(values, list) else [values]:
+                hidden.append((name, value))
+        choices[0]['hidden'] = hidden
+        return choices
+
+
+def related_id_filter(field_name, title=None):
+    """Класс RelatedIdFilter для поля field_name."""
+    return type(f'{field_name.title()}IdFilter', (RelatedIdFilter,), {
+        'field_name': field_name,
+        'parameter_name': field_name,
+        'title': title,
+    })
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, берущий размер большой таблицы из статистики PostgreSQL.
+
+    Точный COUNT(*) выполняется только для отфильтрованных списков
+    и небольших таблиц.
+    """
+
+    threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                estimate = int(cursor.fetchone()[0])
+            if estimate > self.threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,99 @@
+"""Загрузка справочников ингредиентов и тегов из JSON.
+
+Файл читается потоково, записи сравниваются с уже загруженными по ключу
+уникальности. Новые и измененные записи пишутся пакетами bulk_create
+с обновлением при конфликте ключа, поэтому повторная загрузка того же
+файла ничего не пишет в базу.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .models import Ingredient, Tag
+from .tag_index import tag_index
+
+BATCH_SIZE = 5000
+DEFAULT_INGREDIENTS = os.path.join(
+    os.path.dirname(settings.BASE_DIR), os.pardir, 'data',
+    'recipes_ingredient.json'
+)
+# Справочник: модель, поля ключа уникальности, остальные поля
+CATALOGS = {
+    'ingredients': (Ingredient, ('name', 'measurement_unit'), ()),
+    'tags': (Tag, ('slug',), ('name', 'color')),
+}
+
+
+def _clean(field, value):
+    """Значение после проверок поля модели: длина, формат slug и цвета."""
+    return field.clean(value, None)
+
+
+def _rows(model, records, fields):
+    """Проверенные значения полей записей справочника."""
+    model_fields = [model._meta.get_field(field) for field in fields]
+    for number, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            raise ValidationError(f'Запись {number}: ожидается объект')
+        try:
+            yield tuple(
+                _clean(field, record[field.name]) for field in model_fields
+            )
+        except KeyError as error:
+            raise ValidationError(f'Запись {number}: нет поля {error}')
+        except ValidationError as error:
+            raise ValidationError(f'Запись {number}: {error.messages[0]}')
+
+
+def _changes(model, rows, key_fields, value_fields):
+    """Записи, которых нет в базе или которые в ней отличаются."""
+    size = len(key_fields)
+    loaded = {
+        row[:size]: row[size:]
+        for row in model.objects.values_list(
+            *key_fields, *value_fields
+        ).iterator(chunk_size=BATCH_SIZE)
+    }
+    changes = {}
+    total = 0
+    for row in rows:
+        total += 1
+        if loaded.get(row[:size]) != row[size:]:
+            changes[row[:size]] = row[size:]
+    return total, changes
+
+
+def load(catalog, records, batch_size=BATCH_SIZE):
+    """Загрузить записи справочника; вернуть (число записей, записано)."""
+    model, key_fields, value_fields = CATALOGS[catalog]
+    fields = (*key_fields, *value_fields)
+    total, changes = _changes(
+        model, _rows(model, records, fields), key_fields, value_fields
+    )
+    if value_fields:
+        conflicts = {
+            'update_conflicts': True,
+            'unique_fields': key_fields,
+            'update_fields': value_fields,
+        }
+    else:
+        conflicts = {'ignore_conflicts': True}
+    objects = [
+        model(**dict(zip(fields, key + values)))
+        for key, values in changes.items()
+    ]
+    try:
+        with transaction.atomic():
+            for start in range(0, len(objects), batch_size):
+                model.objects.bulk_create(
+                    objects[start:start + batch_size], **conflicts
+                )
+    except IntegrityError as error:
+        # Например, название тега уже занято тегом с другим slug
+        raise ValidationError(f'Нарушена уникальность записей: {error}')
+    if model is Tag and changes:
+        # bulk_create не отправляет сигналы
+        tag_index.changed()
+    return total, len(changes)
@@ -0,0 +1,162 @@
+"""Журнал изменений для синхронизации офлайн-клиентов.
+
+Записи добавляются сигналами в той же транзакции, что и изменение.
+Клиент получает токен - курсор по журналу - и запрашивает изменения
+после него. На PostgreSQL журнал упорядочен по номеру транзакции, и
+читаются только записи транзакций старше самой старой незавершенной:
+транзакция, завершившаяся позже, не окажется перед выданным курсором.
+"""
+import collections
+import datetime as dt
+
+from django.core import signing
+from django.db import connections, router
+from django.db.models import BigIntegerField, Func, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Change
+
+RETENTION = dt.timedelta(days=30)
+# Запас на транзакции, начатые до выдачи токена и завершенные после
+PRUNE_MARGIN = dt.timedelta(days=1)
+LIMIT = 100
+MAX_LIMIT = 500
+SALT = 'recipes.changes'
+
+ChangeBatch = collections.namedtuple('ChangeBatch', 'changed cursor has_more')
+
+
+class ExpiredTokenError(Exception):
+    """Изменения после курсора могли быть удалены, нужна полная загрузка."""
+
+
+def _is_postgresql(alias):
+    return connections[alias].vendor == 'postgresql'
+
+
+def current_txid(alias):
+    """txid новой записи: номер текущей транзакции на PostgreSQL."""
+    if not _is_postgresql(alias):
+        return 0
+    return Func(function='txid_current', output_field=BigIntegerField())
+
+
+def _write(rows):
+    alias = router.db_for_write(Change)
+    txid = current_txid(alias)
+    Change.objects.using(alias).bulk_create(
+        Change(kind=kind, object_id=object_id, user_id=user_id, txid=txid)
+        for kind, object_id, user_id in rows
+    )
+
+
+def record(kind, object_ids, user_id=None):
+    """Отметить изменение объектов; user_id - владелец связи."""
+    _write((kind, object_id, user_id) for object_id in object_ids)
+
+
+def record_owners(kind, object_id, user_ids):
+    """Отметить изменение связи с объектом для нескольких владельцев."""
+    _write((kind, object_id, user_id) for user_id in user_ids)
+
+
+def encode(cursor):
+    """Подписанный токен курсора: клиент не может его подменить."""
+    return signing.TimestampSigner(salt=SALT).sign_object(list(cursor))
+
+
+def _expired(token, signer, change_id):
+    if not change_id:
+        # Журнал был пуст: удаленные с тех пор записи созданы после
+        # выдачи токена, поэтому срок считается от нее
+        try:
+            signer.unsign(token, max_age=RETENTION)
+        except signing.SignatureExpired:
+            return True
+        return False
+    # Запись курсора удаляет только prune - по сроку хранения
+    created = Change.objects.filter(pk=change_id).values_list(
+        'created', flat=True
+    ).first()
+    return created is None or created < timezone.now() - RETENTION
+
+
+def decode(token):
+    """Курсор (txid, id) из токена; ValueError для чужого токена.
+
+    ExpiredTokenError, если запись курсора старше срока хранения
+    журнала или уже удалена: следующие за ней записи могли быть удалены.
+    """
+    signer = signing.TimestampSigner(salt=SALT)
+    try:
+        txid, change_id = map(int, signer.unsign_object(token))
+    except (signing.BadSignature, TypeError, ValueError):
+        raise ValueError('Некорректный токен синхронизации.')
+    if _expired(token, signer, change_id):
+        raise ExpiredTokenError()
+    return txid, change_id
+
+
+def settled(queryset):
+    """Записи завершенных транзакций, порядок которых уже не изменится.
+
+    Для журналов с полями txid и id: курсор (txid, id) по таким записям
+    не пропустит транзакцию, завершившуюся позже.
+    """
+    if not _is_postgresql(queryset.db):
+        return queryset
+    return queryset.filter(txid__lt=RawSQL(
+        'txid_snapshot_xmin(txid_current_snapshot())', (),
+        output_field=BigIntegerField(),
+    ))
+
+
+def after(queryset, cursor):
+    """Записи журнала после курсора (txid, id)."""
+    txid, record_id = cursor
+    return queryset.filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=record_id))
+
+
+def head():
+    """Курсор последнего изменения: с него начинается синхронизация."""
+    last = settled(Change.objects.all()).order_by(
+        '-txid', '-id'
+    ).values_list('txid', 'id').first()
+    return last or (0, 0)
+
+
+def read(cursor, user=None, limit=LIMIT):
+    """Изменения после курсора, видимые пользователю.
+
+    changed - отсортированные id измененных объектов по видам.
+    """
+    visible = Q(user_id__isnull=True)
+    if user is not None and user.is_authenticated:
+        visible |= Q(user_id=user.pk)
+    rows = list(after(settled(Change.objects.all()), cursor).filter(
+        visible
+    ).order_by('txid', 'id').values_list(
+        'txid', 'id', 'kind', 'object_id'
+    )[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changed = collections.defaultdict(set)
+    for _, _, kind, object_id in rows:
+        changed[kind].add(object_id)
+    if rows:
+        cursor = rows[-1][:2]
+    return ChangeBatch(
+        {kind: sorted(ids) for kind, ids in changed.items()}, cursor, has_more
+    )
+
+
+def prune(retention=RETENTION):
+    """Удалить записи старше срока хранения; вернуть их число."""
+    cutoff = Change.objects.filter(
+        created__gte=timezone.now() - retention - PRUNE_MARGIN
+    ).order_by('id').values_list('id', flat=True).first()
+    old = Change.objects.all()
+    if cutoff is not None:
+        old = old.filter(id__lt=cutoff)
+    return old.delete()[0]
@@ -0,0 +1,289 @@
+"""Массовый импорт рецептов из NDJSON.
+
+Строка - рецепт в формате POST /api/recipes/ с необязательным полем
+author (username). Теги можно указать id или slug, ингредиенты - id или
+парой name и measurement_unit. Строки проверяются пакетами: теги
+и ингредиенты сверяются со словарями в памяти, авторы и занятые
+названия читаются одним запросом на пакет. Изображения декодируются
+и сохраняются пулом потоков, рецепты пакета с тегами и составом
+записываются bulk_create в одной транзакции.
+"""
+import base64
+import binascii
+import io
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from PIL import Image
+
+from . import changes
+from .models import (Change, Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                     Tag)
+from .pantry_index import pantry_index
+from .similarity import mark_stale
+from .tag_index import tag_index
+from stats import rollups
+from stats.models import DailyCount
+from users.models import User
+
+BATCH_SIZE = 500
+WORKERS = 4
+NAME_LENGTH = Recipe._meta.get_field('name').max_length
+
+
+def _positive(value):
+    return isinstance(value, int) and not isinstance(value, bool) and (
+        value >= 1
+    )
+
+
+class Catalog:
+    """Теги и ингредиенты в памяти для проверки строк без запросов."""
+
+    def __init__(self):
+        self.tags = {}
+        for pk, slug in Tag.objects.values_list('pk', 'slug'):
+            self.tags[pk] = self.tags[slug] = pk
+        self.ingredient_ids = set()
+        self.ingredients = {}
+        for pk, name, unit in Ingredient.objects.values_list(
+            'pk', 'name', 'measurement_unit'
+        ).iterator():
+            self.ingredient_ids.add(pk)
+            self.ingredients[name.lower(), unit.lower()] = pk
+
+    def tag(self, value):
+        if isinstance(value, (int, str)) and not isinstance(value, bool):
+            return self.tags.get(value)
+        return None
+
+    def ingredient(self, item):
+        pk = item.get('id')
+        if pk is not None:
+            return pk if _positive(pk) and pk in self.ingredient_ids else None
+        name, unit = item.get('name'), item.get('measurement_unit')
+        if isinstance(name, str) and isinstance(unit, str):
+            return self.ingredients.get((name.lower(), unit.lower()))
+        return None
+
+
+def _tags(values, catalog):
+    if not isinstance(values, list) or not values:
+        raise ValueError('Нужен непустой список тегов.')
+    tag_ids = [catalog.tag(value) for value in values]
+    if None in tag_ids:
+        raise ValueError('Неизвестный тег.')
+    return set(tag_ids)
+
+
+def _ingredients(items, catalog):
+    if not isinstance(items, list) or not items:
+        raise ValueError('Нужен непустой список ингредиентов.')
+    amounts = {}
+    for item in items:
+        if not isinstance(item, dict) or not _positive(item.get('amount')):
+            raise ValueError('Минимальное количество ингредиента - 1.')
+        pk = catalog.ingredient(item)
+        if pk is None:
+            raise ValueError('Неизвестный ингредиент.')
+        if pk in amounts:
+            raise ValueError('Ингредиенты не могут повторяться.')
+        amounts[pk] = item['amount']
+    return amounts
+
+
+def _fields(data):
+    name, text = data.get('name'), data.get('text')
+    errors = {}
+    if not isinstance(name, str) or not 0 < len(name) <= NAME_LENGTH:
+        errors['name'] = f'Нужна строка длиной от 1 до {NAME_LENGTH}.'
+    if not isinstance(text, str) or not text:
+        errors['text'] = 'Нужен непустой текст.'
+    if not _positive(data.get('cooking_time')):
+        errors['cooking_time'] = 'Минимальное значение: 1'
+    image = data.get('image')
+    if (
+        not isinstance(image, str) or not image.startswith('data:image/')
+        or ';base64,' not in image
+    ):
+        errors['image'] = 'Нужно изображение в формате data:image/...;base64'
+    author = data.get('author')
+    if author is not None and not isinstance(author, str):
+        errors['author'] = 'Нужен username автора.'
+    return errors
+
+
+def parse(line, catalog):
+    """Проверенная строка импорта; ValueError со словарем ошибок."""
+    try:
+        data = json.loads(line)
+    except ValueError as error:
+        raise ValueError({'line': f'Некорректный JSON: {error}'})
+    if not isinstance(data, dict):
+        raise ValueError({'line': 'Строка должна быть объектом JSON.'})
+    errors = _fields(data)
+    for field, check in (('tags', _tags), ('ingredients', _ingredients)):
+        try:
+            data[field] = check(data.get(field), catalog)
+        except ValueError as error:
+            errors[field] = str(error)
+    if errors:
+        raise ValueError(errors)
+    return data
+
+
+def store_image(data):
+    """Декодировать и проверить изображение, сохранить; вернуть имя файла."""
+    header, encoded = data.split(';base64,', 1)
+    try:
+        content = base64.b64decode(encoded, validate=True)
+        Image.open(io.BytesIO(content)).verify()
+    except (binascii.Error, ValueError, OSError):
+        raise ValueError('Файл не является изображением.')
+    extension = header.split('/')[-1]
+    return default_storage.save(
+        f'{uuid.uuid4().hex}.{extension}', ContentFile(content)
+    )
+
+
+class RecipeImporter:
+    """Импорт строк NDJSON пакетами по batch_size.
+
+    on_error(номер строки, ошибки) вызывается для отклоненных строк,
+    on_batch(номер строки) - после записи пакета: все строки до этого
+    номера обработаны, с него можно продолжить импорт.
+    """
+
+    def __init__(self, author=None, batch_size=BATCH_SIZE, workers=WORKERS,
+                 on_error=None, on_batch=None):
+        self.author = author
+        self.batch_size = batch_size
+        self.workers = workers
+        self.on_error = on_error or (lambda number, errors: None)
+        self.on_batch = on_batch or (lambda number: None)
+        self.created = self.failed = 0
+
+    def _reject(self, number, errors):
+        self.failed += 1
+        self.on_error(number, errors)
+
+    def _authors(self, rows):
+        names = {data['author'] for _, data in rows if data.get('author')}
+        authors = dict(User.objects.filter(
+            username__in=names
+        ).values_list('username', 'pk'))
+        resolved = []
+        for number, data in rows:
+            name = data.get('author')
+            author_id = authors.get(name) if name else getattr(
+                self.author, 'pk', None
+            )
+            if author_id is None:
+                self._reject(number, {'author': 'Автор не найден.'})
+                continue
+            resolved.append((number, author_id, data))
+        return resolved
+
+    def _unique(self, rows):
+        taken = set(Recipe.objects.filter(
+            author_id__in={author_id for _, author_id, _ in rows},
+            name__in={data['name'] for _, _, data in rows},
+        ).values_list('author_id', 'name'))
+        unique = []
+        for number, author_id, data in rows:
+            if (author_id, data['name']) in taken:
+                self._reject(number, {
+                    'name': 'У автора уже есть рецепт с таким названием.'
+                })
+                continue
+            taken.add((author_id, data['name']))
+            unique.append((number, author_id, data))
+        return unique
+
+    def _images(self, rows, executor):
+        stored = []
+        futures = [
+            executor.submit(store_image, data['image'])
+            for _, _, data in rows
+        ]
+        for (number, author_id, data), future in zip(rows, futures):
+            try:
+                stored.append((number, author_id, data, future.result()))
+            except ValueError as error:
+                self._reject(number, {'image': str(error)})
+        return stored
+
+    def _write(self, rows):
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=author_id, name=data['name'], image=image,
+                    text=data['text'], cooking_time=data['cooking_time'],
+                )
+                for _, author_id, data, image in rows
+            )
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, (_, _, data, _) in zip(recipes, rows)
+                for tag_id in data['tags']
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe_id=recipe.pk, ingredient_id=pk, amount=amount
+                )
+                for recipe, (_, _, data, _) in zip(recipes, rows)
+                for pk, amount in data['ingredients'].items()
+            )
+        return [recipe.pk for recipe in recipes]
+
+    def _batch(self, lines, catalog, executor):
+        rows = []
+        for number, line in lines:
+            try:
+                rows.append((number, parse(line, catalog)))
+            except ValueError as error:
+                self._reject(number, error.args[0])
+        rows = self._authors(rows) if rows else rows
+        rows = self._images(self._unique(rows) if rows else rows, executor)
+        if not rows:
+            return
+        try:
+            recipe_ids = self._write(rows)
+        except IntegrityError as error:
+            # Рецепт с тем же названием успели создать параллельно
+            for number, _, _, image in rows:
+                default_storage.delete(image)
+                self._reject(number, {'line': f'Ошибка записи: {error}'})
+            return
+        self.created += len(recipe_ids)
+        # bulk_create не отправляет сигналы
+        tag_index.changed(recipe_ids)
+        pantry_index.changed(recipe_ids)
+        mark_stale(recipe_ids)
+        changes.record(Change.RECIPE, recipe_ids)
+        rollups.count_day(DailyCount.RECIPES, created=len(recipe_ids))
+
+    def run(self, lines, start=0):
+        """Импортировать строки после номера start (нумерация с 1)."""
+        catalog = Catalog()
+        batch = []
+        number = start
+        with ThreadPoolExecutor(self.workers) as executor:
+            for number, line in enumerate(lines, 1):
+                if number <= start or not line.strip():
+                    continue
+                batch.append((number, line))
+                if len(batch) == self.batch_size:
+                    self._batch(batch, catalog, executor)
+                    self.on_batch(number)
+                    batch = []
+            if batch:
+                self._batch(batch, catalog, executor)
+            self.on_batch(number)
+        return {
+            'lines': number, 'created': self.created, 'failed': self.failed
+        }
@@ -0,0 +1,62 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram import fixtures
+
+
+def _models(label):
+    if '.' in label:
+        return [apps.get_model(label)]
+    return list(apps.get_app_config(label).get_models())
+
+
+def selected_models(labels, excluded):
+    """Модели по меткам app_label или app_label.Model, как в dumpdata."""
+    labels = labels or [config.label for config in apps.get_app_configs()]
+    try:
+        chosen = [model for label in labels for model in _models(label)]
+        excluded = {model for label in excluded for model in _models(label)}
+    except LookupError as error:
+        raise CommandError(error)
+    return [
+        model for model in dict.fromkeys(chosen)
+        if model not in excluded
+        and model._meta.managed and not model._meta.proxy
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Дамп таблиц в формате фикстур Django построчно (NDJSON) серверным '
+        'курсором, в ограниченной памяти. Читается командой load_fixture '
+        'и loaddata.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'labels', nargs='*', help='app_label или app_label.Model'
+        )
+        parser.add_argument(
+            '-e', '--exclude', action='append', default=[],
+            help='app_label или app_label.Model, не попадающие в дамп'
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл дампа, по умолчанию stdout'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=fixtures.BATCH_SIZE
+        )
+
+    def _blocks(self, models, chunk_size):
+        for model in fixtures.dependency_order(models):
+            yield from fixtures.dump(model, chunk_size=chunk_size)
+
+    def handle(self, *args, **options):
+        models = selected_models(options['labels'], options['exclude'])
+        blocks = self._blocks(models, options['chunk_size'])
+        if options['output'] == '-':
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            output.writelines(blocks)
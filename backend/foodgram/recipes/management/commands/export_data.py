@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from recipes import exports
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User
+
+MODELS = {
+    'recipes': Recipe,
+    'favorites': Favorite,
+    'shopping_cart': ShoppingCart,
+    'follows': Follow,
+    'users': User,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка рецептов, избранного, корзин, подписок или '
+        'пользователей в CSV или NDJSON серверным курсором.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(MODELS))
+        parser.add_argument(
+            '--format', choices=sorted(exports.FORMATS), default='csv'
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл выгрузки, по умолчанию stdout'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exports.CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        lines = exports.export(
+            MODELS[options['table']].objects.all(), options['format'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output'] == '-':
+            for block in lines:
+                self.stdout.write(block, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
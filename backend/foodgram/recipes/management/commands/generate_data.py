@@ -0,0 +1,207 @@
+import itertools
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodgram.jsonstream import iter_json
+from recipes import catalogs
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from recipes.pantry_index import pantry_index
+from recipes.tag_index import tag_index
+from stats import rollups
+from users.models import Follow, User
+
+SYNTHETIC_DOMAIN = 'synthetic.foodgram'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Веса популярности по степенному закону для count элементов."""
+    return list(itertools.accumulate(
+        1 / (rank ** exponent) for rank in range(1, count + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Детерминированная генерация синтетических пользователей, рецептов, '
+        'подписок, избранного и корзин для замеров производительности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes-per-user', type=float, default=5)
+        parser.add_argument('--follows-per-user', type=float, default=5)
+        parser.add_argument('--favorites-per-user', type=float, default=10)
+        parser.add_argument('--cart-per-user', type=float, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--ingredients-file', default=catalogs.DEFAULT_INGREDIENTS
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее сгенерированные данные'
+        )
+
+    def _count(self, mean):
+        """Длинный хвост: экспоненциальное распределение со средним mean."""
+        return int(self.random.expovariate(1 / mean)) if mean > 0 else 0
+
+    def _pick(self, population, weights, count):
+        count = min(count, len(population))
+        chosen = set()
+        while len(chosen) < count:
+            chosen.update(self.random.choices(
+                population, cum_weights=weights, k=count - len(chosen)
+            ))
+        return chosen
+
+    def _ensure_catalogs(self, path):
+        if not Ingredient.objects.exists():
+            with open(path, 'rb') as file:
+                catalogs.load(
+                    'ingredients', iter_json(file),
+                    batch_size=self.batch_size,
+                )
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+
+    def _create_users(self, count):
+        password = make_password(None)
+        offset = User.objects.filter(
+            email__endswith=f'@{SYNTHETIC_DOMAIN}'
+        ).count()
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f'synthetic{number}',
+                    email=f'synthetic{number}@{SYNTHETIC_DOMAIN}',
+                    first_name='Synthetic',
+                    last_name=f'User{number}',
+                    password=password,
+                )
+                for number in range(offset, offset + count)
+            ),
+            batch_size=self.batch_size,
+        )
+        return [user.pk for user in users]
+
+    def _create_recipes(self, user_ids, options):
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.random.shuffle(ingredient_ids)
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        tag_weights = zipf_weights(len(tag_ids), exponent=0.5)
+        recipe_ids = []
+        chunk_size = max(1, self.batch_size // 10)
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            recipes = [
+                Recipe(
+                    author_id=author_id,
+                    name=f'Рецепт {number} автора {author_id}',
+                    image='recipes/synthetic.jpg',
+                    text='Синтетический рецепт для нагрузочных замеров.',
+                    cooking_time=self.random.randint(5, 180),
+                )
+                for author_id in chunk
+                for number in range(
+                    self._count(options['recipes_per_user'])
+                )
+            ]
+            recipes = Recipe.objects.bulk_create(
+                recipes, batch_size=self.batch_size
+            )
+            recipe_tags, recipe_ingredients = [], []
+            for recipe in recipes:
+                recipe_ids.append(recipe.pk)
+                for tag_id in self._pick(
+                    tag_ids, tag_weights, self.random.randint(1, 2)
+                ):
+                    recipe_tags.append(
+                        RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                    )
+                for ingredient_id in self._pick(
+                    ingredient_ids, ingredient_weights,
+                    self.random.randint(3, 12)
+                ):
+                    recipe_ingredients.append(RecipeIngredient(
+                        recipe_id=recipe.pk,
+                        ingredient_id=ingredient_id,
+                        amount=self.random.randint(1, 500),
+                    ))
+            RecipeTag.objects.bulk_create(
+                recipe_tags, batch_size=self.batch_size
+            )
+            RecipeIngredient.objects.bulk_create(
+                recipe_ingredients, batch_size=self.batch_size
+            )
+        return recipe_ids
+
+    def _create_relations(self, model, field, user_ids, targets, mean):
+        """Связи пользователь -> цель с популярностью по степенному закону."""
+        if not targets:
+            return 0
+        targets = list(targets)
+        self.random.shuffle(targets)
+        weights = zipf_weights(len(targets))
+        created = 0
+        rows = []
+        for user_id in user_ids:
+            for target in self._pick(targets, weights, self._count(mean)):
+                if model is Follow and target == user_id:
+                    continue
+                rows.append(model(user_id=user_id, **{field: target}))
+            if len(rows) >= self.batch_size:
+                model.objects.bulk_create(rows, ignore_conflicts=True)
+                created += len(rows)
+                rows = []
+        model.objects.bulk_create(rows, ignore_conflicts=True)
+        return created + len(rows)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if options['clear']:
+            deleted, _ = User.objects.filter(
+                email__endswith=f'@{SYNTHETIC_DOMAIN}'
+            ).delete()
+            self.stdout.write(f'Удалено объектов: {deleted}')
+        with transaction.atomic():
+            self._ensure_catalogs(options['ingredients_file'])
+            user_ids = self._create_users(options['users'])
+            recipe_ids = self._create_recipes(user_ids, options)
+            # bulk_create не отправляет сигналы, индексы перестроятся
+            tag_index.changed()
+            pantry_index.changed()
+            follows = self._create_relations(
+                Follow, 'author_id', user_ids, user_ids,
+                options['follows_per_user']
+            )
+            favorites = self._create_relations(
+                Favorite, 'recipe_id', user_ids, recipe_ids,
+                options['favorites_per_user']
+            )
+            carts = self._create_relations(
+                ShoppingCart, 'recipe_id', user_ids, recipe_ids,
+                options['cart_per_user']
+            )
+            rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}, '
+            f'подписок: {follows}, избранного: {favorites}, '
+            f'в корзинах: {carts}'
+        ))
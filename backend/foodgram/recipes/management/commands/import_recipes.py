@@ -0,0 +1,98 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import imports
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Импорт рецептов из NDJSON пакетами bulk_create. Отклоненные строки '
+        'пишутся в отчет, после каждого пакета сохраняется контрольная '
+        'точка, с которой продолжается прерванный импорт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON, - для stdin')
+        parser.add_argument(
+            '--author',
+            help='username автора строк без поля author'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=imports.BATCH_SIZE
+        )
+        parser.add_argument('--workers', type=int, default=imports.WORKERS)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, удаляется после завершения'
+        )
+        parser.add_argument(
+            '--errors', default='-',
+            help='Отчет об ошибках в NDJSON, по умолчанию stderr'
+        )
+
+    def _start(self, checkpoint):
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint, encoding='utf-8') as file:
+            start = json.load(file)['line']
+        self.stderr.write(f'Продолжение после строки {start}')
+        return start
+
+    def _save_checkpoint(self, checkpoint, report, number):
+        # Ошибки строк до контрольной точки не должны потеряться
+        report.flush()
+        if not checkpoint:
+            return
+        temporary = f'{checkpoint}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'line': number}, file)
+        os.replace(temporary, checkpoint)
+
+    def _author(self, username):
+        if username is None:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise CommandError(f'Пользователь {username} не найден')
+        return author
+
+    def handle(self, *args, **options):
+        author = self._author(options['author'])
+        checkpoint = options['checkpoint']
+        start = self._start(checkpoint)
+        with contextlib.ExitStack() as stack:
+            report = sys.stderr if options['errors'] == '-' else (
+                stack.enter_context(open(
+                    options['errors'], 'a' if start else 'w',
+                    encoding='utf-8',
+                ))
+            )
+            source = sys.stdin.buffer if options['path'] == '-' else (
+                stack.enter_context(open(options['path'], 'rb'))
+            )
+            importer = imports.RecipeImporter(
+                author=author,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                on_error=lambda number, errors: report.write(json.dumps(
+                    {'line': number, 'errors': errors}, ensure_ascii=False
+                ) + '\n'),
+                on_batch=lambda number: self._save_checkpoint(
+                    checkpoint, report, number
+                ),
+            )
+            started = time.perf_counter()
+            summary = importer.run(source, start=start)
+        if checkpoint:
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк: {summary["lines"]}, создано рецептов: '
+            f'{summary["created"]}, отклонено: {summary["failed"]} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
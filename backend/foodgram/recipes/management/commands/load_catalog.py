@@ -0,0 +1,41 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.jsonstream import iter_json
+from recipes import catalogs
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка справочника ингредиентов или тегов из JSON-массива или '
+        'NDJSON. Пишутся только новые и измененные записи, повторная '
+        'загрузка того же файла ничего не меняет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(catalogs.CATALOGS))
+        parser.add_argument('path')
+        parser.add_argument(
+            '--batch-size', type=int, default=catalogs.BATCH_SIZE
+        )
+
+    def load(self, catalog, path, batch_size):
+        started = time.perf_counter()
+        try:
+            with open(path, 'rb') as file:
+                total, written = catalogs.load(
+                    catalog, iter_json(file), batch_size=batch_size
+                )
+        except ValidationError as error:
+            raise CommandError(error.messages[0])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей: {total}, добавлено или изменено: {written} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
+
+    def handle(self, *args, **options):
+        self.load(options['catalog'], options['path'], options['batch_size'])
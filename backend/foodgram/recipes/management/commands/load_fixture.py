@@ -0,0 +1,60 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DatabaseError
+
+from foodgram import fixtures
+from foodgram.jsonstream import iter_json
+from recipes.pantry_index import pantry_index
+from recipes.tag_index import tag_index
+from stats import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Загрузка фикстуры Django (JSON-массив, как db.json, или NDJSON '
+        'из dump_fixture) потоково: объекты пишутся пакетами bulk_create '
+        'в порядке зависимостей, затем сбрасываются последовательности. '
+        'В отличие от loaddata файл не читается в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл фикстуры, - для stdin')
+        parser.add_argument(
+            '--batch-size', type=int, default=fixtures.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--send-signals', action='store_true',
+            help='Отправлять post_save (raw=True) для каждого объекта'
+        )
+
+    def _load(self, file, options):
+        loader = fixtures.FixtureLoader(
+            batch_size=options['batch_size'],
+            send_signals=options['send_signals'],
+        )
+        try:
+            return loader.load(iter_json(file))
+        except (ValueError, DeserializationError, DatabaseError) as error:
+            raise CommandError(f'Фикстура не загружена: {error}')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['path'] == '-':
+            counts = self._load(sys.stdin.buffer, options)
+        else:
+            with open(options['path'], 'rb') as file:
+                counts = self._load(file, options)
+        # Индексы в памяти и счетчики строятся по загруженным таблицам
+        tag_index.changed()
+        pantry_index.changed()
+        rollups.rebuild()
+        for model, count in counts.items():
+            self.stdout.write(f'{model._meta.label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(counts.values())} за '
+            f'{time.perf_counter() - started:.1f} с. Похожие рецепты '
+            f'пересчитываются командой similar_recipes'
+        ))
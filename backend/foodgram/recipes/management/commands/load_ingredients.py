@@ -0,0 +1,20 @@
+from recipes import catalogs
+from recipes.management.commands import load_catalog
+
+
+class Command(load_catalog.Command):
+    help = (
+        'Загрузка справочника ингредиентов, по умолчанию из '
+        'data/recipes_ingredient.json. Повторный запуск ничего не меняет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=catalogs.DEFAULT_INGREDIENTS
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=catalogs.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        self.load('ingredients', options['path'], options['batch_size'])
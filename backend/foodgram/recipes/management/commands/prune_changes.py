@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes import changes, memory_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление записей журнала изменений старше срока действия токенов '
+        'синхронизации и журнала индексов в памяти старше суток. '
+        'Запускается периодически, например cron.'
+    )
+
+    def handle(self, *args, **options):
+        count = changes.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала: {count}'
+        ))
+        count = memory_index.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей журнала индексов: {count}'
+        ))
@@ -0,0 +1,53 @@
+import datetime as dt
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import trending
+from recipes.models import Favorite, ShoppingCart
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет рейтинга популярных рецептов для ordering=trending: '
+        'добавления в избранное и корзину за окно с экспоненциальным '
+        'затуханием по возрасту. Запускается периодически, например cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-days', type=float,
+            default=trending.WINDOW / dt.timedelta(days=1),
+            help='Учитываются события не старше этого числа дней'
+        )
+        parser.add_argument(
+            '--half-life-hours', type=float,
+            default=trending.HALF_LIFE / dt.timedelta(hours=1),
+            help='Через это время вклад события уменьшается вдвое'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=trending.LIMIT,
+            help='Число рецептов в рейтинге'
+        )
+        parser.add_argument(
+            '--favorite-weight', type=float, default=trending.FAVORITE_WEIGHT
+        )
+        parser.add_argument(
+            '--cart-weight', type=float, default=trending.CART_WEIGHT
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = trending.rank(
+            limit=options['limit'],
+            window=dt.timedelta(days=options['window_days']),
+            half_life=dt.timedelta(hours=options['half_life_hours']),
+            event_weights=(
+                (Favorite, options['favorite_weight']),
+                (ShoppingCart, options['cart_weight']),
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов в рейтинге: {count} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = (
+        'Расчет похожих рецептов по косинусной близости векторов '
+        'ингредиентов и тегов. По умолчанию пересчитывает всех; с '
+        '--incremental только рецепты, измененные с прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Пересчитать только рецепты из очереди изменений'
+        )
+        parser.add_argument('--top-k', type=int, default=similarity.TOP_K)
+        parser.add_argument(
+            '--chunk-size', type=int, default=similarity.CHUNK_SIZE,
+            help='Число рецептов в одном произведении матриц'
+        )
+        parser.add_argument(
+            '--tag-weight', type=float, default=similarity.TAG_WEIGHT,
+            help='Вес тегов относительно ингредиентов'
+        )
+        parser.add_argument(
+            '--max-df', type=float, default=similarity.MAX_DF,
+            help='Ингредиенты чаще этой доли рецептов не ищут кандидатов'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        vectors = similarity.RecipeVectors(
+            tag_weight=options['tag_weight'], max_df=options['max_df']
+        )
+        update = (
+            similarity.update_stale if options['incremental']
+            else similarity.rebuild
+        )
+        count = update(
+            vectors, top_k=options['top_k'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {count} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,205 @@
+"""Основа для индексов, которые каждый процесс держит в памяти.
+
+Изменение данных записывает id рецепта в журнал IndexDelta в той же
+транзакции. Каждый процесс, включая записавший, при обращении к индексу
+перечитывает из БД только рецепты из новых записей журнала. Целиком
+индекс строится при первом обращении, по записи без рецепта (пакетная
+загрузка, изменение тегов), при большом отставании и если процесс долго
+не обращался к индексу: старые записи журнала удаляет prune.
+"""
+import datetime as dt
+import threading
+import time
+
+import numpy as np
+from django.db import connection, router, transaction
+from django.utils import timezone
+
+from . import changes
+from .models import IndexDelta
+
+# Больше изменений дешевле перестроить индекс целиком
+MAX_REPLAY = 1000
+RETENTION = dt.timedelta(days=1)
+# Процесс, не обращавшийся к индексу дольше, мог не увидеть записи,
+# удаленные prune
+STALE_AFTER = RETENTION.total_seconds() / 2
+
+
+def grown(array, size):
+    """Массив емкостью не меньше size: емкость растет удвоением."""
+    if len(array) >= size:
+        return array
+    result = np.zeros(max(size, 2 * len(array), 16), dtype=array.dtype)
+    result[:len(array)] = array
+    return result
+
+
+def prune(retention=RETENTION):
+    """Удалить записи журнала индексов старше срока хранения."""
+    return IndexDelta.objects.filter(
+        created__lt=timezone.now() - retention
+    ).delete()[0]
+
+
+class RecipePositions:
+    """Позиции рецептов в массивах индекса: поиск по id и добавление."""
+
+    def __init__(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        self.size = len(ids)
+        self._ids = ids.copy()
+        self._order = np.argsort(ids, kind='stable')
+        self._sorted = ids[self._order]
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def ids(self):
+        return self._ids[:self.size]
+
+    def find(self, recipe_ids):
+        """Позиции рецептов и маска найденных id."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64).reshape(-1)
+        if not self.size:
+            return (
+                np.zeros(len(recipe_ids), dtype=np.int64),
+                np.zeros(len(recipe_ids), dtype=bool),
+            )
+        sorted_ids = self._sorted[:self.size]
+        index = np.minimum(
+            np.searchsorted(sorted_ids, recipe_ids), self.size - 1
+        )
+        return self._order[index], sorted_ids[index] == recipe_ids
+
+    def find_one(self, recipe_id):
+        positions, found = self.find([recipe_id])
+        return int(positions[0]) if found[0] else None
+
+    def append(self, recipe_id):
+        """Добавить рецепт в конец; id нового рецепта больше прежних."""
+        position = self.size
+        index = int(np.searchsorted(self._sorted[:position], recipe_id))
+        self._ids = grown(self._ids, position + 1)
+        self._ids[position] = recipe_id
+        if index == position:
+            self._sorted = grown(self._sorted, position + 1)
+            self._order = grown(self._order, position + 1)
+            self._sorted[position] = recipe_id
+            self._order[position] = position
+        else:
+            self._sorted = np.insert(self._sorted[:position], index, recipe_id)
+            self._order = np.insert(self._order[:position], index, position)
+        self.size += 1
+        return position
+
+
+class VersionedIndex:
+    """Индекс в памяти процесса, согласованный с журналом IndexDelta."""
+
+    name = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Последняя примененная запись журнала (txid, id)
+        self.cursor = None
+        self.synced = 0
+        self.pending = threading.local()
+
+    def build(self):
+        """Загрузить состояние индекса из БД."""
+        raise NotImplementedError
+
+    def refresh(self, recipe_ids):
+        """Перечитать рецепты из БД: добавить, обновить или исключить."""
+        raise NotImplementedError
+
+    def reset(self):
+        """Построить индекс заново при следующем обращении."""
+        with self.lock:
+            self.cursor = None
+
+    def _deltas(self):
+        return changes.settled(IndexDelta.objects.filter(index=self.name))
+
+    def _rebuild(self):
+        cursor = self._deltas().order_by('-txid', '-id').values_list(
+            'txid', 'id'
+        ).first()
+        self.build()
+        self.cursor = cursor or (0, 0)
+
+    def ensure_fresh(self):
+        cursor = self.cursor
+        if cursor is None or time.monotonic() - self.synced > STALE_AFTER:
+            with self.lock:
+                if self.cursor == cursor:
+                    self._rebuild()
+                    self.synced = time.monotonic()
+            return self
+        deltas = list(changes.after(self._deltas(), cursor).order_by(
+            'txid', 'id'
+        ).values_list('txid', 'id', 'recipe_id')[:MAX_REPLAY + 1])
+        self.synced = time.monotonic()
+        # Незафиксированные изменения своей транзакции не применяются:
+        # при откате индекс разошелся бы с базой
+        if not deltas or self._pending() is not None:
+            return self
+        with self.lock:
+            if self.cursor != cursor:
+                return self
+            recipe_ids = {recipe_id for _, _, recipe_id in deltas}
+            if len(deltas) > MAX_REPLAY or None in recipe_ids:
+                self._rebuild()
+            else:
+                self.refresh(sorted(recipe_ids))
+                self.cursor = deltas[-1][:2]
+        return self
+
+    def changed(self, recipe_ids=None):
+        """Записать в журнал изменение рецептов recipe_ids.
+
+        Без recipe_ids индекс перестроится целиком. Рецепт, уже
+        записанный в текущей транзакции, повторно не пишется.
+        """
+        state = self._pending() or self._start()
+        if state['rebuild']:
+            return
+        recipe_ids = None if recipe_ids is None else [
+            recipe_id for recipe_id in dict.fromkeys(recipe_ids)
+            if recipe_id not in state['recipes']
+        ]
+        if recipe_ids is None or (
+            len(state['recipes']) + len(recipe_ids) > MAX_REPLAY
+        ):
+            state['rebuild'] = True
+            recipe_ids = [None]
+        state['recipes'].update(recipe_ids)
+        alias = router.db_for_write(IndexDelta)
+        txid = changes.current_txid(alias)
+        IndexDelta.objects.using(alias).bulk_create(
+            IndexDelta(index=self.name, recipe_id=recipe_id, txid=txid)
+            for recipe_id in recipe_ids
+        )
+
+    def _start(self):
+        state = {'recipes': set(), 'rebuild': False}
+        if connection.in_atomic_block:
+            def callback():
+                self.pending.callback = None
+
+            self.pending.callback = callback
+            self.pending.state = state
+            transaction.on_commit(callback)
+        return state
+
+    def _pending(self):
+        """Изменения, записанные в журнал в текущей транзакции."""
+        callback = getattr(self.pending, 'callback', None)
+        if callback is None or not connection.in_atomic_block:
+            return None
+        # После отката транзакции Django удаляет ее on_commit-функции
+        if any(entry[1] is callback for entry in connection.run_on_commit):
+            return self.pending.state
+        return None
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0019_recipe_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('txid', models.BigIntegerField(default=0)),
+                ('kind', models.CharField(choices=[('recipe', 'Рецепт'), ('favorite', 'Избранное'), ('shopping_cart', 'Список покупок'), ('follow', 'Подписка')], max_length=20, verbose_name='Объект')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='id объекта')),
+                ('user_id', models.PositiveBigIntegerField(null=True, verbose_name='id владельца')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Изменен')),
+            ],
+            options={
+                'verbose_name': 'Изменение',
+                'verbose_name_plural': 'Журнал изменений',
+                'indexes': [models.Index(fields=['txid', 'id'], name='change_cursor_idx')],
+            },
+        ),
+    ]
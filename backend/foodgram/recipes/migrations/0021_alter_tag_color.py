@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:59
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0020_changes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tag',
+            name='color',
+            field=models.CharField(default='#FF0000', max_length=7, validators=[django.core.validators.RegexValidator(message='Неверный формат ввода (введите Hex код)', regex='^#[A-Fa-f0-9]{6}$')], verbose_name='Цвет'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_alter_tag_color'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexDelta',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('txid', models.BigIntegerField(default=0)),
+                ('index', models.CharField(max_length=64, verbose_name='Индекс')),
+                ('recipe_id', models.PositiveBigIntegerField(null=True, verbose_name='id рецепта')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Записано')),
+            ],
+            options={
+                'verbose_name': 'Изменение индекса',
+                'verbose_name_plural': 'Изменения индексов',
+            },
+        ),
+        migrations.DeleteModel(
+            name='IndexVersion',
+        ),
+        migrations.AddIndex(
+            model_name='indexdelta',
+            index=models.Index(fields=['index', 'txid', 'id'], name='index_delta_cursor_idx'),
+        ),
+    ]
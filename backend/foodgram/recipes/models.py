@@ -1,5 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.timezone import now
 
 from users.models import User
@@ -36,7 +38,7 @@ class Tag(models.Model):
     """Модель тега."""
 
     hex_validator = RegexValidator(
-        regex=r'^[A-Fa-f0-9]{6}$',
+        regex=r'^#[A-Fa-f0-9]{6}$',
         message=(
             'Неверный формат ввода (введите Hex код)'
         )
@@ -119,6 +121,18 @@ class Recipe(models.Model):
                 fields=['author', 'name'],
             ),
         ]
+        indexes = [
+            models.Index(fields=['-pubdate'], name='recipe_pubdate_idx'),
+            models.Index(
+                fields=['author', '-pubdate'],
+                name='recipe_author_pubdate_idx'
+            ),
+            # Поиск админки (icontains) на PostgreSQL
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='recipe_name_trgm_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}'
@@ -135,6 +149,7 @@ class RecipeTag(models.Model):
     tag = models.ForeignKey(
         Tag,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Тэг'
     )
 
@@ -147,6 +162,10 @@ class RecipeTag(models.Model):
                 fields=['recipe', 'tag'],
             ),
         ]
+        # Фильтр по тегам идет от тега к рецептам
+        indexes = [
+            models.Index(fields=['tag', 'recipe'], name='recipetag_tag_idx'),
+        ]
 
     def __str__(self):
         return f'{self.recipe} {self.tag}'
@@ -201,8 +220,15 @@ class Favorite(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='fav_recipe',
+        db_index=False,
         verbose_name='Рецепт'
     )
+    # Пусто у записей, добавленных до появления поля
+    created = models.DateTimeField(
+        auto_now_add=True,
+        null=True,
+        verbose_name='Добавлен'
+    )
 
     class Meta:
         verbose_name = 'Избранный рецепт'
@@ -213,6 +239,12 @@ class Favorite(models.Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_user_idx'
+            ),
+            models.Index(fields=['created'], name='favorite_created_idx'),
+        ]
 
 
 class ShoppingCart(models.Model):
@@ -228,8 +260,15 @@ class ShoppingCart(models.Model):
         Recipe,
         on_delete=models.CASCADE,
         related_name='shop_recipe',
+        db_index=False,
         verbose_name='Рецепт'
     )
+    # Пусто у записей, добавленных до появления поля
+    created = models.DateTimeField(
+        auto_now_add=True,
+        null=True,
+        verbose_name='Добавлен'
+    )
 
     class Meta:
         verbose_name = 'Рецепт в корзине'
@@ -240,3 +279,177 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='cart_recipe_user_idx'
+            ),
+            models.Index(fields=['created'], name='cart_created_idx'),
+        ]
+
+
+class RecipeSimilarity(models.Model):
+    """Предрасчитанный похожий рецепт (см. команду similar_recipes)."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        db_index=False,
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name='Место'
+    )
+    score = models.FloatField(
+        verbose_name='Косинусная близость'
+    )
+
+    class Meta:
+        ordering = ['recipe', 'rank']
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'rank'],
+                name='unique_similarity_rank'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} -> {self.similar_id}'
+
+
+class StaleSimilarity(models.Model):
+    """Рецепт, соседей которого нужно пересчитать."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Изменен'
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт для пересчета похожих'
+        verbose_name_plural = 'Рецепты для пересчета похожих'
+
+
+class TrendingRecipe(models.Model):
+    """Место рецепта в рейтинге популярности (см. команду rank_trending)."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    rank = models.PositiveIntegerField(
+        unique=True,
+        verbose_name='Место'
+    )
+    score = models.FloatField(
+        verbose_name='Популярность'
+    )
+
+    class Meta:
+        ordering = ['rank']
+        verbose_name = 'Популярный рецепт'
+        verbose_name_plural = 'Популярные рецепты'
+
+    def __str__(self):
+        return f'{self.rank}. {self.recipe_id}'
+
+
+class IndexDelta(models.Model):
+    """Изменение данных индекса в памяти процессов.
+
+    Процессы перечитывают рецепт recipe_id; пустой recipe_id означает
+    перестройку индекса целиком. Порядок - курсор (txid, id), как в
+    журнале изменений.
+    """
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField(default=0)
+    index = models.CharField(
+        max_length=64,
+        verbose_name='Индекс'
+    )
+    recipe_id = models.PositiveBigIntegerField(
+        null=True,
+        verbose_name='id рецепта'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Записано'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение индекса'
+        verbose_name_plural = 'Изменения индексов'
+        indexes = [
+            models.Index(
+                fields=['index', 'txid', 'id'], name='index_delta_cursor_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.index} {self.recipe_id}'
+
+
+class Change(models.Model):
+    """Запись журнала изменений для синхронизации офлайн-клиентов.
+
+    Хранит только, что объект изменился; текущее состояние читается
+    из его таблицы. Изменения избранного, корзины и подписок видны
+    только их владельцу.
+    """
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    FOLLOW = 'follow'
+    KINDS = [
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (FOLLOW, 'Подписка'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Номер транзакции PostgreSQL: курсор (txid, id) не пропускает
+    # изменения транзакций, завершившихся позже более новых
+    txid = models.BigIntegerField(default=0)
+    kind = models.CharField(
+        max_length=20,
+        choices=KINDS,
+        verbose_name='Объект'
+    )
+    object_id = models.PositiveBigIntegerField(verbose_name='id объекта')
+    user_id = models.PositiveBigIntegerField(
+        null=True,
+        verbose_name='id владельца'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Изменен'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение'
+        verbose_name_plural = 'Журнал изменений'
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='change_cursor_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
@@ -0,0 +1,156 @@
+"""Инвертированный индекс ингредиент -> рецепты для подбора по запасам.
+
+Списки рецептов хранятся как отсортированные массивы позиций int32,
+покрытие всех рецептов считается одним np.bincount по спискам
+ингредиентов пользователя.
+"""
+import collections
+
+import numpy as np
+
+from .memory_index import RecipePositions, VersionedIndex, grown
+from .models import Recipe, RecipeIngredient
+
+POSITION = np.int32
+
+
+class PantryMatch:
+    """Лучшие рецепты подбора: id, доля покрытия и число недостающих."""
+
+    def __init__(self, ids, coverage, missing, total):
+        self.ids = ids
+        self.coverage = coverage
+        self.missing = missing
+        self.total = total
+
+
+class PantryIndex(VersionedIndex):
+    name = 'recipe_ingredients'
+
+    def build(self):
+        rows = np.array(
+            Recipe.objects.values_list('id', 'cooking_time'), dtype=np.int64
+        ).reshape(-1, 2)
+        self.recipes = RecipePositions(rows[:, 0])
+        self.cooking_time = rows[:, 1].astype(POSITION)
+        self.alive = np.ones(len(self.recipes), dtype=bool)
+        links = np.array(
+            RecipeIngredient.objects.values_list('ingredient_id', 'recipe_id'),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        positions, found = self.recipes.find(links[:, 1])
+        ingredients, positions = links[found, 0], positions[found]
+        self.required = np.bincount(
+            positions, minlength=len(self.recipes)
+        ).astype(POSITION)
+        order = np.lexsort((positions, ingredients))
+        ingredients, positions = ingredients[order], positions[order]
+        keys, starts = np.unique(ingredients, return_index=True)
+        self.postings = {
+            int(key): chunk.astype(POSITION)
+            for key, chunk in zip(keys, np.split(positions, starts[1:]))
+        }
+        # Состав рецепта по позиции: при изменении рецепта меняются только
+        # его списки, а не все списки индекса
+        order = np.argsort(positions, kind='stable')
+        ingredients, positions = ingredients[order], positions[order]
+        keys, starts = np.unique(positions, return_index=True)
+        self.recipe_ingredients = {
+            int(key): chunk.tolist()
+            for key, chunk in zip(keys, np.split(ingredients, starts[1:]))
+        }
+
+    def _drop_postings(self, position):
+        for ingredient_id in self.recipe_ingredients.pop(position, ()):
+            posting = self.postings[ingredient_id]
+            index = np.searchsorted(posting, position)
+            if index < len(posting) and posting[index] == position:
+                self.postings[ingredient_id] = np.delete(posting, index)
+
+    def refresh(self, recipe_ids):
+        """Перечитать ингредиенты и время приготовления рецептов из БД."""
+        cooking_times = dict(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('id', 'cooking_time'))
+        ingredients = collections.defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe_id__in=cooking_times
+        ).values_list('recipe_id', 'ingredient_id'):
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            if recipe_id in cooking_times:
+                self._update(
+                    recipe_id, cooking_times[recipe_id], ingredients[recipe_id]
+                )
+            else:
+                self._remove(recipe_id)
+
+    def _update(self, recipe_id, cooking_time, ingredient_ids):
+        position = self.recipes.find_one(recipe_id)
+        if position is None:
+            position = self.recipes.append(recipe_id)
+            size = len(self.recipes)
+            self.cooking_time = grown(self.cooking_time, size)
+            self.required = grown(self.required, size)
+            self.alive = grown(self.alive, size)
+        else:
+            self._drop_postings(position)
+        for ingredient_id in ingredient_ids:
+            posting = self.postings.get(ingredient_id, np.empty(0, POSITION))
+            self.postings[ingredient_id] = np.insert(
+                posting, np.searchsorted(posting, position), position
+            )
+        if ingredient_ids:
+            self.recipe_ingredients[position] = list(ingredient_ids)
+        self.cooking_time[position] = cooking_time
+        self.required[position] = len(ingredient_ids)
+        self.alive[position] = True
+
+    def _remove(self, recipe_id):
+        position = self.recipes.find_one(recipe_id)
+        if position is not None:
+            self.alive[position] = False
+            self.required[position] = 0
+            self._drop_postings(position)
+
+    def match(self, ingredient_ids, limit, include=None,
+              max_cooking_time=None):
+        """Рецепты по убыванию покрытия и возрастанию числа недостающих."""
+        with self.lock:
+            postings = [
+                self.postings[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if ingredient_id in self.postings
+            ]
+            size = len(self.recipes)
+            have = np.bincount(
+                np.concatenate(postings) if postings
+                else np.empty(0, POSITION),
+                minlength=size,
+            )
+            mask = self.alive[:size] & (have > 0)
+            if max_cooking_time is not None:
+                mask &= self.cooking_time[:size] <= max_cooking_time
+            if include is not None:
+                allowed = np.zeros(size, dtype=bool)
+                positions, found = self.recipes.find(include)
+                allowed[positions[found]] = True
+                mask &= allowed
+            candidates = np.flatnonzero(mask)
+            coverage = have[candidates] / self.required[candidates]
+            missing = self.required[candidates] - have[candidates]
+            if len(candidates) > limit:
+                # Отсечь заведомо слабые, сохранив равные по покрытию
+                threshold = np.partition(coverage, -limit)[-limit]
+                keep = coverage >= threshold
+                candidates = candidates[keep]
+                coverage, missing = coverage[keep], missing[keep]
+            ids = self.recipes.ids[candidates]
+            best = np.lexsort((-ids, missing, -coverage))[:limit]
+            return PantryMatch(
+                ids[best].tolist(), coverage[best].tolist(),
+                missing[best].tolist(), int(mask.sum()),
+            )
+
+
+pantry_index = PantryIndex()
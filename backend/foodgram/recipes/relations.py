@@ -0,0 +1,145 @@
+"""Пакетное изменение связей пользователя: избранное, корзина, подписки.
+
+Связи имеют семантику множества: добавление существующей и удаление
+отсутствующей связи не ошибка, а отметка unchanged в ответе. Цели и
+связи с ними проверяются для всех id сразу, новые связи пишутся одним
+bulk_create, удаляемые - одним DELETE по списку id. Сигналов на
+каждую строку нет, поэтому журнал изменений и счетчики статистики
+обновляются в _recorded один раз на пакет - только по строкам, которые
+действительно вставлены или удалены этим запросом.
+"""
+import collections
+
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+
+from . import changes
+from .models import Change, Favorite, Recipe, ShoppingCart
+from stats import rollups
+from stats.models import DailyCount, TopCounter
+from users.models import Follow, User
+
+Relation = collections.namedtuple(
+    'Relation', 'field target kind counter metric'
+)
+# Поле цели, модель цели, вид в журнале изменений, счетчики статистики
+RELATIONS = {
+    Favorite: Relation(
+        'recipe_id', Recipe, Change.FAVORITE,
+        TopCounter.RECIPE_FAVORITES, DailyCount.FAVORITES,
+    ),
+    ShoppingCart: Relation(
+        'recipe_id', Recipe, Change.SHOPPING_CART, None, None
+    ),
+    Follow: Relation(
+        'author_id', User, Change.FOLLOW,
+        TopCounter.AUTHOR_FOLLOWERS, DailyCount.FOLLOWS,
+    ),
+}
+
+
+def _linked(model, user, ids):
+    """Существующие цели из ids и наличие связи с каждой."""
+    relation = RELATIONS[model]
+    return dict(relation.target.objects.filter(pk__in=ids).annotate(
+        linked=Exists(model.objects.filter(
+            user=user, **{relation.field: OuterRef('pk')}
+        ))
+    ).values_list('pk', 'linked'))
+
+
+def _recorded(model, user, ids, delta):
+    relation = RELATIONS[model]
+    changes.record(relation.kind, ids, user.pk)
+    if relation.counter is None:
+        return
+    rollups.count_objects(
+        relation.counter, [(object_id, delta) for object_id in ids]
+    )
+    if delta > 0:
+        rollups.count_day(relation.metric, created=len(ids))
+    else:
+        rollups.count_day(relation.metric, deleted=len(ids))
+
+
+def add(model, user, ids):
+    """Добавить связи пользователя с целями ids."""
+    relation = RELATIONS[model]
+    result = {'added': [], 'unchanged': [], 'rejected': [], 'not_found': []}
+    with transaction.atomic():
+        # Цели блокируются до конца транзакции: их не удалят, пока
+        # вставляются связи, а параллельное добавление тех же целей
+        # дождется фиксации. Связи читаются следующим запросом, чтобы
+        # увидеть зафиксированные за время ожидания
+        existing = set(relation.target.objects.select_for_update(
+            no_key=True
+        ).filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+        linked = set(model.objects.filter(
+            user=user, **{f'{relation.field}__in': existing}
+        ).values_list(relation.field, flat=True))
+        for object_id in ids:
+            if object_id not in existing:
+                result['not_found'].append(object_id)
+            elif model is Follow and object_id == user.pk:
+                result['rejected'].append(object_id)
+            elif object_id in linked:
+                result['unchanged'].append(object_id)
+            else:
+                result['added'].append(object_id)
+        if result['added']:
+            # Конфликт возможен только с одиночным добавлением той же
+            # связи, которое цели не блокирует
+            model.objects.bulk_create(
+                (
+                    model(user=user, **{relation.field: object_id})
+                    for object_id in result['added']
+                ),
+                ignore_conflicts=True,
+            )
+            _recorded(model, user, result['added'], 1)
+    return result
+
+
+def _deleted(model, user, ids):
+    """Удалить связи и вернуть id целей реально удаленных строк.
+
+    QuerySet.delete() отправлял бы post_delete на каждую строку, и
+    обработчики писали бы журнал и счетчики по одной строке. DELETE с
+    RETURNING удаляет связи одним запросом и возвращает только строки,
+    удаленные им, а не параллельным запросом: по ним _recorded обновляет
+    журнал и счетчики один раз на пакет.
+    """
+    opts = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    user_column = quote(opts.get_field('user').column)
+    target_column = quote(opts.get_field(RELATIONS[model].field).column)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} '
+            f'WHERE {user_column} = %s '
+            f'AND {target_column} IN ({placeholders}) '
+            f'RETURNING {target_column}',
+            [user.pk, *ids],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def remove(model, user, ids):
+    """Удалить связи пользователя с целями ids."""
+    result = {'removed': [], 'unchanged': [], 'not_found': []}
+    with transaction.atomic():
+        linked = _linked(model, user, ids)
+        present = [object_id for object_id in ids if linked.get(object_id)]
+        deleted = _deleted(model, user, present) if present else set()
+        for object_id in ids:
+            if object_id not in linked:
+                result['not_found'].append(object_id)
+            elif object_id in deleted:
+                result['removed'].append(object_id)
+            else:
+                result['unchanged'].append(object_id)
+        if result['removed']:
+            _recorded(model, user, result['removed'], -1)
+    return result
@@ -0,0 +1,122 @@
+"""Поддержка индексов в памяти и журнала изменений при записи данных."""
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from . import changes
+from .models import (Change, Favorite, Recipe, RecipeIngredient,
+                     RecipeSimilarity, RecipeTag, ShoppingCart, Tag)
+from .pantry_index import pantry_index
+from .similarity import mark_stale
+from .tag_index import tag_index
+from users.models import Follow, User
+
+RELATION_KINDS = {
+    Favorite: (Change.FAVORITE, 'recipe_id'),
+    ShoppingCart: (Change.SHOPPING_CART, 'recipe_id'),
+    Follow: (Change.FOLLOW, 'author_id'),
+}
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def recipe_tags_added(sender, instance, action, reverse, pk_set, **kwargs):
+    # Удаление связей приходит через post_delete RecipeTag
+    if action != 'post_add' or not pk_set:
+        return
+    tag_index.changed(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def recipe_tag_changed(sender, instance, origin=None, **kwargs):
+    # Удаление рецепта или тега записывается в журнал само
+    if not (cascaded_from(origin, Recipe) or cascaded_from(origin, Tag)):
+        tag_index.changed([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=RecipeIngredient)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        pantry_index.changed([instance.pk])
+    elif pk_set:
+        pantry_index.changed(pk_set)
+    else:
+        pantry_index.changed()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Recipe):
+        pantry_index.changed([instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    # Рецепт попадает в индексы и без тегов; состав, записанный
+    # bulk_create, процессы прочитают при применении журнала
+    tag_index.changed([instance.pk])
+    pantry_index.changed([instance.pk])
+    mark_stale([instance.pk])
+    changes.record(Change.RECIPE, [instance.pk])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Каскад уберет рецепт из списков похожих: эти списки пересчитаются
+    # и дополнятся следующим по близости рецептом
+    mark_stale(RecipeSimilarity.objects.filter(
+        similar=instance
+    ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    tag_index.changed([instance.pk])
+    pantry_index.changed([instance.pk])
+    changes.record(Change.RECIPE, [instance.pk])
+
+
+def cascaded_from(origin, model):
+    """Удаление запущено для объекта или queryset модели model."""
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def relation_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        kind, field = RELATION_KINDS[sender]
+        changes.record(kind, [getattr(instance, field)], instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def relation_deleted(sender, instance, origin=None, **kwargs):
+    # Удаление рецепта клиенты узнают из записи о нем самом, удаление
+    # пользователя - из записей о его рецептах и подписках на него
+    if cascaded_from(origin, Recipe) or cascaded_from(origin, User):
+        return
+    kind, field = RELATION_KINDS[sender]
+    changes.record(kind, [getattr(instance, field)], instance.user_id)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    changes.record_owners(
+        Change.FOLLOW, instance.pk,
+        Follow.objects.filter(author=instance).values_list(
+            'user_id', flat=True
+        ).iterator(),
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    tag_index.changed()
@@ -0,0 +1,250 @@
+"""Похожие рецепты: косинусная близость разреженных векторов состава.
+
+Признаки рецепта - его ингредиенты и теги с весами IDF, теги учитываются
+с понижающим коэффициентом. Кандидаты ищутся произведением разреженных
+матриц по редким признакам: самые частые ингредиенты (соль, вода) делают
+произведение почти плотным, поэтому в поиске кандидатов не участвуют.
+Кандидаты затем ранжируются по точной близости с учетом всех признаков.
+Рецепт только из частых признаков сравнивается с ограниченным числом
+рецептов, у которых есть самые редкие из его признаков.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .memory_index import RecipePositions
+from .models import (Recipe, RecipeIngredient, RecipeSimilarity, RecipeTag,
+                     StaleSimilarity)
+
+TOP_K = 10
+CHUNK_SIZE = 500
+TAG_WEIGHT = 0.3
+MAX_DF = 0.05
+OVERSAMPLE = 4
+
+
+def _pairs(queryset):
+    return np.array(queryset, dtype=np.int64).reshape(-1, 2)
+
+
+class RecipeVectors:
+    """Нормированные векторы всех рецептов и матрица для поиска кандидатов."""
+
+    def __init__(self, tag_weight=TAG_WEIGHT, max_df=MAX_DF):
+        # Изменения после этого момента векторы могут не учитывать
+        self.loaded = timezone.now()
+        self.recipes = RecipePositions(np.fromiter(
+            Recipe.objects.order_by('id').values_list('id', flat=True),
+            dtype=np.int64,
+        ))
+        ingredients = _pairs(
+            RecipeIngredient.objects.values_list('recipe_id', 'ingredient_id')
+        )
+        tags = _pairs(RecipeTag.objects.values_list('recipe_id', 'tag_id'))
+        ingredient_ids = np.unique(ingredients[:, 1])
+        tag_ids = np.unique(tags[:, 1])
+        rows, columns, kinds = [], [], []
+        for pairs, features, offset, kind in (
+            (ingredients, ingredient_ids, 0, 1.0),
+            (tags, tag_ids, len(ingredient_ids), tag_weight),
+        ):
+            positions, found = self.recipes.find(pairs[:, 0])
+            rows.append(positions[found])
+            columns.append(
+                offset + np.searchsorted(features, pairs[found, 1])
+            )
+            kinds.append(np.full(len(features), kind))
+        size = len(self.recipes)
+        matrix = sparse.csr_matrix(
+            (
+                np.ones(sum(map(len, rows)), dtype=np.float32),
+                (np.concatenate(rows), np.concatenate(columns)),
+            ),
+            shape=(size, len(ingredient_ids) + len(tag_ids)),
+        )
+        # Повторные связи рецепта с признаком не увеличивают вес
+        matrix.data[:] = 1
+        frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        weights = np.concatenate(kinds) * (
+            np.log((1 + size) / (1 + frequency)) + 1
+        )
+        matrix = matrix @ sparse.diags(weights.astype(np.float32))
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)))
+        norms[norms == 0] = 1
+        self.matrix = sparse.csr_matrix(
+            sparse.diags(1 / norms.ravel()) @ matrix, dtype=np.float32
+        )
+        self.frequency = frequency
+        # Рецепты каждого признака: столбцы матрицы
+        self.features = self.matrix.tocsc()
+        rare = sparse.diags(
+            (frequency <= max(max_df * size, 1)).astype(np.float32)
+        )
+        self.candidates = sparse.csr_matrix(self.matrix @ rare)
+        self.candidates_t = self.candidates.T.tocsr()
+
+    def _candidates(self, position, row, top_k):
+        start, end = row.indptr[0], row.indptr[1]
+        columns, scores = row.indices[start:end], row.data[start:end]
+        keep = columns != position
+        columns, scores = columns[keep], scores[keep]
+        limit = top_k * OVERSAMPLE
+        if len(columns) > limit:
+            columns = columns[np.argpartition(scores, -limit)[-limit:]]
+        if not len(columns):
+            columns = self._fallback(position, limit)
+        return columns
+
+    def _fallback(self, position, limit):
+        """Кандидаты рецепта без редких признаков: не больше limit.
+
+        Берутся рецепты его признаков от самого редкого, пока их не
+        наберется limit: сравнение со всеми рецептами сделало бы
+        пересчет квадратичным.
+        """
+        start, end = self.matrix.indptr[position:position + 2]
+        features = self.matrix.indices[start:end]
+        found = []
+        count = 0
+        for feature in features[np.argsort(
+            self.frequency[features], kind='stable'
+        )]:
+            first, last = self.features.indptr[feature:feature + 2]
+            found.append(
+                self.features.indices[first:min(last, first + limit - count)]
+            )
+            count += len(found[-1])
+            if count >= limit:
+                break
+        columns = np.concatenate(found) if found else np.empty(0, np.int64)
+        return np.setdiff1d(columns, [position])
+
+    def neighbours(self, positions, top_k=TOP_K):
+        """Пары (id рецепта, [(id похожего, близость), ...]) для позиций."""
+        product = (self.candidates[positions] @ self.candidates_t).tocsr()
+        for index, position in enumerate(positions):
+            columns = self._candidates(
+                position, product[index], top_k
+            )
+            exact = (
+                self.matrix[columns] @ self.matrix[position].T
+            ).toarray().ravel()
+            found = exact > 0
+            columns, exact = columns[found], exact[found]
+            best = np.lexsort((columns, -exact))[:top_k]
+            yield int(self.recipes.ids[position]), [
+                (int(self.recipes.ids[column]), float(score))
+                for column, score in zip(columns[best], exact[best])
+            ]
+
+    def score(self, recipe_id, other_id):
+        positions, found = self.recipes.find([recipe_id, other_id])
+        if not found.all():
+            return 0.0
+        first, second = positions
+        return float(
+            self.matrix[first].multiply(self.matrix[second]).sum()
+        )
+
+
+def mark_stale(recipe_ids):
+    """Поставить рецепты в очередь на пересчет похожих."""
+    StaleSimilarity.objects.bulk_create(
+        [StaleSimilarity(recipe_id=recipe_id) for recipe_id in recipe_ids],
+        update_conflicts=True, unique_fields=['recipe'],
+        update_fields=['created'],
+    )
+
+
+def store(results):
+    """Заменить сохраненных соседей рецептов из results."""
+    results = dict(results)
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id__in=results).delete()
+        RecipeSimilarity.objects.bulk_create(
+            RecipeSimilarity(
+                recipe_id=recipe_id, similar_id=similar_id, rank=rank,
+                score=score,
+            )
+            for recipe_id, similar in results.items()
+            for rank, (similar_id, score) in enumerate(similar, 1)
+        )
+
+
+def rebuild(vectors, top_k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Пересчитать соседей всех рецептов, сохраняя по частям."""
+    size = len(vectors.recipes)
+    for start in range(0, size, chunk_size):
+        positions = np.arange(start, min(start + chunk_size, size))
+        store(vectors.neighbours(positions, top_k))
+    StaleSimilarity.objects.filter(created__lt=vectors.loaded).delete()
+    return size
+
+
+def _merge(current, recipe_id, score, top_k):
+    """Обновить близость recipe_id в списке соседей другого рецепта."""
+    merged = [item for item in current if item[0] != recipe_id]
+    if score > 0:
+        merged.append((recipe_id, score))
+    merged.sort(key=lambda item: (-item[1], item[0]))
+    return merged[:top_k]
+
+
+def _affected(vectors, results):
+    """Новая близость измененных рецептов для списков других рецептов."""
+    affected = {}
+    for recipe_id, similar in results.items():
+        for similar_id, score in similar:
+            affected.setdefault(similar_id, {})[recipe_id] = score
+    for recipe_id, similar_id in RecipeSimilarity.objects.filter(
+        similar_id__in=results
+    ).values_list('recipe_id', 'similar_id'):
+        scores = affected.setdefault(recipe_id, {})
+        if similar_id not in scores:
+            scores[similar_id] = vectors.score(recipe_id, similar_id)
+    return {
+        recipe_id: scores for recipe_id, scores in affected.items()
+        if recipe_id not in results
+    }
+
+
+def _merged_lists(affected, top_k):
+    lists = {recipe_id: [] for recipe_id in affected}
+    for recipe_id, similar_id, score in RecipeSimilarity.objects.filter(
+        recipe_id__in=affected
+    ).order_by('recipe_id', 'rank').values_list(
+        'recipe_id', 'similar_id', 'score'
+    ):
+        lists[recipe_id].append((similar_id, score))
+    for recipe_id, scores in affected.items():
+        for similar_id, score in scores.items():
+            lists[recipe_id] = _merge(
+                lists[recipe_id], similar_id, score, top_k
+            )
+    return lists
+
+
+def update_stale(vectors, top_k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Пересчитать соседей измененных рецептов и обновить их у соседей.
+
+    Рецепт попадает в списки тех рецептов, для которых он теперь ближе
+    последнего соседа; из прежних списков он уходит или остается
+    с новой близостью.
+    """
+    stale = list(StaleSimilarity.objects.filter(
+        created__lt=vectors.loaded
+    ).values_list('recipe_id', flat=True))
+    positions, found = vectors.recipes.find(stale)
+    positions = positions[found]
+    for start in range(0, len(positions), chunk_size):
+        results = dict(vectors.neighbours(
+            positions[start:start + chunk_size], top_k
+        ))
+        results.update(_merged_lists(_affected(vectors, results), top_k))
+        store(results)
+    # Рецепты, измененные после загрузки векторов, останутся в очереди
+    StaleSimilarity.objects.filter(
+        recipe_id__in=stale, created__lt=vectors.loaded
+    ).delete()
+    return len(positions)
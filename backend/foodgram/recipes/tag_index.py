@@ -0,0 +1,122 @@
+"""Битовые карты рецептов по тегам для фильтра и фасетов.
+
+Позиция бита - место рецепта в порядке (pubdate, id): новые рецепты
+добавляются в конец, поэтому выдача от новых к старым идет с конца карты.
+"""
+import collections
+
+import numpy as np
+
+from .memory_index import RecipePositions, VersionedIndex, grown
+from .models import Recipe, RecipeTag, Tag
+
+
+class TagSelection:
+    """Результат фильтра: id от новых к старым и счетчики по тегам.
+
+    Поддерживает len() и срезы, поэтому подходит для пагинатора.
+    """
+
+    def __init__(self, ids, facets=None):
+        self.ids = ids
+        self.facets = facets
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, item):
+        return self.ids[item].tolist()
+
+
+class TagIndex(VersionedIndex):
+    name = 'recipe_tags'
+
+    def build(self):
+        self.recipes = RecipePositions(np.fromiter(
+            Recipe.objects.order_by('pubdate', 'id').values_list(
+                'id', flat=True
+            ), dtype=np.int64,
+        ))
+        size = len(self.recipes)
+        self.alive = np.ones(size, dtype=bool)
+        self.slugs = dict(Tag.objects.values_list('slug', 'id'))
+        self.bitmaps = {
+            tag_id: np.zeros(size, dtype=bool)
+            for tag_id in self.slugs.values()
+        }
+        links = np.array(
+            RecipeTag.objects.values_list('recipe_id', 'tag_id'),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        positions, found = self.recipes.find(links[:, 0])
+        for tag_id, bitmap in self.bitmaps.items():
+            bitmap[positions[found & (links[:, 1] == tag_id)]] = True
+
+    def _position(self, recipe_id):
+        position = self.recipes.find_one(recipe_id)
+        if position is None:
+            position = self.recipes.append(recipe_id)
+            size = len(self.recipes)
+            self.alive = grown(self.alive, size)
+            for tag_id, bitmap in self.bitmaps.items():
+                self.bitmaps[tag_id] = grown(bitmap, size)
+        return position
+
+    def refresh(self, recipe_ids):
+        """Перечитать теги рецептов; рецепт без тегов тоже получает место."""
+        existing = set(Recipe.objects.filter(pk__in=recipe_ids).values_list(
+            'pk', flat=True
+        ))
+        tags = collections.defaultdict(set)
+        for recipe_id, tag_id in RecipeTag.objects.filter(
+            recipe_id__in=existing
+        ).values_list('recipe_id', 'tag_id'):
+            tags[recipe_id].add(tag_id)
+        for recipe_id in recipe_ids:
+            if recipe_id in existing:
+                position = self._position(recipe_id)
+            else:
+                position = self.recipes.find_one(recipe_id)
+                if position is None:
+                    continue
+            self.alive[position] = recipe_id in existing
+            for tag_id in tags[recipe_id] - self.bitmaps.keys():
+                self.bitmaps[tag_id] = np.zeros(len(self.alive), dtype=bool)
+            for tag_id, bitmap in self.bitmaps.items():
+                bitmap[position] = tag_id in tags[recipe_id]
+
+    def _mask_of(self, recipe_ids):
+        mask = np.zeros(len(self.recipes), dtype=bool)
+        positions, found = self.recipes.find(list(recipe_ids))
+        mask[positions[found]] = True
+        return mask
+
+    def select(self, slugs=(), match_all=False, include=None, facets=False):
+        """Рецепты с любым (или каждым) из тегов среди include."""
+        with self.lock:
+            size = len(self.recipes)
+            mask = self.alive[:size].copy()
+            if slugs:
+                empty = np.zeros(size, dtype=bool)
+                bitmaps = [
+                    self.bitmaps.get(self.slugs.get(slug), empty)[:size]
+                    for slug in slugs
+                ]
+                combine = np.logical_and if match_all else np.logical_or
+                mask &= combine.reduce(bitmaps)
+            if include is not None:
+                mask &= self._mask_of(include)
+            counts = None
+            if facets:
+                counts = {
+                    slug: int(np.count_nonzero(
+                        mask & self.bitmaps[tag_id][:size]
+                    ))
+                    for slug, tag_id in self.slugs.items()
+                }
+            return TagSelection(
+                self.recipes.ids[np.flatnonzero(mask)[::-1]], counts
+            )
+
+
+tag_index = TagIndex()
@@ -0,0 +1,85 @@
+"""Рейтинг популярных рецептов по недавним добавлениям в избранное и корзину.
+
+Вклад события затухает экспоненциально с его возрастом. Рейтинг
+пересчитывается периодически командой rank_trending, запрос списка
+с ordering=trending только читает готовый порядок.
+"""
+import datetime as dt
+import itertools
+import math
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Favorite, ShoppingCart, TrendingRecipe
+
+WINDOW = dt.timedelta(days=7)
+HALF_LIFE = dt.timedelta(days=2)
+LIMIT = 5000
+CHUNK_SIZE = 10000
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 0.5
+EVENT_WEIGHTS = ((Favorite, FAVORITE_WEIGHT), (ShoppingCart, CART_WEIGHT))
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def scores(now=None, window=WINDOW, half_life=HALF_LIFE,
+           event_weights=EVENT_WEIGHTS, chunk_size=CHUNK_SIZE):
+    """Сумма затухающих вкладов событий окна по рецептам: id и очки."""
+    now = now or timezone.now()
+    decay = math.log(2) / half_life.total_seconds()
+    totals = {}
+    for model, weight in event_weights:
+        events = model.objects.filter(
+            created__gte=now - window
+        ).values_list('recipe_id', 'created').iterator(chunk_size=chunk_size)
+        for chunk in _chunks(events, chunk_size):
+            recipe_ids = np.fromiter(
+                (recipe_id for recipe_id, _ in chunk), dtype=np.int64,
+                count=len(chunk),
+            )
+            ages = np.fromiter(
+                ((now - created).total_seconds() for _, created in chunk),
+                dtype=np.float64, count=len(chunk),
+            )
+            keys, inverse = np.unique(recipe_ids, return_inverse=True)
+            sums = np.bincount(inverse, weight * np.exp(-decay * ages))
+            for recipe_id, score in zip(keys.tolist(), sums.tolist()):
+                totals[recipe_id] = totals.get(recipe_id, 0.0) + score
+    recipe_ids = np.fromiter(totals, dtype=np.int64, count=len(totals))
+    return recipe_ids, np.fromiter(
+        totals.values(), dtype=np.float64, count=len(totals)
+    )
+
+
+def rank(limit=LIMIT, **options):
+    """Пересчитать рейтинг и заменить сохраненный; вернуть его размер."""
+    recipe_ids, totals = scores(**options)
+    best = np.lexsort((recipe_ids, -totals))[:limit]
+    with transaction.atomic():
+        TrendingRecipe.objects.all().delete()
+        TrendingRecipe.objects.bulk_create(
+            TrendingRecipe(recipe_id=recipe_id, rank=place, score=score)
+            for place, (recipe_id, score) in enumerate(
+                zip(recipe_ids[best].tolist(), totals[best].tolist()), 1
+            )
+        )
+    return len(best)
+
+
+def ranking():
+    """id рецептов рейтинга от самого популярного."""
+    return np.fromiter(
+        TrendingRecipe.objects.order_by('rank').values_list(
+            'recipe_id', flat=True
+        ), dtype=np.int64,
+    )
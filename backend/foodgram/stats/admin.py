@@ -0,0 +1,4 @@
+from django.contrib import admin
+
+# Главная страница админки с панелью статистики из счетчиков
+admin.site.index_template = 'admin/stats_index.html'
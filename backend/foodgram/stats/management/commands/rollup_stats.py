@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from stats import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчет числа рецептов с каждым ингредиентом для панели '
+        'статистики; запускается периодически. С --rebuild восстанавливает '
+        'все счетчики по исходным таблицам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать дневные счетчики и все списки лидеров'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rollups.rebuild()
+        else:
+            rollups.rollup_ingredients()
+        self.stdout.write(self.style.SUCCESS('Счетчики статистики обновлены'))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('recipes', 'Рецепты'), ('users', 'Пользователи'), ('favorites', 'Избранное'), ('follows', 'Подписки')], max_length=20, verbose_name='Показатель')),
+                ('day', models.DateField(verbose_name='День')),
+                ('created', models.PositiveIntegerField(default=0, verbose_name='Создано')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено')),
+            ],
+            options={
+                'verbose_name': 'Дневной счетчик',
+                'verbose_name_plural': 'Дневные счетчики',
+                'ordering': ['-day', 'metric'],
+                'constraints': [models.UniqueConstraint(fields=('metric', 'day'), name='unique_daily_count')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TopCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipe_favorites', 'Добавления рецепта в избранное'), ('author_followers', 'Подписчики автора'), ('ingredient_recipes', 'Рецепты с ингредиентом')], max_length=20, verbose_name='Счетчик')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='id объекта')),
+                ('count', models.IntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик объекта',
+                'verbose_name_plural': 'Счетчики объектов',
+                'indexes': [models.Index(fields=['kind', '-count', 'object_id'], name='top_counter_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_top_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db import models
+
+
+class DailyCount(models.Model):
+    """Число созданных и удаленных объектов за день."""
+    RECIPES = 'recipes'
+    USERS = 'users'
+    FAVORITES = 'favorites'
+    FOLLOWS = 'follows'
+    METRICS = [
+        (RECIPES, 'Рецепты'),
+        (USERS, 'Пользователи'),
+        (FAVORITES, 'Избранное'),
+        (FOLLOWS, 'Подписки'),
+    ]
+
+    metric = models.CharField(
+        max_length=20,
+        choices=METRICS,
+        verbose_name='Показатель'
+    )
+    day = models.DateField(verbose_name='День')
+    created = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Создано'
+    )
+    deleted = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Удалено'
+    )
+
+    class Meta:
+        ordering = ['-day', 'metric']
+        verbose_name = 'Дневной счетчик'
+        verbose_name_plural = 'Дневные счетчики'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['metric', 'day'],
+                name='unique_daily_count'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.metric}: +{self.created} -{self.deleted}'
+
+
+class TopCounter(models.Model):
+    """Текущее значение счетчика объекта для списков лидеров."""
+    RECIPE_FAVORITES = 'recipe_favorites'
+    AUTHOR_FOLLOWERS = 'author_followers'
+    INGREDIENT_RECIPES = 'ingredient_recipes'
+    KINDS = [
+        (RECIPE_FAVORITES, 'Добавления рецепта в избранное'),
+        (AUTHOR_FOLLOWERS, 'Подписчики автора'),
+        (INGREDIENT_RECIPES, 'Рецепты с ингредиентом'),
+    ]
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KINDS,
+        verbose_name='Счетчик'
+    )
+    object_id = models.PositiveBigIntegerField(verbose_name='id объекта')
+    count = models.IntegerField(default=0, verbose_name='Значение')
+
+    class Meta:
+        verbose_name = 'Счетчик объекта'
+        verbose_name_plural = 'Счетчики объектов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_top_counter'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['kind', '-count', 'object_id'],
+                name='top_counter_rank_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}: {self.count}'
@@ -0,0 +1,191 @@
+"""Счетчики для панели статистики админки.
+
+Дневные счетчики и счетчики избранного и подписчиков обновляются
+сигналами одним UPSERT на событие. Рецепты с ингредиентом
+пересчитываются командой rollup_stats: состав рецепта записывается
+через bulk_create, без сигналов. Она же с --rebuild восстанавливает
+все счетчики по исходным таблицам.
+"""
+import datetime as dt
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyCount, TopCounter
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient
+from users.models import Follow, User
+
+# Модель и поле с подписью объекта в списке лидеров
+TOP_LABELS = {
+    TopCounter.RECIPE_FAVORITES: (Recipe, 'name'),
+    TopCounter.AUTHOR_FOLLOWERS: (User, 'username'),
+    TopCounter.INGREDIENT_RECIPES: (Ingredient, 'name'),
+}
+
+
+def _increment(model, keys, deltas, rows):
+    """INSERT ... ON CONFLICT DO UPDATE, прибавляющий deltas к строкам.
+
+    rows - значения keys и затем deltas для каждой строки.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [*keys, *deltas]
+    sql = (
+        f'INSERT INTO {table} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(map(quote, keys))}) DO UPDATE SET '
+        + ', '.join(
+            f'{quote(column)} = {table}.{quote(column)} '
+            f'+ EXCLUDED.{quote(column)}'
+            for column in deltas
+        )
+    )
+    rows = list(rows)
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+
+def count_day(metric, created=0, deleted=0):
+    _increment(
+        DailyCount, ('metric', 'day'), ('created', 'deleted'),
+        [(metric, timezone.localdate(), created, deleted)],
+    )
+
+
+def count_objects(kind, deltas):
+    """Прибавить к счетчикам объектов пары (id объекта, приращение)."""
+    _increment(
+        TopCounter, ('kind', 'object_id'), ('count',),
+        [(kind, object_id, delta) for object_id, delta in deltas],
+    )
+
+
+def count_object(kind, object_id, delta):
+    count_objects(kind, [(object_id, delta)])
+
+
+def forget_links(queryset, field, kind, metric):
+    """Списать связи queryset перед их каскадным удалением."""
+    removed = [
+        (object_id, -count)
+        for object_id, count in _grouped(queryset, field)
+    ]
+    if removed:
+        count_objects(kind, removed)
+        count_day(metric, deleted=-sum(count for _, count in removed))
+
+
+def drop_object(kind, object_id, metric):
+    """Удалить счетчик объекта, списав остаток связей как удаленные."""
+    counters = TopCounter.objects.filter(kind=kind, object_id=object_id)
+    remaining = counters.values_list('count', flat=True).first()
+    if remaining and remaining > 0:
+        count_day(metric, deleted=remaining)
+    if remaining is not None:
+        counters.delete()
+
+
+def _replace_counters(kind, rows):
+    TopCounter.objects.filter(kind=kind).delete()
+    TopCounter.objects.bulk_create(
+        (
+            TopCounter(kind=kind, object_id=object_id, count=count)
+            for object_id, count in rows
+        ),
+        batch_size=5000,
+    )
+
+
+def _grouped(queryset, field):
+    return queryset.order_by().values_list(field).annotate(count=Count('*'))
+
+
+def rollup_ingredients():
+    """Пересчитать число рецептов с каждым ингредиентом."""
+    with transaction.atomic():
+        _replace_counters(
+            TopCounter.INGREDIENT_RECIPES,
+            _grouped(RecipeIngredient.objects, 'ingredient_id').iterator(),
+        )
+
+
+def rebuild():
+    """Восстановить все счетчики по исходным таблицам.
+
+    У подписок и избранного, добавленного до появления даты создания,
+    дня нет: они учитываются текущим днем.
+    """
+    today = timezone.localdate()
+    daily = [
+        (DailyCount.RECIPES, _grouped(Recipe.objects, 'pubdate')),
+        (DailyCount.USERS, _grouped(
+            User.objects.annotate(day=TruncDate('date_joined')), 'day'
+        )),
+        (DailyCount.FAVORITES, _grouped(
+            Favorite.objects.annotate(
+                day=Coalesce(TruncDate('created'), Value(today))
+            ), 'day'
+        )),
+        (DailyCount.FOLLOWS, [(today, Follow.objects.count())]),
+    ]
+    with transaction.atomic():
+        DailyCount.objects.all().delete()
+        DailyCount.objects.bulk_create(
+            DailyCount(metric=metric, day=day, created=count)
+            for metric, rows in daily
+            for day, count in rows
+            if count
+        )
+        _replace_counters(
+            TopCounter.RECIPE_FAVORITES,
+            _grouped(Favorite.objects, 'recipe_id').iterator(),
+        )
+        _replace_counters(
+            TopCounter.AUTHOR_FOLLOWERS,
+            _grouped(Follow.objects, 'author_id').iterator(),
+        )
+        rollup_ingredients()
+
+
+def dashboard(days=14, top=10):
+    """Данные панели статистики: только из таблиц счетчиков."""
+    totals = dict(DailyCount.objects.order_by().values_list(
+        'metric'
+    ).annotate(total=Sum('created') - Sum('deleted')))
+    since = timezone.localdate() - dt.timedelta(days=days - 1)
+    by_day = {}
+    for metric, day, created in DailyCount.objects.filter(
+        day__gte=since
+    ).values_list('metric', 'day', 'created'):
+        by_day.setdefault(day, {})[metric] = created
+    leaders = []
+    for kind, title in TopCounter.KINDS:
+        counters = list(TopCounter.objects.filter(
+            kind=kind, count__gt=0
+        ).order_by('-count', 'object_id')[:top])
+        model, field = TOP_LABELS[kind]
+        labels = dict(model.objects.filter(
+            pk__in=[counter.object_id for counter in counters]
+        ).values_list('pk', field))
+        leaders.append((title, [
+            (labels.get(counter.object_id, counter.object_id), counter.count)
+            for counter in counters
+        ]))
+    return {
+        'totals': [
+            (title, totals.get(metric, 0))
+            for metric, title in DailyCount.METRICS
+        ],
+        'metrics': [title for _, title in DailyCount.METRICS],
+        'days': [
+            (day, [by_day[day].get(metric, 0)
+                   for metric, _ in DailyCount.METRICS])
+            for day in sorted(by_day, reverse=True)
+        ],
+        'leaders': leaders,
+    }
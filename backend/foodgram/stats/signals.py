@@ -0,0 +1,86 @@
+"""Обновление счетчиков статистики при изменении данных."""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import rollups
+from .models import DailyCount, TopCounter
+from recipes.models import Favorite, Recipe
+from recipes.signals import cascaded_from
+from users.models import Follow, User
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.count_day(DailyCount.RECIPES, created=1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    rollups.count_day(DailyCount.RECIPES, deleted=1)
+    # Избранное удаленного рецепта списывается остатком его счетчика
+    rollups.drop_object(
+        TopCounter.RECIPE_FAVORITES, instance.pk, DailyCount.FAVORITES
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.count_day(DailyCount.USERS, created=1)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # Свое избранное и подписки пользователя списываются одним запросом
+    # на вид связи, а не сигналом на каждую удаляемую строку
+    rollups.forget_links(
+        Favorite.objects.filter(user=instance), 'recipe_id',
+        TopCounter.RECIPE_FAVORITES, DailyCount.FAVORITES,
+    )
+    rollups.forget_links(
+        Follow.objects.filter(user=instance), 'author_id',
+        TopCounter.AUTHOR_FOLLOWERS, DailyCount.FOLLOWS,
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    rollups.count_day(DailyCount.USERS, deleted=1)
+    rollups.drop_object(
+        TopCounter.AUTHOR_FOLLOWERS, instance.pk, DailyCount.FOLLOWS
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.count_day(DailyCount.FAVORITES, created=1)
+        rollups.count_object(
+            TopCounter.RECIPE_FAVORITES, instance.recipe_id, 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, origin=None, **kwargs):
+    if cascaded_from(origin, Recipe) or cascaded_from(origin, User):
+        return
+    rollups.count_day(DailyCount.FAVORITES, deleted=1)
+    rollups.count_object(TopCounter.RECIPE_FAVORITES, instance.recipe_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        rollups.count_day(DailyCount.FOLLOWS, created=1)
+        rollups.count_object(
+            TopCounter.AUTHOR_FOLLOWERS, instance.author_id, 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, origin=None, **kwargs):
+    if cascaded_from(origin, User):
+        return
+    rollups.count_day(DailyCount.FOLLOWS, deleted=1)
+    rollups.count_object(TopCounter.AUTHOR_FOLLOWERS, instance.author_id, -1)
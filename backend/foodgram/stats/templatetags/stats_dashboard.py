@@ -0,0 +1,11 @@
+from django import template
+
+from stats import rollups
+
+register = template.Library()
+
+
+@register.inclusion_tag('admin/stats_dashboard.html')
+def stats_dashboard(days=14, top=10):
+    """Панель статистики для главной страницы админки."""
+    return rollups.dashboard(days=days, top=top)
@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
 from .models import Follow, User
+from recipes.admin_tools import EstimatedCountPaginator, related_id_filter
+from recipes.exports import export_csv, export_ndjson
 
 
 @admin.register(User)
@@ -17,7 +19,10 @@ class UserAdmin(UserAdmin):
         'role'
     )
     search_fields = ('email', 'username')
-    list_filter = ('email', 'username')
+    list_filter = ('role', 'is_staff', 'is_active')
+    actions = (export_csv, export_ndjson)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Follow)
@@ -27,5 +32,13 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author'
     )
-    search_fields = ('user', 'author')
-    list_filter = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    list_filter = (
+        related_id_filter('user', 'Подписчик'),
+        related_id_filter('author', 'Автор'),
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    actions = (export_csv, export_ndjson)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class User(AbstractUser):
@@ -48,6 +50,17 @@ class User(AbstractUser):
         ordering = ("username",)
         verbose_name = "Пользователь"
         verbose_name_plural = 'Пользователи'
+        # Поиск админки (icontains) на PostgreSQL
+        indexes = [
+            GinIndex(
+                OpClass(Upper('username'), name='gin_trgm_ops'),
+                name='user_username_trgm_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('email'), name='gin_trgm_ops'),
+                name='user_email_trgm_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -61,7 +74,8 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='following'
+        related_name='following',
+        db_index=False
     )
 
     class Meta:
@@ -73,3 +87,8 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]